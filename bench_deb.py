@@ -0,0 +1,819 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmarks for wrpbypass_deb.py.
+
+Times the install, restore, probe, status and batch-restore flows at
+realistic sizes (Utilman.exe ~128 KiB, a PyInstaller build ~12 MiB, a
+System32 with thousands of entries) without root: the helper runs against
+FakeSystem (temporary directories instead of mounts) and probe/status read
+synthetic NTFS images written by NtfsImageBuilder. With --real-ntfs and
+root, images are created with mkntfs and loop-mounted instead.
+
+    python3 bench_deb.py                          # table
+    python3 bench_deb.py --json > current.json
+    python3 bench_deb.py --save-baseline bench_baseline.json
+    python3 bench_deb.py --baseline bench_baseline.json --tolerance 0.25
+    sudo python3 bench_deb.py --real-ntfs --drivers ntfs3 ntfs-3g
+
+--drivers (needs --real-ntfs) times mount + install/restore + umount on a
+loop-mounted mkntfs image once per mount driver, reported as
+"install@ntfs3", "restore@ntfs-3g" and so on.
+
+With --baseline the exit code is 1 if any flow's median got slower than
+the baseline median by more than the tolerance, so CI catches regressions
+in the mount and copy paths.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import statistics
+import struct
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import wrpbypass_deb as deb
+
+FLOWS = ("install", "restore", "probe", "status", "batch")
+REAL_NTFS_FLOWS = ("install", "restore", "probe", "status")  # batch needs FakeSystem
+
+
+# ---------------------------------------------------------------------------
+# Fake system layer (no root, no real mounts), installed with
+# deb.set_system() for the runs that do not use --real-ntfs.
+# ---------------------------------------------------------------------------
+
+
+class FakeSystem(deb.System):
+    """
+    System layer for tests and benchmarks: no root, no real mounts.
+
+    Devices are registered with add_device() and "mounting" one returns its
+    backing directory (a Windows root tree). Commands are recorded, not run.
+    Images attach to themselves, so NTFS image files still go through the
+    real read-only probe.
+    """
+
+    def __init__(self, base=None, mount_delay: float = 0.0, root: bool = True):
+        self._base = Path(base) if base else None
+        self.mount_delay = mount_delay
+        self.root = root
+        self.devices: dict[str, Path] = {}
+        self.mounts: dict[str, str] = {}
+        self.commands: list[list[str]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def base(self) -> Path:
+        """Directory for backing trees (a fresh temp dir unless given)."""
+        if self._base is None:
+            self._base = Path(tempfile.mkdtemp(prefix="wrpbypass-fake-"))
+        return self._base
+
+    def add_device(self, device: str, win_root=None) -> Path:
+        """Register `device`; returns its backing directory."""
+        with self._lock:
+            backing = Path(win_root) if win_root else self.base / f"dev{len(self.devices)}"
+            backing.mkdir(parents=True, exist_ok=True)
+            self.devices[str(device)] = backing
+        return backing
+
+    def run(self, cmd) -> str:
+        print(f"[+] Run (fake): {' '.join(cmd)}")
+        with self._lock:
+            self.commands.append(list(cmd))
+        return ""
+
+    def is_root(self) -> bool:
+        return self.root
+
+    def driver_available(self, driver: str) -> bool:
+        return True
+
+    def mount(self, device, mountpoint, fstype=None, options=None) -> Path:
+        backing = self.devices.get(str(device))
+        if backing is None:
+            raise RuntimeError(f"mount: {device}: no such device (fake)")
+        if self.mount_delay:
+            time.sleep(self.mount_delay)
+        with self._lock:
+            self.commands.append(["mount", str(device), str(mountpoint)])
+            self.mounts[str(backing)] = str(device)
+        return backing
+
+    def umount(self, mountpoint) -> None:
+        with self._lock:
+            self.commands.append(["umount", str(mountpoint)])
+            if self.mounts.pop(str(mountpoint), None) is None:
+                raise RuntimeError(f"umount: {mountpoint}: not mounted (fake)")
+
+    def ismount(self, path) -> bool:
+        return str(path) in self.mounts
+
+    def attach_image(self, image) -> str:
+        self.run(["losetup", "--find", "--show", "--partscan", str(image)])
+        return str(image)
+
+    def detach_image(self, loop) -> None:
+        self.run(["losetup", "--detach", str(loop)])
+
+
+# ---------------------------------------------------------------------------
+# Synthetic NTFS images (enough of the format for NtfsVolume: boot sector,
+# $MFT, $Volume, $UpCase, directories with multi-level $I30 B-trees,
+# resident and non-resident $DATA, fragmented and sparse runlists, and
+# attribute lists with extension records). Also used by the reader tests.
+# ---------------------------------------------------------------------------
+
+
+class NtfsImageBuilder:
+    SECTOR = 512
+    CLUSTER = 4096
+    RECORD = 1024
+    INDEX_BLOCK = 4096
+    ROOT_BUDGET = 480  # bytes of index entries kept resident in $INDEX_ROOT
+
+    def __init__(self, size: int = 64 * 1024 * 1024, label: str = "", volume_flags: int = 0):
+        self.clusters = size // self.CLUSTER
+        self.label = label
+        self.volume_flags = volume_flags
+        self.records: dict[int, bytearray] = {}
+        self.extents: list[tuple[int, bytes]] = []  # (lcn, data)
+        self.next_lcn = 16
+        self.next_record = 24  # below that: system files
+        self.tree = {"children": {}, "record": 5}
+        table = []
+        for code in range(0x10000):
+            upper = chr(code).upper()
+            table.append(ord(upper) if len(upper) == 1 and ord(upper) < 0x10000 else code)
+        self.upcase = table
+
+    # -- helpers ------------------------------------------------------------
+
+    def _alloc(self, clusters: int) -> int:
+        lcn = self.next_lcn
+        self.next_lcn += clusters
+        if self.next_lcn > self.clusters:
+            raise ValueError("image too small for its contents")
+        return lcn
+
+    def _new_record(self) -> int:
+        number = self.next_record
+        self.next_record += 1
+        return number
+
+    def _key(self, name: str) -> list[int]:
+        units = struct.unpack(f"<{len(name)}H", name.encode("utf-16-le"))
+        return [self.upcase[u] for u in units]
+
+    @staticmethod
+    def _pad8(data: bytes) -> bytes:
+        return data + bytes(-len(data) % 8)
+
+    @staticmethod
+    def _fixup(buf: bytearray, usa_off: int) -> bytearray:
+        count = len(buf) // 512 + 1
+        struct.pack_into("<HH", buf, 4, usa_off, count)
+        buf[usa_off:usa_off + 2] = b"\x01\x00"
+        for i in range(1, count):
+            end = i * 512
+            buf[usa_off + 2 * i:usa_off + 2 * i + 2] = buf[end - 2:end]
+            buf[end - 2:end] = b"\x01\x00"
+        return buf
+
+    @staticmethod
+    def _runlist(runs) -> bytes:
+        """Encode [(lcn or None for a sparse hole, clusters)]."""
+        out, previous = bytearray(), 0
+        for lcn, length in runs:
+            length_bytes = length.to_bytes((length.bit_length() + 7) // 8 or 1, "little")
+            if lcn is None:
+                out += bytes([len(length_bytes)]) + length_bytes
+                continue
+            delta = lcn - previous
+            previous = lcn
+            size = 1
+            while not -(1 << (8 * size - 1)) <= delta < (1 << (8 * size - 1)):
+                size += 1
+            out += bytes([len(length_bytes) | size << 4]) + length_bytes
+            out += delta.to_bytes(size, "little", signed=True)
+        return bytes(out) + b"\0"
+
+    def _resident(self, type_: int, value: bytes, name: str = "") -> bytes:
+        encoded = name.encode("utf-16-le")
+        value_off = (0x18 + len(encoded) + 7) & ~7
+        head = bytearray(value_off)
+        struct.pack_into("<IIBBHHHIH", head, 0, type_, 0, 0, len(name), 0x18, 0, 0,
+                         len(value), value_off)
+        head[0x18:0x18 + len(encoded)] = encoded
+        attr = bytearray(self._pad8(bytes(head) + value))
+        struct.pack_into("<I", attr, 4, len(attr))
+        return bytes(attr)
+
+    def _non_resident(self, type_: int, runs, size: int, name: str = "",
+                      start_vcn: int = 0, flags: int = 0) -> bytes:
+        encoded = name.encode("utf-16-le")
+        runs_off = (0x40 + len(encoded) + 7) & ~7
+        clusters = sum(length for _, length in runs)
+        head = bytearray(runs_off)
+        struct.pack_into("<IIBBHHH", head, 0, type_, 0, 1, len(name), 0x40, flags, 0)
+        struct.pack_into("<qqH", head, 0x10, start_vcn, start_vcn + clusters - 1, runs_off)
+        allocated = -(-size // self.CLUSTER) * self.CLUSTER
+        struct.pack_into("<QQQ", head, 0x28, allocated, size, size)
+        head[0x40:0x40 + len(encoded)] = encoded
+        attr = bytearray(self._pad8(bytes(head) + self._runlist(runs)))
+        struct.pack_into("<I", attr, 4, len(attr))
+        return bytes(attr)
+
+    def _record(self, number: int, attrs, directory: bool = False, base: int = 0) -> bytearray:
+        rec = bytearray(self.RECORD)
+        rec[0:4] = b"FILE"
+        struct.pack_into("<HHHH", rec, 0x10, 1, 1, 0x38, 1 | (2 if directory else 0))
+        if base:
+            struct.pack_into("<Q", rec, 0x20, base | 1 << 48)
+        pos = 0x38
+        for attr in attrs:
+            if pos + len(attr) + 8 > self.RECORD:
+                raise ValueError(f"MFT record {number} overflows")
+            rec[pos:pos + len(attr)] = attr
+            pos += len(attr)
+        struct.pack_into("<I", rec, pos, 0xFFFFFFFF)
+        struct.pack_into("<II", rec, 0x18, pos + 8, self.RECORD)
+        struct.pack_into("<I", rec, 0x2C, number)
+        return self._fixup(rec, 0x30)
+
+    def _file_name(self, parent: int, name: str, size: int = 0, directory: bool = False) -> bytes:
+        value = bytearray(0x42)
+        struct.pack_into("<Q", value, 0, parent)
+        struct.pack_into("<QQI", value, 0x28, size, size, 0x10000000 if directory else 0x20)
+        value[0x40] = len(name)
+        value[0x41] = 1  # Win32 namespace
+        return bytes(value) + name.encode("utf-16-le")
+
+    def _data(self, data: bytes) -> bytes:
+        if len(data) <= 600:
+            return self._resident(0x80, data)
+        return self._non_resident(0x80, self._data_runs(data), len(data))
+
+    def _data_runs(self, data: bytes, fragments: int = 1, sparse: bool = False):
+        """
+        Allocate `data` and return its runs. With `sparse`, all-zero clusters
+        become holes; with `fragments` > 1 the data is split into that many
+        extents, allocated back to front with gaps (negative LCN deltas).
+        """
+        cs = self.CLUSTER
+        clusters = -(-len(data) // cs)
+        segments = []  # [vcn, count, hole]
+        for vcn in range(clusters):
+            hole = sparse and not any(data[vcn * cs:(vcn + 1) * cs])
+            if segments and segments[-1][2] == hole:
+                segments[-1][1] += 1
+            else:
+                segments.append([vcn, 1, hole])
+        if fragments > 1:
+            split = []
+            for vcn, count, hole in segments:
+                pieces = 1 if hole else min(fragments, count)
+                step = -(-count // pieces)
+                split += [[v, min(step, vcn + count - v), hole] for v in range(vcn, vcn + count, step)]
+            segments = split
+        lcns = {}
+        for vcn, count, hole in reversed(segments):
+            if hole:
+                continue
+            lcns[vcn] = self._alloc(count)
+            self.extents.append((lcns[vcn], data[vcn * cs:(vcn + count) * cs]))
+            if fragments > 1:
+                self._alloc(1)
+        return [(lcns.get(vcn), count) for vcn, count, _ in segments]
+
+    def _attribute_list(self, entries) -> bytes:
+        """$ATTRIBUTE_LIST value for [(type, record, start_vcn)]."""
+        out = b""
+        for type_, record, start_vcn in entries:
+            out += struct.pack("<IHBBqQH6x", type_, 0x20, 0, 0x1A, start_vcn, record | 1 << 48, 0)
+        return out
+
+    def _file_records(self, number: int, parent: int, name: str, node: dict) -> None:
+        data = node["data"]
+        file_name = self._resident(0x30, self._file_name(parent, name, len(data)))
+        if not (node.get("fragments", 1) > 1 or node.get("sparse") or node.get("attribute_list")):
+            self.records[number] = self._record(number, [file_name, self._data(data)])
+            return
+        runs = self._data_runs(data, node.get("fragments", 1), node.get("sparse", False))
+        flags = 0x8000 if any(lcn is None for lcn, _ in runs) else 0  # ATTR_SPARSE
+        if not node.get("attribute_list"):
+            self.records[number] = self._record(number, [
+                file_name, self._non_resident(0x80, runs, len(data), flags=flags),
+            ])
+            return
+        # $DATA split across the base record (first run) and an extension
+        # record (the rest), tied together by an $ATTRIBUTE_LIST.
+        ext = self._new_record()
+        head, tail = runs[:1], runs[1:]
+        entries = [(0x30, number, 0), (0x80, number, 0)]
+        base_attrs = [file_name]
+        ext_attrs = []
+        if tail:
+            tail_vcn = head[0][1]
+            entries.append((0x80, ext, tail_vcn))
+            ext_attrs.append(self._non_resident(0x80, tail, len(data), start_vcn=tail_vcn, flags=flags))
+        else:
+            entries = [(0x30, number, 0), (0x80, ext, 0)]
+            ext_attrs.append(self._non_resident(0x80, head, len(data), flags=flags))
+            head = []
+        base_attrs.insert(0, self._resident(0x20, self._attribute_list(entries)))
+        if head:
+            base_attrs.append(self._non_resident(0x80, head, len(data), flags=flags))
+        self.records[number] = self._record(number, base_attrs)
+        self.records[ext] = self._record(ext, ext_attrs, base=number)
+
+    # -- directory indexes --------------------------------------------------
+
+    def _entry(self, ref: int, key: bytes, subnode=None, end: bool = False) -> bytes:
+        length = 0x10 + (0 if end else len(self._pad8(key))) + (8 if subnode is not None else 0)
+        flags = (1 if subnode is not None else 0) | (2 if end else 0)
+        entry = bytearray(length)
+        struct.pack_into("<QHHH", entry, 0, 0 if end else ref, length, 0 if end else len(key), flags)
+        if not end:
+            entry[0x10:0x10 + len(key)] = key
+        if subnode is not None:
+            struct.pack_into("<q", entry, length - 8, subnode)
+        return bytes(entry)
+
+    def _node(self, items, children, end_child) -> bytes:
+        body = b"".join(
+            self._entry(ref, key, None if children is None else child)
+            for (key, ref), child in zip(items, children or [None] * len(items))
+        )
+        return body + self._entry(0, b"", end_child, end=True)
+
+    def _index(self, number: int, keys):
+        """Build $INDEX_ROOT (+ $INDEX_ALLOCATION) attributes for sorted keys."""
+        blocks: list[bytes] = []
+        items, children = keys, None
+        capacity = self.INDEX_BLOCK - 0x100
+        while sum(len(self._entry(ref, key, 0)) for key, ref in items) > self.ROOT_BUDGET:
+            promoted, next_children = [], []
+            i, n = 0, len(items)
+            while i < n:
+                group, size = [], 0
+                start = i
+                while i < n:
+                    length = len(self._entry(items[i][1], items[i][0], 0))
+                    if group and size + length > capacity and i < n - 1:
+                        break
+                    group.append(items[i])
+                    size += length
+                    i += 1
+                group_children = None if children is None else children[start:i]
+                end_child = None if children is None else children[i]
+                node = self._node(group, group_children, end_child)
+                next_children.append(len(blocks))
+                blocks.append(self._indx_block(len(blocks), node, children is not None))
+                if i < n:
+                    promoted.append(items[i])
+                    i += 1
+            items, children = promoted, next_children
+
+        end_child = children[-1] if children is not None else None
+        body = self._node(items, children[:-1] if children is not None else None, end_child)
+        header = struct.pack("<IIIB3x", 0x10, 0x10 + len(body), 0x10 + len(body),
+                             1 if children is not None else 0)
+        root = struct.pack("<IIIB3x", 0x30, 1, self.INDEX_BLOCK, 1) + header + body
+        attrs = [self._resident(0x90, root, "$I30")]
+        if blocks:
+            lcn = self._alloc(len(blocks))
+            self.extents.append((lcn, b"".join(blocks)))
+            attrs.append(self._non_resident(0xA0, [(lcn, len(blocks))],
+                                            len(blocks) * self.INDEX_BLOCK, "$I30"))
+        return attrs
+
+    def _indx_block(self, vcn: int, body: bytes, has_children: bool) -> bytes:
+        block = bytearray(self.INDEX_BLOCK)
+        block[0:4] = b"INDX"
+        struct.pack_into("<Q", block, 0x10, vcn)
+        struct.pack_into("<IIIB", block, 0x18, 0x28, 0x28 + len(body),
+                         self.INDEX_BLOCK - 0x18, 1 if has_children else 0)
+        if 0x40 + len(body) > self.INDEX_BLOCK:
+            raise ValueError("index block overflow")
+        block[0x40:0x40 + len(body)] = body
+        return bytes(self._fixup(block, 0x28))
+
+    # -- public API ---------------------------------------------------------
+
+    def _dir(self, path: str) -> dict:
+        node = self.tree
+        for part in [p for p in path.strip("/").split("/") if p]:
+            node = node["children"].setdefault(
+                part, {"children": {}, "record": self._new_record()}
+            )
+        return node
+
+    def add_file(self, path: str, data: bytes, fragments: int = 1, sparse: bool = False,
+                 attribute_list: bool = False) -> int:
+        """Add a file; returns its MFT record number."""
+        parent, _, name = path.strip("/").rpartition("/")
+        record = self._new_record()
+        self._dir(parent)["children"][name] = {
+            "data": data,
+            "record": record,
+            "fragments": fragments,
+            "sparse": sparse,
+            "attribute_list": attribute_list,
+        }
+        return record
+
+    def mkdir(self, path: str) -> None:
+        self._dir(path)
+
+    def _emit(self, node: dict, number: int, parent: int, name: str) -> None:
+        keys = []
+        for child_name, child in node["children"].items():
+            is_dir = "data" not in child
+            size = 0 if is_dir else len(child["data"])
+            keys.append((self._file_name(number, child_name, size, is_dir), child["record"]))
+            if is_dir:
+                self._emit(child, child["record"], number, child_name)
+            else:
+                self._file_records(child["record"], number, child_name, child)
+        keys.sort(key=lambda k: self._key(k[0][0x42:].decode("utf-16-le")))
+        attrs = [self._resident(0x30, self._file_name(parent, name, directory=True))]
+        self.records[number] = self._record(number, attrs + self._index(number, keys), True)
+
+    def write(self, path) -> None:
+        self._emit(self.tree, 5, 5, ".")
+        upcase = struct.pack("<65536H", *self.upcase)
+        self.records[10] = self._record(10, [
+            self._resident(0x30, self._file_name(5, "$UpCase")), self._data(upcase),
+        ])
+        volume_info = struct.pack("<8xBBH4x", 3, 1, self.volume_flags)  # NTFS 3.1
+        self.records[3] = self._record(3, [
+            self._resident(0x30, self._file_name(5, "$Volume")),
+            self._resident(0x60, self.label.encode("utf-16-le")),
+            self._resident(0x70, volume_info),
+        ])
+        mft_clusters = -(-self.next_record * self.RECORD // self.CLUSTER)
+        mft_lcn = self._alloc(mft_clusters)
+        self.records[0] = self._record(0, [
+            self._resident(0x30, self._file_name(5, "$MFT")),
+            self._non_resident(0x80, [(mft_lcn, mft_clusters)], self.next_record * self.RECORD),
+        ])
+        boot = bytearray(512)
+        boot[0:11] = b"\xEB\x52\x90NTFS    "
+        struct.pack_into("<HB", boot, 0x0B, self.SECTOR, self.CLUSTER // self.SECTOR)
+        struct.pack_into("<QQQ", boot, 0x28, self.clusters * self.CLUSTER // self.SECTOR - 1,
+                         mft_lcn, mft_lcn)
+        struct.pack_into("<bxxxbxxxQ", boot, 0x40, -10, 1, int.from_bytes(os.urandom(8), "little"))
+        boot[510:512] = b"\x55\xAA"
+        with open(path, "wb") as f:
+            f.truncate(self.clusters * self.CLUSTER)  # sparse
+            f.write(boot)
+            for lcn, data in self.extents:
+                f.seek(lcn * self.CLUSTER)
+                f.write(data)
+            for number, rec in self.records.items():
+                f.seek(mft_lcn * self.CLUSTER + number * self.RECORD)
+                f.write(rec)
+
+
+def build_windows_image(path, entries: int, utilman: bytes, hooked: bytes | None = None) -> None:
+    """Synthetic NTFS image with a System32 of `entries` files plus Utilman."""
+    builder = NtfsImageBuilder()
+    builder.mkdir("Windows/servicing/Version/10.0.22621.2428")
+    for i in range(entries):
+        builder.add_file(f"Windows/System32/api-ms-win-core-{i:05d}-l1-1-0.dll", b"MZ")
+    if hooked is None:
+        builder.add_file("Windows/System32/Utilman.exe", utilman)
+    else:
+        builder.add_file("Windows/System32/Utilman.exe", hooked)
+        builder.add_file("Windows/System32/Utilman.exe.tmp", utilman)
+    builder.write(path)
+
+
+# ---------------------------------------------------------------------------
+# Fixtures
+# ---------------------------------------------------------------------------
+
+
+class Fixture:
+    """Temporary workspace with a hook binary and Windows roots/images."""
+
+    def __init__(self, args):
+        self.args = args
+        self.base = Path(tempfile.mkdtemp(prefix="wrpbypass-bench-"))
+        self.hook = self.base / "Utilman-hook.exe"
+        self.hook.write_bytes(os.urandom(args.hook_mb * 1024 * 1024))
+        self.utilman = os.urandom(args.utilman_kb * 1024)
+        self.images: list[Path] = []
+        self.loop: str | None = None
+
+    def close(self) -> None:
+        if self.loop:
+            deb.SYSTEM.detach_image(self.loop)
+        shutil.rmtree(self.base, ignore_errors=True)
+
+    def driver_device(self) -> str:
+        """Loop device of a clean mkntfs image shared by the driver runs."""
+        if self.loop is None:
+            image = self.base / "drivers.img"
+            _build_real_image(image, self.args.entries, self.utilman, None)
+            self.loop = deb.SYSTEM.attach_image(image)
+            (self.base / "mnt").mkdir(exist_ok=True)
+        return self.loop
+
+    def win_root(self, name: str, hooked: bool = False) -> Path:
+        root = self.base / name
+        shutil.rmtree(root, ignore_errors=True)
+        system32 = root / "Windows" / "System32"
+        system32.mkdir(parents=True)
+        (system32 / "Utilman.exe").write_bytes(self.utilman)
+        if hooked:
+            with contextlib.redirect_stdout(io.StringIO()):
+                deb.backup_and_replace_utilman(root, self.hook)
+        return root
+
+    def ntfs_images(self) -> list[Path]:
+        if not self.images:
+            for i in range(self.args.devices):
+                image = self.base / f"disk{i}.img"
+                hooked = self.hook.read_bytes()[:1024 * 1024] if i % 2 else None
+                if self.args.real_ntfs:
+                    _build_real_image(image, self.args.entries, self.utilman, hooked)
+                else:
+                    build_windows_image(image, self.args.entries, self.utilman, hooked)
+                self.images.append(image)
+        return self.images
+
+
+def _build_real_image(path, entries: int, utilman: bytes, hooked: bytes | None) -> None:
+    """mkntfs + loop mount (needs root and ntfs-3g) for --real-ntfs."""
+    with open(path, "wb") as f:
+        f.truncate(256 * 1024 * 1024)
+    deb.run(["mkntfs", "-F", "-Q", "-q", str(path)])
+    loop = deb.SYSTEM.attach_image(path)
+    mountpoint = tempfile.mkdtemp(prefix="wrpbypass-mkimg-")
+    try:
+        root = deb.mount_partition(loop, mountpoint)
+        system32 = Path(root) / "Windows" / "System32"
+        system32.mkdir(parents=True)
+        (Path(root) / "Windows" / "servicing" / "Version" / "10.0.22621.2428").mkdir(parents=True)
+        for i in range(entries):
+            (system32 / f"api-ms-win-core-{i:05d}-l1-1-0.dll").write_bytes(b"MZ")
+        (system32 / "Utilman.exe").write_bytes(hooked or utilman)
+        if hooked:
+            (system32 / "Utilman.exe.tmp").write_bytes(utilman)
+        deb.umount_partition(root)
+    finally:
+        os.rmdir(mountpoint)
+        deb.SYSTEM.detach_image(loop)
+
+
+# ---------------------------------------------------------------------------
+# Flows. Each returns the seconds spent in the timed part.
+# ---------------------------------------------------------------------------
+
+
+def _on_device(fx: Fixture, device: str, op) -> bool:
+    with deb.MountSession(device, fx.base / "mnt") as session:
+        return op(session.root)
+
+
+def flow_install(fx: Fixture, i: int) -> float:
+    if isinstance(deb.SYSTEM, FakeSystem):
+        device = f"/dev/fake-install{i}"
+        deb.SYSTEM.add_device(device, fx.win_root(f"install{i}"))
+    else:
+        device = fx.driver_device()  # clean mkntfs image, restored again below
+    started = time.perf_counter()
+    ok = _on_device(fx, device, lambda root: deb.backup_and_replace_utilman(root, fx.hook))
+    elapsed = time.perf_counter() - started
+    if not ok:
+        raise RuntimeError("install failed")
+    if not isinstance(deb.SYSTEM, FakeSystem) and not _on_device(fx, device, deb.restore_files):
+        raise RuntimeError("restore after install failed")
+    return elapsed
+
+
+def flow_restore(fx: Fixture, i: int) -> float:
+    if isinstance(deb.SYSTEM, FakeSystem):
+        device = f"/dev/fake-restore{i}"
+        deb.SYSTEM.add_device(device, fx.win_root(f"restore{i}", hooked=True))
+    else:
+        device = fx.driver_device()
+        if not _on_device(fx, device, lambda root: deb.backup_and_replace_utilman(root, fx.hook)):
+            raise RuntimeError("install before restore failed")
+    started = time.perf_counter()
+    ok = _on_device(fx, device, deb.restore_files)
+    elapsed = time.perf_counter() - started
+    if not ok:
+        raise RuntimeError("restore failed")
+    return elapsed
+
+
+def flow_probe(fx: Fixture, i: int) -> float:
+    images = fx.ntfs_images()
+    devices = [
+        deb.BlockDevice(p.name, str(p), p.stat().st_size, "ntfs", "", "", False, False, (), "", "")
+        for p in images
+    ]
+    started = time.perf_counter()
+    results = deb.probe_windows_partitions(devices)
+    elapsed = time.perf_counter() - started
+    if not all(r.has_system32 for r in results):
+        raise RuntimeError(f"probe failed: {[r.describe() for r in results]}")
+    return elapsed
+
+
+def flow_status(fx: Fixture, i: int) -> float:
+    images = [str(p) for p in fx.ntfs_images()]
+    started = time.perf_counter()
+    deb.status_report(images, [], as_json=True)
+    return time.perf_counter() - started
+
+
+def flow_batch(fx: Fixture, i: int) -> float:
+    if not isinstance(deb.SYSTEM, FakeSystem):
+        raise RuntimeError("batch flow needs the fake system layer")
+    images = fx.ntfs_images()
+    for n, image in enumerate(images):
+        deb.SYSTEM.add_device(str(image), fx.win_root(f"batch{n}", hooked=True))
+    started = time.perf_counter()
+    rc = deb.batch_restore([str(p) for p in images], jobs=fx.args.jobs, as_json=True)
+    elapsed = time.perf_counter() - started
+    if rc != 0:
+        raise RuntimeError("batch restore failed")
+    return elapsed
+
+
+FLOW_FUNCS = {
+    "install": flow_install,
+    "restore": flow_restore,
+    "probe": flow_probe,
+    "status": flow_status,
+    "batch": flow_batch,
+}
+
+
+def driver_flows(fx: Fixture, driver: str) -> dict[str, float]:
+    """Mount with one driver, install, unmount; then the same for restore."""
+    loop = fx.driver_device()
+    timings = {}
+    for flow, op in (
+        ("install", lambda root: deb.backup_and_replace_utilman(root, fx.hook)),
+        ("restore", deb.restore_files),
+    ):
+        started = time.perf_counter()
+        root = deb.mount_partition(loop, fx.base / "mnt", drivers=[driver])
+        try:
+            ok = op(root)
+        finally:
+            deb.umount_partition(root)
+        timings[flow] = time.perf_counter() - started
+        if not ok:
+            raise RuntimeError(f"{flow} with {driver} failed")
+    return timings
+
+
+# ---------------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------------
+
+
+def _summary(samples: list[float]) -> dict:
+    return {
+        "min": min(samples),
+        "median": statistics.median(samples),
+        "mean": statistics.fmean(samples),
+        "samples": len(samples),
+    }
+
+
+def run_benchmarks(args) -> dict:
+    fx = Fixture(args)
+    if args.real_ntfs:
+        deb.ensure_root()
+        previous = deb.set_system(deb.System())
+    else:
+        previous = deb.set_system(FakeSystem(fx.base / "devices", args.mount_delay))
+    results = {}
+    try:
+        for flow in args.flows:
+            func = FLOW_FUNCS[flow]
+            samples = []
+            for i in range(args.warmup + args.repeat):
+                with contextlib.redirect_stdout(io.StringIO()):
+                    elapsed = func(fx, i)
+                if i >= args.warmup:
+                    samples.append(elapsed)
+            results[flow] = _summary(samples)
+        for driver in args.drivers:
+            if not deb.SYSTEM.driver_available(driver):
+                print(f"[i] Mount driver {driver} not available, skipping", file=sys.stderr)
+                continue
+            samples = {"install": [], "restore": []}
+            for i in range(args.warmup + args.repeat):
+                with contextlib.redirect_stdout(io.StringIO()):
+                    timings = driver_flows(fx, driver)
+                if i >= args.warmup:
+                    for flow, elapsed in timings.items():
+                        samples[flow].append(elapsed)
+            for flow, values in samples.items():
+                results[f"{flow}@{driver}"] = _summary(values)
+    finally:
+        deb.set_system(previous)
+        fx.close()
+    return {
+        "params": {
+            "hook_mb": args.hook_mb,
+            "utilman_kb": args.utilman_kb,
+            "devices": args.devices,
+            "entries": args.entries,
+            "jobs": args.jobs,
+            "mount_delay": args.mount_delay,
+            "real_ntfs": args.real_ntfs,
+            "drivers": args.drivers,
+        },
+        "results": results,
+    }
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    for flow, current in report["results"].items():
+        base = baseline.get("results", {}).get(flow)
+        if base and current["median"] > base["median"] * (1 + tolerance):
+            regressions.append(
+                f"{flow}: median {current['median'] * 1000:.1f} ms vs baseline "
+                f"{base['median'] * 1000:.1f} ms (+{tolerance:.0%} allowed)"
+            )
+    return regressions
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Benchmark wrpbypass_deb.py flows")
+    parser.add_argument("--flows", nargs="+", choices=FLOWS,
+                        help="Flows to run (default: all; with --real-ntfs all but batch)")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per flow (default: 5)")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed runs per flow (default: 1)")
+    parser.add_argument("--hook-mb", type=int, default=12, help="Hook binary size (default: 12 MiB)")
+    parser.add_argument("--utilman-kb", type=int, default=128, help="Utilman.exe size (default: 128 KiB)")
+    parser.add_argument("--devices", type=int, default=8, help="Images for probe/status/batch (default: 8)")
+    parser.add_argument("--entries", type=int, default=3000, help="Files in System32 (default: 3000)")
+    parser.add_argument("--jobs", type=int, default=4, help="Batch restore parallelism (default: 4)")
+    parser.add_argument("--mount-delay", type=float, default=0.0,
+                        help="Simulated mount latency in seconds for the fake layer")
+    parser.add_argument("--real-ntfs", action="store_true",
+                        help="Use mkntfs + loop-mounted images and real mounts (root, ntfs-3g)")
+    parser.add_argument("--drivers", nargs="+", default=[], metavar="DRIVER",
+                        help="Also time mount+install/restore per mount driver, e.g. ntfs3 ntfs-3g "
+                             "(needs --real-ntfs)")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    parser.add_argument("--baseline", help="Compare against a saved report; exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed slowdown vs baseline median (default: 0.25 = 25%%)")
+    parser.add_argument("--save-baseline", metavar="FILE", help="Write the report to FILE")
+    return parser
+
+
+def main(argv=None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.drivers and not args.real_ntfs:
+        parser.error("--drivers needs --real-ntfs")
+    supported = REAL_NTFS_FLOWS if args.real_ntfs else FLOWS
+    if args.flows is None:
+        args.flows = list(supported)
+    unsupported = [flow for flow in args.flows if flow not in supported]
+    if unsupported:
+        parser.error(
+            f"--real-ntfs does not support flow(s) {', '.join(unsupported)}; "
+            f"supported: {', '.join(supported)}"
+        )
+    report = run_benchmarks(args)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{'FLOW':18} {'MIN ms':>10} {'MEDIAN ms':>10} {'MEAN ms':>10}")
+        for flow, r in report["results"].items():
+            print(f"{flow:18} {r['min'] * 1000:>10.1f} {r['median'] * 1000:>10.1f} {r['mean'] * 1000:>10.1f}")
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(json.dumps(report, indent=2))
+        print(f"[+] Baseline saved to {args.save_baseline}", file=sys.stderr)
+    if args.baseline:
+        regressions = compare(report, json.loads(Path(args.baseline).read_text()), args.tolerance)
+        for line in regressions:
+            print(f"[!] Regression: {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,113 @@
+#!/usr/bin/env bash
+
+# Add wrpbypass_deb to a Debian Live ISO as an extra live-boot layer.
+#
+# The base /live/filesystem.squashfs is left untouched: only a small
+# squashfs with the helper binary and wrpbypass-deb.service is built and
+# mapped into /live next to it, and xorriso copies everything else from the
+# input ISO, replaying its boot setup (BIOS and EFI). live-boot stacks all
+# /live/*.squashfs images (or those listed in filesystem.module), later
+# ones on top, so a rebuild after a code change takes seconds instead of a
+# full unsquashfs/mksquashfs cycle.
+#
+# Usage (root not required):
+#   ./build_live_overlay.sh debian-live-13.3.0-amd64-standard.iso ./wrpbypass_deb
+#
+# Requires: squashfs-tools (mksquashfs), xorriso
+
+set -euo pipefail
+
+SCRIPT_DIR=$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)
+
+ISO_IN=${1:-debian-live-13.3.0-amd64-standard.iso}
+WRP_BIN=${2:-./wrpbypass_deb}
+ISO_OUT=${3:-debian-live-13.3.0-amd64-wrpbypass.iso}
+UNIT_FILE=${UNIT_FILE:-$SCRIPT_DIR/wrpbypass-deb.service}
+# Must sort after filesystem.squashfs so it is stacked on top without a
+# filesystem.module.
+LAYER_NAME=${LAYER_NAME:-wrpbypass.squashfs}
+
+if [[ ! -f "$ISO_IN" ]]; then
+  echo "[!] Input ISO not found: $ISO_IN"
+  exit 1
+fi
+
+if [[ ! -f "$WRP_BIN" ]]; then
+  echo "[!] Compiled wrpbypass_deb binary not found: $WRP_BIN"
+  echo "    Build it first with: pyinstaller -F wrpbypass_deb.py --name wrpbypass_deb"
+  exit 1
+fi
+
+if [[ ! -f "$UNIT_FILE" ]]; then
+  echo "[!] systemd unit not found: $UNIT_FILE"
+  exit 1
+fi
+
+for cmd in mksquashfs xorriso; do
+  if ! command -v "$cmd" >/dev/null 2>&1; then
+    echo "[!] Required tool '$cmd' not found. Install 'squashfs-tools', 'xorriso'."
+    exit 1
+  fi
+done
+
+if [[ "$(realpath -m "$ISO_OUT")" == "$(realpath "$ISO_IN")" ]]; then
+  echo "[!] Output ISO must differ from the input ISO."
+  exit 1
+fi
+
+WORKDIR=$(mktemp -d -t wrpbypass_overlay_XXXX)
+trap 'rm -rf "$WORKDIR"' EXIT
+LAYER_DIR="$WORKDIR/layer"
+
+echo "[*] Staging live layer..."
+install -D -m 755 "$WRP_BIN" "$LAYER_DIR/usr/local/sbin/wrpbypass_deb"
+install -D -m 644 "$UNIT_FILE" "$LAYER_DIR/etc/systemd/system/wrpbypass-deb.service"
+mkdir -p "$LAYER_DIR/etc/systemd/system/multi-user.target.wants"
+ln -sf "../wrpbypass-deb.service" \
+  "$LAYER_DIR/etc/systemd/system/multi-user.target.wants/wrpbypass-deb.service"
+
+echo "[*] Building $LAYER_NAME..."
+mksquashfs "$LAYER_DIR" "$WORKDIR/$LAYER_NAME" -noappend -all-root -quiet
+
+MAP_ARGS=(-map "$WORKDIR/$LAYER_NAME" "/live/$LAYER_NAME")
+CHANGED=("live/$LAYER_NAME")
+
+# An explicit image list overrides live-boot's glob: append our layer (last
+# line = topmost layer).
+if xorriso -osirrox on -indev "$ISO_IN" \
+     -extract /live/filesystem.module "$WORKDIR/filesystem.module" >/dev/null 2>&1 \
+   && [[ -f "$WORKDIR/filesystem.module" ]]; then
+  chmod u+w "$WORKDIR/filesystem.module"
+  if ! grep -qxF "$LAYER_NAME" "$WORKDIR/filesystem.module"; then
+    echo "$LAYER_NAME" >> "$WORKDIR/filesystem.module"
+  fi
+  echo "[*] Updated live/filesystem.module"
+  MAP_ARGS+=(-map "$WORKDIR/filesystem.module" /live/filesystem.module)
+  CHANGED+=("live/filesystem.module")
+fi
+
+# Keep the checksum lists used by live-boot's "verify-checksums" valid.
+for SUMS in md5sum.txt sha256sum.txt; do
+  if xorriso -osirrox on -indev "$ISO_IN" \
+       -extract "/$SUMS" "$WORKDIR/$SUMS.orig" >/dev/null 2>&1 \
+     && [[ -f "$WORKDIR/$SUMS.orig" ]]; then
+    TOOL=${SUMS%.txt}
+    PATTERN=$(printf '  \\./%s$\\|' "${CHANGED[@]}")
+    grep -v "${PATTERN%\\|}" "$WORKDIR/$SUMS.orig" > "$WORKDIR/$SUMS" || true
+    for REL in "${CHANGED[@]}"; do
+      SRC="$WORKDIR/$(basename "$REL")"
+      echo "$("$TOOL" < "$SRC" | cut -d' ' -f1)  ./$REL" >> "$WORKDIR/$SUMS"
+    done
+    MAP_ARGS+=(-map "$WORKDIR/$SUMS" "/$SUMS")
+  fi
+done
+
+echo "[*] Assembling ISO (base squashfs and boot setup copied unchanged)..."
+rm -f "$ISO_OUT"
+xorriso -indev "$ISO_IN" -outdev "$ISO_OUT" \
+  "${MAP_ARGS[@]}" \
+  -boot_image any replay
+
+echo "[+] Done in ${SECONDS}s."
+echo "[+] New ISO: $ISO_OUT"
+echo "[+] You can now write it to a USB stick (e.g. with 'dd' or Rufus)."
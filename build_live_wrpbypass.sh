@@ -4,6 +4,22 @@
 # Usage (run on Linux as root):
 #   ./build_live_wrpbypass.sh debian-live-13.3.0-amd64-standard.iso ./wrpbypass_deb
 #
+# Stages are cached by content under $WRP_CACHE_DIR (default
+# ~/.cache/wrpbypass-live): the extracted ISO tree and root filesystem are
+# keyed on the ISO hash, the repacked squashfs on ISO + binary + unit hashes
+# and compression settings, so unchanged stages are skipped. The ISO hash
+# itself is cached by path, size and mtime. The cached root filesystem is
+# never modified: the helper is installed into an overlay on top of it.
+# Only the most recently used entries of each stage are kept.
+#
+# Environment:
+#   WRP_CACHE_DIR        cache location
+#   WRP_CACHE_KEEP       entries kept per stage (default: 2, 0 = never prune)
+#   SQUASHFS_COMP        mksquashfs compressor (default: mksquashfs default, gzip)
+#   SQUASHFS_COMP_OPTS   extra compressor options (e.g. "-Xcompression-level 19")
+#   SQUASHFS_BLOCK_SIZE  block size (default: mksquashfs default, 128K)
+#   SQUASHFS_PROCESSORS  mksquashfs threads (default: all CPUs)
+#
 # Requires: squashfs-tools, xorriso, rsync
 
 set -euo pipefail
@@ -13,9 +29,18 @@ if [[ "$(id -u)" -ne 0 ]]; then
   exit 1
 fi
 
+SCRIPT_DIR=$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)
+
 ISO_IN=${1:-debian-live-13.3.0-amd64-standard.iso}
 WRP_BIN=${2:-./wrpbypass_deb}
 ISO_OUT=${3:-debian-live-13.3.0-amd64-wrpbypass.iso}
+UNIT_FILE=${UNIT_FILE:-$SCRIPT_DIR/wrpbypass-deb.service}
+CACHE_DIR=${WRP_CACHE_DIR:-${XDG_CACHE_HOME:-$HOME/.cache}/wrpbypass-live}
+CACHE_KEEP=${WRP_CACHE_KEEP:-2}
+SQUASHFS_COMP=${SQUASHFS_COMP:-}
+SQUASHFS_COMP_OPTS=${SQUASHFS_COMP_OPTS:-}
+SQUASHFS_BLOCK_SIZE=${SQUASHFS_BLOCK_SIZE:-}
+SQUASHFS_PROCESSORS=${SQUASHFS_PROCESSORS:-$(nproc)}
 
 if [[ ! -f "$ISO_IN" ]]; then
   echo "[!] Input ISO not found: $ISO_IN"
@@ -28,6 +53,11 @@ if [[ ! -f "$WRP_BIN" ]]; then
   exit 1
 fi
 
+if [[ ! -f "$UNIT_FILE" ]]; then
+  echo "[!] systemd unit not found: $UNIT_FILE"
+  exit 1
+fi
+
 for cmd in unsquashfs mksquashfs xorriso rsync; do
   if ! command -v "$cmd" >/dev/null 2>&1; then
     echo "[!] Required tool '$cmd' not found. Install 'squashfs-tools', 'xorriso', 'rsync'."
@@ -35,58 +65,182 @@ for cmd in unsquashfs mksquashfs xorriso rsync; do
   fi
 done
 
-WORKDIR=$(mktemp -d -t wrpbypass_live_XXXX)
-ISO_DIR="$WORKDIR/iso"
-MNT="$WORKDIR/mnt"
-SQUASH_DIR="$WORKDIR/squashfs-root"
+# ---------------------------------------------------------------------------
+# Stage timing
+# ---------------------------------------------------------------------------
+
+declare -a TIMINGS=()
+STAGE_NAME=""
+STAGE_START=0
+
+stage() {
+  stage_end
+  STAGE_NAME=$1
+  STAGE_START=$(date +%s.%N)
+  echo "[*] $STAGE_NAME..."
+}
+
+stage_end() {
+  if [[ -n "$STAGE_NAME" ]]; then
+    local elapsed
+    elapsed=$(awk -v a="$STAGE_START" -v b="$(date +%s.%N)" 'BEGIN { printf "%.1f", b - a }')
+    TIMINGS+=("$(printf '%-28s %8ss' "$STAGE_NAME" "$elapsed")")
+    STAGE_NAME=""
+  fi
+}
+
+sha256() {
+  sha256sum "$1" | cut -d' ' -f1
+}
+
+# Keep the $CACHE_KEEP most recently used entries of a cache stage (entries
+# are touched when used), plus anything still being written.
+prune_cache() {
+  local dir=$1 keep=$2
+  [[ "$keep" -gt 0 ]] || return 0
+  find "$dir" -mindepth 1 -maxdepth 1 ! -name '*.tmp' -printf '%T@ %p\n' \
+    | sort -rn | tail -n +"$((keep + 1))" | cut -d' ' -f2- \
+    | while IFS= read -r old; do
+        echo "    pruning $old"
+        rm -rf -- "$old"
+      done
+}
+
+# ---------------------------------------------------------------------------
+# Cache keys
+# ---------------------------------------------------------------------------
+
+mkdir -p "$CACHE_DIR/iso-hash" "$CACHE_DIR/iso" "$CACHE_DIR/rootfs" "$CACHE_DIR/squashfs"
+
+stage "Hashing inputs"
+# Hashing a multi-GB ISO is itself slow: remember it per (path, size, mtime).
+ISO_STAT=$(stat -c '%s:%Y' "$ISO_IN")
+ISO_STAT_KEY=$(printf '%s:%s' "$(realpath "$ISO_IN")" "$ISO_STAT" | sha256sum | cut -d' ' -f1)
+if [[ -f "$CACHE_DIR/iso-hash/$ISO_STAT_KEY" ]]; then
+  ISO_HASH=$(cat "$CACHE_DIR/iso-hash/$ISO_STAT_KEY")
+  echo "    ISO hash (cached): $ISO_HASH"
+else
+  ISO_HASH=$(sha256 "$ISO_IN")
+  echo "$ISO_HASH" > "$CACHE_DIR/iso-hash/$ISO_STAT_KEY"
+  echo "    ISO hash: $ISO_HASH"
+fi
+BIN_HASH=$(sha256 "$WRP_BIN")
+UNIT_HASH=$(sha256 "$UNIT_FILE")
+SQUASH_KEY=$(printf 'iso=%s bin=%s unit=%s comp=%s opts=%s block=%s' \
+  "$ISO_HASH" "$BIN_HASH" "$UNIT_HASH" \
+  "$SQUASHFS_COMP" "$SQUASHFS_COMP_OPTS" "$SQUASHFS_BLOCK_SIZE" | sha256sum | cut -d' ' -f1)
 
-echo "[*] Working directory: $WORKDIR"
-mkdir -p "$ISO_DIR" "$MNT"
+ISO_DIR="$CACHE_DIR/iso/$ISO_HASH"
+SQUASH_DIR="$CACHE_DIR/rootfs/$ISO_HASH"
+SQUASHFS="$CACHE_DIR/squashfs/$SQUASH_KEY.squashfs"
 
-echo "[*] Mounting original ISO..."
-mount -o loop "$ISO_IN" "$MNT"
+echo "[*] Cache: $CACHE_DIR"
 
-echo "[*] Copying ISO contents..."
-rsync -aH --exclude=/live/filesystem.squashfs "$MNT/" "$ISO_DIR/"
-cp "$MNT/live/filesystem.squashfs" "$ISO_DIR/live/filesystem.squashfs"
+WORKDIR=$(mktemp -d -t wrpbypass_live_XXXX)
+MNT="$WORKDIR/mnt"
+STAGING="$WORKDIR/rootfs"
 
-umount "$MNT"
-rmdir "$MNT"
+cleanup() {
+  for dir in "$STAGING" "$MNT"; do
+    if [[ -d "$dir" ]] && mountpoint -q "$dir"; then
+      umount "$dir"
+    fi
+  done
+  rm -rf "$WORKDIR"
+}
+trap cleanup EXIT
 
-echo "[*] Unpacking SquashFS..."
-unsquashfs -d "$SQUASH_DIR" "$ISO_DIR/live/filesystem.squashfs"
+# ---------------------------------------------------------------------------
+# Stage 1: ISO tree + original squashfs (key: ISO hash)
+# ---------------------------------------------------------------------------
 
-echo "[*] Installing wrpbypass_deb into live system..."
-install -D -m 755 "$WRP_BIN" "$SQUASH_DIR/usr/local/sbin/wrpbypass_deb"
+if [[ -f "$ISO_DIR/.complete" ]]; then
+  echo "[=] ISO tree cached"
+else
+  stage "Copying ISO contents"
+  rm -rf "$ISO_DIR" "$ISO_DIR.tmp"
+  mkdir -p "$MNT" "$ISO_DIR.tmp"
+  mount -o loop,ro "$ISO_IN" "$MNT"
+  rsync -aH --exclude=/live/filesystem.squashfs "$MNT/" "$ISO_DIR.tmp/"
+  cp "$MNT/live/filesystem.squashfs" "$WORKDIR/filesystem.squashfs"
+  umount "$MNT"
+  touch "$ISO_DIR.tmp/.complete"
+  mv "$ISO_DIR.tmp" "$ISO_DIR"
+fi
 
-SERVICE_DIR="$SQUASH_DIR/etc/systemd/system"
-mkdir -p "$SERVICE_DIR" "$SQUASH_DIR/etc/systemd/system/multi-user.target.wants"
+# ---------------------------------------------------------------------------
+# Stage 2: unpacked root filesystem (key: ISO hash)
+# ---------------------------------------------------------------------------
 
-SERVICE_FILE="$SERVICE_DIR/wrpbypass-deb.service"
-cat > "$SERVICE_FILE" <<'EOF'
-[Unit]
-Description=wrpbypass_deb auto-run at boot
-After=multi-user.target
+if [[ -f "$SQUASH_DIR/.complete" ]]; then
+  echo "[=] Root filesystem cached"
+elif [[ ! -f "$SQUASHFS" ]]; then
+  stage "Unpacking SquashFS"
+  if [[ ! -f "$WORKDIR/filesystem.squashfs" ]]; then
+    mkdir -p "$MNT"
+    mount -o loop,ro "$ISO_IN" "$MNT"
+    cp "$MNT/live/filesystem.squashfs" "$WORKDIR/filesystem.squashfs"
+    umount "$MNT"
+  fi
+  rm -rf "$SQUASH_DIR" "$SQUASH_DIR.tmp"
+  unsquashfs -processors "$SQUASHFS_PROCESSORS" -d "$SQUASH_DIR.tmp" "$WORKDIR/filesystem.squashfs"
+  touch "$SQUASH_DIR.tmp/.complete"
+  mv "$SQUASH_DIR.tmp" "$SQUASH_DIR"
+fi
 
-[Service]
-Type=oneshot
-ExecStart=/usr/local/sbin/wrpbypass_deb
-StandardInput=tty
-StandardOutput=journal+console
-RemainAfterExit=yes
+# ---------------------------------------------------------------------------
+# Stage 3: repacked squashfs (key: ISO + binary + unit + compression)
+# ---------------------------------------------------------------------------
 
-[Install]
-WantedBy=multi-user.target
-EOF
+if [[ -f "$SQUASHFS" ]]; then
+  echo "[=] SquashFS cached ($SQUASH_KEY)"
+else
+  stage "Installing wrpbypass_deb"
+  # The cached root filesystem stays pristine for the next build: stage the
+  # helper in an overlay on top of it (or, without overlayfs, in a copy).
+  mkdir -p "$STAGING" "$WORKDIR/upper" "$WORKDIR/work"
+  if ! mount -t overlay overlay \
+      -o "lowerdir=$SQUASH_DIR,upperdir=$WORKDIR/upper,workdir=$WORKDIR/work" "$STAGING"; then
+    echo "[i] overlayfs not available, staging in a copy of the root filesystem"
+    cp -a --reflink=auto "$SQUASH_DIR/." "$STAGING/"
+  fi
+  SERVICE_DIR="$STAGING/etc/systemd/system"
+  install -D -m 755 "$WRP_BIN" "$STAGING/usr/local/sbin/wrpbypass_deb"
+  mkdir -p "$SERVICE_DIR/multi-user.target.wants"
+  install -m 644 "$UNIT_FILE" "$SERVICE_DIR/wrpbypass-deb.service"
+  ln -sf "../wrpbypass-deb.service" \
+    "$SERVICE_DIR/multi-user.target.wants/wrpbypass-deb.service"
+
+  SQUASHFS_ARGS=(-noappend -e .complete -processors "$SQUASHFS_PROCESSORS")
+  if [[ -n "$SQUASHFS_COMP" ]]; then
+    SQUASHFS_ARGS+=(-comp "$SQUASHFS_COMP")
+  fi
+  if [[ -n "$SQUASHFS_COMP_OPTS" ]]; then
+    # shellcheck disable=SC2206 # SQUASHFS_COMP_OPTS is a list of options
+    SQUASHFS_ARGS+=($SQUASHFS_COMP_OPTS)
+  fi
+  if [[ -n "$SQUASHFS_BLOCK_SIZE" ]]; then
+    SQUASHFS_ARGS+=(-b "$SQUASHFS_BLOCK_SIZE")
+  fi
 
-ln -sf "../wrpbypass-deb.service" \
-  "$SQUASH_DIR/etc/systemd/system/multi-user.target.wants/wrpbypass-deb.service"
+  stage "Repacking SquashFS (${SQUASHFS_COMP:-gzip}, ${SQUASHFS_BLOCK_SIZE:-128K})"
+  mksquashfs "$STAGING" "$SQUASHFS.tmp" "${SQUASHFS_ARGS[@]}"
+  mv "$SQUASHFS.tmp" "$SQUASHFS"
+  if mountpoint -q "$STAGING"; then
+    umount "$STAGING"
+  fi
+fi
+# Mark the entries of this build as most recently used (see prune_cache).
+touch "$CACHE_DIR/iso-hash/$ISO_STAT_KEY" "$ISO_DIR" "$SQUASHFS"
+if [[ -d "$SQUASH_DIR" ]]; then
+  touch "$SQUASH_DIR"
+fi
 
-echo "[*] Repacking SquashFS..."
-mv "$ISO_DIR/live/filesystem.squashfs" "$ISO_DIR/live/filesystem.squashfs.orig"
-mksquashfs "$SQUASH_DIR" "$ISO_DIR/live/filesystem.squashfs" -noappend
+# ---------------------------------------------------------------------------
+# Stage 4: ISO
+# ---------------------------------------------------------------------------
 
-echo "[*] Building new ISO..."
+stage "Building new ISO"
 xorriso -as mkisofs \
   -r -V "DEBIAN_LIVE_WRPBYPASS" \
   -o "$ISO_OUT" \
@@ -95,11 +249,24 @@ xorriso -as mkisofs \
   -c isolinux/boot.cat \
   -b isolinux/isolinux.bin \
      -no-emul-boot -boot-load-size 4 -boot-info-table \
-  "$ISO_DIR"
+  -m .complete \
+  -graft-points \
+  "$ISO_DIR" \
+  "/live/filesystem.squashfs=$SQUASHFS"
+
+stage "Pruning cache (keep $CACHE_KEEP)"
+for dir in iso rootfs squashfs; do
+  prune_cache "$CACHE_DIR/$dir" "$CACHE_KEEP"
+done
+# Hash records are tiny; keep plenty so re-used ISOs are not re-hashed.
+prune_cache "$CACHE_DIR/iso-hash" "$((CACHE_KEEP * 16))"
+stage_end
 
 echo "[+] Done."
 echo "[+] New ISO: $ISO_OUT"
 echo "[+] You can now write it to a USB stick (e.g. with 'dd' or Rufus)."
-
-rm -rf "$WORKDIR"
-
+echo "[i] Stage timings:"
+for line in "${TIMINGS[@]}"; do
+  echo "    $line"
+done
+echo "    $(printf '%-28s %8ss' "Total" "$SECONDS")"
@@ -1 +1,2 @@
-@pyinstaller -F wrpbypass.py --name Utilman --distpath dist 
\ No newline at end of file
+@pyinstaller -F wrpbypass.py --name Utilman --distpath dist 
+@pyinstaller -F wrpbypass_client.py --name wrpbypass-connect --distpath dist
\ No newline at end of file
@@ -0,0 +1,119 @@
+#!/usr/bin/env bash
+
+# Build the NTFS fixture image used by tests/test_ntfs_reader.py.
+#
+# The image is formatted with mkntfs and filled through ntfs-3g, and the
+# expected listings, sizes, MFT record numbers and SHA-256 hashes are
+# recorded from the ntfs-3g mount - so the built-in reader is checked
+# against independent implementations, not against its own writer. The
+# layout forces the structures the reader has to handle:
+#
+#   /big                 400 entries -> non-resident $INDEX_ALLOCATION (B-tree)
+#   /frag.bin            written into freed holes -> fragmented runlist
+#   /links/target.txt    40 hard links -> $ATTRIBUTE_LIST + extension records
+#   /sparse.bin          hole in the middle -> sparse run
+#
+# Usage (root, for the FUSE mount):
+#   sudo tests/fixtures/make_ntfs_fixtures.sh
+#
+# Requires: ntfs-3g (mkntfs, ntfs-3g), python3, gzip
+
+set -euo pipefail
+
+FIXTURE_DIR=$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)
+NAME=${NAME:-ntfs-small}
+IMG="$FIXTURE_DIR/$NAME.img"
+MNT=$(mktemp -d)
+
+cleanup() {
+  mountpoint -q "$MNT" && umount "$MNT"
+  rmdir "$MNT"
+  rm -f "$IMG"
+}
+trap cleanup EXIT
+
+if [[ $EUID -ne 0 ]]; then
+  echo "[!] Run as root (ntfs-3g mounts the image through FUSE)."
+  exit 1
+fi
+
+rm -f "$IMG"
+truncate -s 16M "$IMG"
+mkntfs -F -Q -q -c 4096 -L wrp-fixture "$IMG"
+ntfs-3g "$IMG" "$MNT"
+
+echo "[+] Writing fixture content"
+mkdir -p "$MNT/Windows/System32" "$MNT/Windows/servicing/Version/10.0.22621.2428"
+head -c 131072 /dev/urandom > "$MNT/Windows/System32/Utilman.exe"
+echo "fixture" > "$MNT/Ünïcödé name.txt"
+
+mkdir "$MNT/big"
+for i in $(seq -w 0 399); do
+  echo "entry $i" > "$MNT/big/file-$i.txt"
+done
+
+# Fill the volume with small files, free every other one and write a large
+# file into the holes.
+mkdir "$MNT/holes"
+for i in $(seq -w 0 63); do
+  head -c 16384 /dev/urandom > "$MNT/holes/h$i"
+done
+sync
+for i in $(seq -w 0 2 63); do
+  rm "$MNT/holes/h$i"
+done
+sync
+head -c 393216 /dev/urandom > "$MNT/frag.bin"
+
+mkdir "$MNT/links"
+echo "linked" > "$MNT/links/target.txt"
+for i in $(seq -w 1 40); do
+  ln "$MNT/links/target.txt" "$MNT/links/hard-link-with-a-rather-long-name-$i.txt"
+done
+
+head -c 4096 /dev/urandom > "$MNT/sparse.bin"
+truncate -s 1048576 "$MNT/sparse.bin"
+head -c 4096 /dev/urandom | dd of="$MNT/sparse.bin" bs=4096 seek=255 conv=notrunc status=none
+sync
+
+echo "[+] Recording expected values from the ntfs-3g mount"
+python3 - "$MNT" > "$FIXTURE_DIR/$NAME.expected.json" <<'EOF'
+import hashlib, json, os, sys
+
+root = sys.argv[1]
+dirs, files = {}, {}
+for path, dirnames, filenames in os.walk(root):
+    rel = "/" + os.path.relpath(path, root).replace(os.sep, "/").lstrip("./")
+    dirs[rel] = sorted(dirnames + filenames)
+    for name in filenames:
+        full = os.path.join(path, name)
+        with open(full, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        st = os.stat(full)
+        files[(rel.rstrip("/") + "/" + name)] = {
+            "size": st.st_size,
+            "record": st.st_ino,
+            "sha256": digest,
+        }
+json.dump(
+    {
+        "label": "wrp-fixture",
+        "dirs": dirs,
+        "files": files,
+        "features": {
+            "index_allocation": "/big",
+            "fragmented": "/frag.bin",
+            "attribute_list": "/links/target.txt",
+            "sparse": "/sparse.bin",
+        },
+    },
+    sys.stdout,
+    indent=1,
+    sort_keys=True,
+    ensure_ascii=False,
+)
+EOF
+
+umount "$MNT"
+gzip -9nc "$IMG" > "$FIXTURE_DIR/$NAME.img.gz"
+echo "[+] Wrote $FIXTURE_DIR/$NAME.img.gz and $NAME.expected.json"
@@ -0,0 +1,203 @@
+"""
+Tests for the session cache (_SessionCache) and the background prefetch
+(_Prefetcher), driven through the simulated `net` backend.
+
+    python3 -m pytest tests
+"""
+import subprocess
+import threading
+import time
+import unittest
+from unittest import mock
+
+from wrp_support import simulated, wrpbypass as wrp
+
+ARGS = ["net", "user"]
+
+
+def result(returncode: int = 0) -> subprocess.CompletedProcess:
+    return subprocess.CompletedProcess(ARGS, returncode, "out", "")
+
+
+def wait_for(predicate, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached")
+        time.sleep(0.01)
+
+
+class CountingLoader:
+    def __init__(self, returncode: int = 0, delay: float = 0.0):
+        self.returncode = returncode
+        self.delay = delay
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        time.sleep(self.delay)
+        return result(self.returncode)
+
+
+class SessionCacheTests(unittest.TestCase):
+    def test_ttl_and_stale_after(self):
+        cache = wrp._SessionCache(ttl=0.3, stale_after=0.1)
+        loader = CountingLoader()
+        cache.get(ARGS, loader)
+        self.assertFalse(cache.is_stale(ARGS))
+
+        time.sleep(0.15)
+        # Stale, but still served from the cache until the TTL runs out.
+        self.assertTrue(cache.is_stale(ARGS))
+        self.assertIsNotNone(cache.peek(ARGS))
+        cache.get(ARGS, loader)
+        self.assertEqual(loader.calls, 1)
+
+        time.sleep(0.2)
+        self.assertIsNone(cache.age(ARGS))
+        self.assertIsNone(cache.peek(ARGS))
+        self.assertFalse(cache.is_stale(ARGS))
+        cache.get(ARGS, loader)
+        self.assertEqual(loader.calls, 2)
+
+    def test_force_reloads(self):
+        cache = wrp._SessionCache()
+        loader = CountingLoader()
+        cache.get(ARGS, loader)
+        cache.get(ARGS, loader, force=True)
+        self.assertEqual(loader.calls, 2)
+
+    def test_failures_are_not_cached(self):
+        cache = wrp._SessionCache()
+        loader = CountingLoader(returncode=2)
+        cache.get(ARGS, loader)
+        cache.get(ARGS, loader)
+        self.assertEqual(loader.calls, 2)
+        self.assertIsNone(cache.peek(ARGS))
+
+    def test_concurrent_requests_share_one_load(self):
+        cache = wrp._SessionCache()
+        loader = CountingLoader(delay=0.1)
+        threads = [threading.Thread(target=cache.get, args=(ARGS, loader)) for _ in range(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(loader.calls, 1)
+
+    def test_invalidate_during_a_load_drops_its_result(self):
+        cache = wrp._SessionCache()
+        loader = CountingLoader(delay=0.1)
+        loading = threading.Thread(target=cache.get, args=(ARGS, loader))
+        loading.start()
+        wait_for(lambda: loader.calls == 1)
+        cache.invalidate()
+        loading.join()
+        self.assertIsNone(cache.peek(ARGS))
+
+
+class CacheConfigTests(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(wrp, "_SESSION_CACHE", wrp._SessionCache())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def quiet(self, func, *args):
+        with wrp._CapturedOutput():
+            return func(*args)
+
+    def test_cached_commands_reuse_results(self):
+        with simulated() as backend:
+            self.quiet(wrp.run_command, ARGS, True)
+            self.quiet(wrp.run_command, ARGS, True)
+        self.assertEqual(backend.calls, 1)
+
+    def test_writes_invalidate_the_cache(self):
+        with simulated() as backend:
+            self.quiet(wrp.run_command, ARGS, True)
+            self.quiet(wrp.run_command, ["net", "user", "bob", "/add"])
+            self.quiet(wrp.run_command, ARGS, True)
+        self.assertEqual(backend.calls, 3)
+
+    def test_cache_ttl_0_turns_caching_and_prefetch_off(self):
+        wrp._SESSION_CACHE.ttl = 0
+        prefetch = wrp._Prefetcher()
+        with simulated() as backend:
+            self.quiet(wrp.run_command, ARGS, True)
+            self.quiet(wrp.run_command, ARGS, True)
+            prefetch.start()
+            self.assertFalse(prefetch.running)
+            self.assertIsNone(wrp._session_cache_status())
+        self.assertEqual(backend.calls, 2)
+
+
+class PrefetchTests(unittest.TestCase):
+    def setUp(self):
+        self.cache = wrp._SessionCache()
+        self.prefetch = wrp._Prefetcher()
+        for name, value in (("_SESSION_CACHE", self.cache), ("_PREFETCH", self.prefetch)):
+            patcher = mock.patch.object(wrp, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_fills_the_cache(self):
+        with simulated("latency=0,jitter=0,users=5") as backend:
+            self.prefetch.start()
+            wait_for(lambda: not self.prefetch.running)
+            self.assertEqual(backend.calls, len(wrp.PREFETCH_COMMANDS) + 5)
+            for cmd in wrp.PREFETCH_COMMANDS + [["net", "user", "user00004"]]:
+                self.assertIsNotNone(self.cache.peek(cmd), cmd)
+            # The first menu action is served from the cache.
+            with wrp._CapturedOutput():
+                wrp.run_command(ARGS, cached=True)
+            self.assertEqual(backend.calls, len(wrp.PREFETCH_COMMANDS) + 5)
+
+    def test_only_one_prefetch_at_a_time(self):
+        with simulated("latency=0.05,jitter=0,users=5") as backend:
+            self.prefetch.start()
+            self.prefetch.start()
+            wait_for(lambda: not self.prefetch.running)
+        self.assertEqual(backend.calls, len(wrp.PREFETCH_COMMANDS) + 5)
+
+    def test_cancel_stops_before_the_next_call(self):
+        with simulated("latency=0.05,jitter=0,users=20") as backend:
+            self.prefetch.start()
+            wait_for(lambda: backend.calls == 1)
+            self.prefetch.cancel()
+            wait_for(lambda: not self.prefetch.running)
+        self.assertEqual(backend.calls, 1)
+        # The call in flight when cancelled still completes and is kept.
+        self.assertIsNotNone(self.cache.peek(wrp.PREFETCH_COMMANDS[0]))
+
+    def test_a_write_cancels_the_prefetch_and_drops_its_result(self):
+        with simulated("latency=0.1,jitter=0,users=20") as backend:
+            self.prefetch.start()
+            wait_for(lambda: backend.inflight == 1)
+            with wrp._CapturedOutput():
+                wrp.run_command(["net", "user", "bob", "/add"])
+            wait_for(lambda: not self.prefetch.running)
+        self.assertEqual(backend.calls, 2)
+        self.assertIsNone(self.cache.peek(wrp.PREFETCH_COMMANDS[0]))
+
+    def test_restarts_after_a_cancel(self):
+        with simulated("latency=0,jitter=0,users=5") as backend:
+            self.prefetch.cancel()
+            self.prefetch.start()
+            wait_for(lambda: not self.prefetch.running)
+        self.assertEqual(backend.calls, len(wrp.PREFETCH_COMMANDS) + 5)
+
+    def test_status_line_starts_and_reports_the_prefetch(self):
+        self.cache.stale_after = 0.1
+        with simulated("latency=0,jitter=0,users=5"):
+            self.assertIsNone(self.cache.age(ARGS))
+            wrp._session_cache_status()
+            wait_for(lambda: not self.prefetch.running)
+            self.assertIn("cached 00:00 ago", wrp._session_cache_status())
+            time.sleep(0.15)
+            self.assertIn("stale, refreshing", wrp._session_cache_status())
+            wait_for(lambda: not self.prefetch.running)
+            self.assertFalse(self.cache.is_stale(ARGS))
+
+
+if __name__ == "__main__":
+    unittest.main()
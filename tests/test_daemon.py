@@ -0,0 +1,172 @@
+"""
+Tests for the daemon (`wrpbypass serve`) and its thin client.
+
+    python3 -m pytest tests
+"""
+import ctypes
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from multiprocessing.connection import Connection
+from unittest import mock
+
+import wrpbypass_client
+from wrp_support import ROOT, simulated, wrpbypass as wrp
+
+KEY = b"0123456789abcdef"
+
+
+def _loads_prompt_toolkit(code: str) -> bool:
+    probe = f"import sys; {code}; print('prompt_toolkit' in sys.modules)"
+    out = subprocess.run(
+        [sys.executable, "-c", probe], cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    return out.stdout.strip() == "True"
+
+
+class ImportCostTests(unittest.TestCase):
+    def test_client_does_not_load_prompt_toolkit(self):
+        self.assertFalse(_loads_prompt_toolkit("import wrpbypass_client"))
+
+    def test_cli_module_loads_prompt_toolkit_lazily(self):
+        self.assertFalse(_loads_prompt_toolkit("import wrpbypass"))
+        self.assertTrue(_loads_prompt_toolkit("import wrpbypass; wrpbypass._style()"))
+
+
+
+@unittest.skipIf(os.name == "nt", "uses a Unix socket")
+class ServerTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.address = os.path.join(tmp.name, "wrpbypass.sock")
+        self.server = wrp._RpcServer(self.address, KEY, handshake_timeout=0.5)
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(thread.join, 5)
+        self.addCleanup(self.server.request_stop)
+
+    def ping(self, key: bytes = KEY) -> dict:
+        return wrpbypass_client.rpc_call(self.address, key, "ping", {})
+
+    def test_ping(self):
+        self.assertEqual(self.ping()["version"], wrp.VERSION)
+
+    def test_wrong_key_is_rejected(self):
+        with self.assertRaises(wrpbypass_client.RpcError):
+            self.ping(b"not the key")
+
+    def test_silent_client_does_not_block_others(self):
+        silent = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.addCleanup(silent.close)
+        silent.connect(self.address)
+        started = time.monotonic()
+        self.assertEqual(self.ping()["pid"], os.getpid())
+        self.assertLess(time.monotonic() - started, 0.4)
+
+    def test_silent_client_is_dropped_after_the_timeout(self):
+        silent = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.addCleanup(silent.close)
+        silent.connect(self.address)
+        silent.settimeout(5)
+        silent.recv(1024)  # the server's challenge
+        self.assertEqual(silent.recv(1024), b"")
+
+    def test_half_sent_answer_times_out(self):
+        silent = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.addCleanup(silent.close)
+        silent.connect(self.address)
+        silent.settimeout(5)
+        silent.recv(1024)
+        silent.sendall(b"\x00\x00\x00\x40partial")
+        self.assertEqual(silent.recv(1024), b"")
+
+
+
+@unittest.skipIf(os.name == "nt", "uses a Unix socket")
+class PeerCheckTests(unittest.TestCase):
+    def setUp(self):
+        ours, theirs = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.addCleanup(theirs.close)
+        self.conn = Connection(ours.detach())
+        self.addCleanup(self.conn.close)
+
+    @unittest.skipUnless(hasattr(socket, "SO_PEERCRED"), "Linux only")
+    def test_same_user_is_allowed(self):
+        self.assertEqual(wrp._peer_uid(self.conn.fileno()), os.getuid())
+        self.assertTrue(wrp._peer_allowed(self.conn))
+
+    def test_getpeereid_fallback(self):
+        with mock.patch.dict(socket.__dict__):
+            socket.__dict__.pop("SO_PEERCRED", None)
+            uid = wrp._peer_uid(self.conn.fileno())
+            allowed = wrp._peer_allowed(self.conn)
+        if hasattr(ctypes.CDLL(None), "getpeereid"):
+            self.assertEqual(uid, os.getuid())
+            self.assertTrue(allowed)
+        else:  # glibc: no way to identify the peer, so refuse it
+            self.assertIsNone(uid)
+            self.assertFalse(allowed)
+
+
+@unittest.skipIf(os.name == "nt", "uses a Unix socket")
+class StaleSocketTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.address = os.path.join(tmp.name, "wrpbypass.sock")
+
+    def serve(self) -> int:
+        args = wrp.build_parser().parse_args(["serve", "--address", self.address])
+        return wrp.cmd_serve(args)
+
+    def test_live_daemon_is_left_alone(self):
+        # A daemon started with another key still owns the socket.
+        self.assertNotEqual(wrp._serve_authkey(create=True), KEY)
+        server = wrp._RpcServer(self.address, KEY)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            result = []
+            probe = threading.Thread(target=lambda: result.append(self.serve()), daemon=True)
+            probe.start()
+            probe.join(5)
+            self.assertEqual(result, [1])
+            self.assertTrue(os.path.exists(self.address))
+            pong = wrpbypass_client.rpc_call(self.address, KEY, "ping", {})
+            self.assertEqual(pong["version"], wrp.VERSION)
+        finally:
+            server.request_stop()
+            thread.join(5)
+
+    def test_stale_socket_is_replaced(self):
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(self.address)
+        stale.close()  # leaves the file behind; connecting is refused
+
+        result = []
+        with simulated():
+            thread = threading.Thread(target=lambda: result.append(self.serve()), daemon=True)
+            thread.start()
+            deadline = time.monotonic() + 5
+            while True:
+                try:
+                    key = wrpbypass_client.read_authkey(wrp.DATA_DIR)
+                    wrpbypass_client.rpc_call(self.address, key, "ping", {})
+                    break
+                except wrpbypass_client.RpcError:
+                    if time.monotonic() > deadline:
+                        raise
+                    time.sleep(0.05)
+            wrpbypass_client.rpc_call(self.address, key, "shutdown", {})
+            thread.join(5)
+        self.assertEqual(result, [0])
+
+
+if __name__ == "__main__":
+    unittest.main()
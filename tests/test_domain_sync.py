@@ -0,0 +1,233 @@
+"""
+Tests for the incremental domain sync (_DomainSync): uSNChanged and
+invocationId high-water mark, tombstoneLifetime-triggered full resync, and
+parsing of the ADSI (PowerShell) query output.
+
+    python3 -m pytest tests
+"""
+import contextlib
+import json
+import os
+import subprocess
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest import mock
+
+from wrp_support import wrpbypass as wrp
+
+ALICE = "5f0c8d3e-0000-0000-0000-000000000001"
+BOB = "5f0c8d3e-0000-0000-0000-000000000002"
+CAROL = "5f0c8d3e-0000-0000-0000-000000000003"
+
+ADSI_OUTPUT = (
+    "#\tdc1.corp.example\t2b1a6e1c-9f0e-4c1e-8d7a-0a1b2c3d4e5f\t20500\t180\r\n"
+    f"{ALICE.upper()}\t20411\t0\talice\r\n"
+    "\r\n"
+    f"{BOB}\t20498\t1\tbob\r\n"
+    f"{CAROL}\t\t0\tcarol\r\n"
+)
+
+
+class CannedBackend:
+    """Backend answering every command with fixed output."""
+
+    def __init__(self, stdout: str = "", returncode: int = 0, stderr: str = ""):
+        self.result = (returncode, stdout, stderr)
+        self.calls = []
+
+    def run(self, args):
+        self.calls.append(args)
+        return subprocess.CompletedProcess(args, *self.result)
+
+
+class ParseSyncOutputTests(unittest.TestCase):
+    def test_header_and_rows(self):
+        batch = wrp._parse_sync_output(ADSI_OUTPUT)
+        self.assertEqual(batch.server, "dc1.corp.example")
+        self.assertEqual(batch.invocation, "2b1a6e1c-9f0e-4c1e-8d7a-0a1b2c3d4e5f")
+        self.assertEqual(batch.usn, 20500)
+        self.assertEqual(batch.tombstone_days, 180)
+        self.assertEqual(
+            batch.rows,
+            [
+                (ALICE, 20411, False, "alice"),
+                (BOB, 20498, True, "bob"),
+                (CAROL, 0, False, "carol"),
+            ],
+        )
+
+    def test_tombstone_lifetime_defaults(self):
+        for header in ("#\tdc1\tinv\t10", "#\tdc1\tinv\t10\t0", "#\tdc1\tinv\t10\t"):
+            with self.subTest(header=header):
+                batch = wrp._parse_sync_output(header + "\n")
+                self.assertEqual(batch.tombstone_days, wrp.TOMBSTONE_LIFETIME_DAYS)
+
+    def test_rows_before_the_header_are_ignored(self):
+        batch = wrp._parse_sync_output(f"{ALICE}\t1\t0\talice\n#\tdc1\tinv\t10\t60\n")
+        self.assertEqual(batch.rows, [])
+
+    def test_no_header(self):
+        self.assertIsNone(wrp._parse_sync_output(""))
+        self.assertIsNone(wrp._parse_sync_output(f"{ALICE}\t1\t0\talice\n"))
+
+
+class AdsiSourceTests(unittest.TestCase):
+    def fetch(self, backend, since, server):
+        previous = wrp.set_backend(backend)
+        try:
+            with wrp._CapturedOutput() as out, contextlib.redirect_stderr(out.stderr):
+                batch = wrp._AdsiSyncSource().fetch(since, server)
+        finally:
+            wrp.set_backend(previous)
+        return batch, out.stderr.getvalue()
+
+    def test_query_and_parse(self):
+        backend = CannedBackend(ADSI_OUTPUT)
+        batch, _ = self.fetch(backend, 20001, "dc1.corp.example")
+        self.assertEqual(batch.usn, 20500)
+        script = backend.calls[0][-1]
+        self.assertIn("$server = 'dc1.corp.example'", script)
+        self.assertIn("$since = 20001", script)
+        self.assertIn(f"$tsl = {wrp.TOMBSTONE_LIFETIME_DAYS}", script)
+
+    def test_unsafe_server_name_is_dropped(self):
+        backend = CannedBackend(ADSI_OUTPUT)
+        self.fetch(backend, 0, "dc1'; Remove-Item C:\\ -Recurse; '")
+        self.assertIn("$server = ''", backend.calls[0][-1])
+
+    def test_failure(self):
+        backend = CannedBackend(returncode=2, stderr="System error 8453 has occurred.")
+        batch, stderr = self.fetch(backend, 0, None)
+        self.assertIsNone(batch)
+        self.assertIn("System error 8453", stderr)
+
+
+class DomainSyncTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        self.standin = self.dir / "ldap.json"
+        self.dc = {
+            "server": "dc1",
+            "invocation": "inv-1",
+            "highest_usn": 100,
+            "tombstone_lifetime": 180,
+            "objects": [
+                {"guid": ALICE, "name": "alice", "usn": 50},
+                {"guid": BOB, "name": "bob", "usn": 60},
+            ],
+        }
+        self.write_dc()
+        for patcher in (
+            mock.patch.object(wrp, "DOMAIN_SYNC_FILE", self.dir / "domain_sync.json"),
+            mock.patch.dict(os.environ, {"WRP_LDAP_STANDIN": str(self.standin)}),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.sync = wrp._DomainSync()
+
+    def write_dc(self) -> None:
+        self.standin.write_text(json.dumps(self.dc), encoding="utf-8")
+
+    def change(self, guid: str, usn: int, name: str = "", deleted: bool = False) -> None:
+        self.dc["objects"] = [o for o in self.dc["objects"] if o["guid"] != guid]
+        self.dc["objects"].append({"guid": guid, "name": name, "usn": usn, "deleted": deleted})
+        self.dc["highest_usn"] = max(self.dc["highest_usn"], usn)
+        self.write_dc()
+
+    def saved_state(self) -> dict:
+        return json.loads(wrp.DOMAIN_SYNC_FILE.read_text(encoding="utf-8"))
+
+    def age_state(self, days: int) -> None:
+        state = self.saved_state()
+        synced = datetime.now() - timedelta(days=days)
+        state["synced_at"] = synced.isoformat(timespec="seconds")
+        wrp.DOMAIN_SYNC_FILE.write_text(json.dumps(state), encoding="utf-8")
+        self.sync = wrp._DomainSync()  # a new process reads the file
+
+    def test_full_then_incremental(self):
+        stats = self.sync.sync()
+        self.assertEqual((stats["mode"], stats["total"], stats["usn"]), ("full", 2, 100))
+
+        self.change(ALICE, 101, "alice2")
+        self.change(BOB, 102, "bob", deleted=True)
+        self.change(CAROL, 103, "carol")
+        stats = self.sync.sync()
+        self.assertEqual(stats["mode"], "incremental")
+        self.assertEqual((stats["fetched"], stats["changes"], stats["total"]), (3, 3, 2))
+        self.assertEqual(self.saved_state()["users"], {ALICE: "alice2", CAROL: "carol"})
+        self.assertEqual(self.saved_state()["usn"], 103)
+
+    def test_incremental_asks_only_above_the_mark(self):
+        self.sync.sync()
+        self.change(CAROL, 100, "carol")  # already covered by the mark
+        stats = self.sync.sync()
+        self.assertEqual((stats["mode"], stats["fetched"], stats["changes"]), ("incremental", 0, 0))
+
+    def test_mark_is_merged_across_processes(self):
+        self.sync.sync()
+        self.change(CAROL, 101, "carol")
+        stats = wrp._DomainSync().sync()
+        self.assertEqual((stats["mode"], stats["changes"], stats["total"]), ("incremental", 1, 3))
+
+    def test_new_invocation_id_forces_full_resync(self):
+        self.sync.sync()
+        self.dc["invocation"] = "inv-2"  # DC restored from backup
+        self.change(CAROL, 101, "carol")
+        stats = self.sync.sync()
+        self.assertEqual((stats["mode"], stats["total"]), ("full", 3))
+        self.assertEqual(self.saved_state()["invocation"], "inv-2")
+
+    def test_other_server_forces_full_resync(self):
+        self.sync.sync()
+        self.dc["server"] = "dc2"
+        self.write_dc()
+        self.assertEqual(self.sync.sync()["mode"], "full")
+
+    def test_usn_going_backwards_forces_full_resync(self):
+        self.sync.sync()
+        self.dc["highest_usn"] = 90
+        self.write_dc()
+        self.assertEqual(self.sync.sync()["mode"], "full")
+
+    def test_mark_older_than_tombstone_lifetime_forces_full_resync(self):
+        self.sync.sync()
+        self.assertEqual(self.saved_state()["tombstone_days"], 180)
+        self.age_state(days=179)
+        self.assertEqual(self.sync.sync()["mode"], "incremental")
+        self.age_state(days=180)
+        self.assertEqual(self.sync.sync()["mode"], "full")
+
+    def test_default_tombstone_lifetime(self):
+        del self.dc["tombstone_lifetime"]
+        self.write_dc()
+        self.sync.sync()
+        self.assertEqual(self.saved_state()["tombstone_days"], wrp.TOMBSTONE_LIFETIME_DAYS)
+        self.age_state(days=wrp.TOMBSTONE_LIFETIME_DAYS)
+        self.assertEqual(self.sync.sync()["mode"], "full")
+
+    def test_forced_full_sync(self):
+        self.sync.sync()
+        self.assertEqual(self.sync.sync(full=True)["mode"], "full")
+
+    def test_failed_fetch_keeps_the_snapshot(self):
+        self.sync.sync()
+        before = self.saved_state()
+        self.standin.write_text("not json", encoding="utf-8")
+        with wrp._CapturedOutput():
+            self.assertIsNone(self.sync.sync())
+        self.assertEqual(self.saved_state(), before)
+
+    def test_usernames_reuse_a_recent_snapshot(self):
+        self.assertEqual(self.sync.usernames(), ["alice", "bob"])
+        self.change(CAROL, 101, "Carol")
+        self.assertEqual(self.sync.usernames(), ["alice", "bob"])
+        with mock.patch.object(wrp._SESSION_CACHE, "ttl", 0):
+            self.assertEqual(self.sync.usernames(), ["alice", "bob", "Carol"])
+
+
+if __name__ == "__main__":
+    unittest.main()
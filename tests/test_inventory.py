@@ -0,0 +1,218 @@
+"""
+Tests for the account inventory: snapshots, `inventory diff` and the
+--since parser, driven through the simulated `net` backend.
+
+    python3 -m pytest tests
+"""
+import argparse
+import sqlite3
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest import mock
+
+from wrp_support import simulated, wrpbypass as wrp
+
+
+def diff_args(**kwargs) -> argparse.Namespace:
+    options = dict(host=None, domain=False, since=None, group=None)
+    options.update(kwargs)
+    return argparse.Namespace(**options)
+
+
+class InventoryTestCase(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.db = Path(tmp.name) / "inventory.db"
+        patcher = mock.patch.object(wrp, "INVENTORY_DB", self.db)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        wrp._SESSION_CACHE.invalidate()
+        self.addCleanup(wrp._SESSION_CACHE.invalidate)
+
+    def full_snapshot(self, users, memberships) -> int:
+        with mock.patch.object(wrp, "_collect_inventory", return_value=(users, memberships)):
+            return wrp.record_inventory_snapshot()
+
+    def run_cmd(self, func, args) -> tuple[int, list[str]]:
+        with wrp._CapturedOutput() as out:
+            rc = func(args)
+        text = out.stdout.getvalue() + out.stderr.getvalue()
+        return rc, [line.strip() for line in text.splitlines()]
+
+
+class SnapshotTests(InventoryTestCase):
+    def test_full_snapshot_enumerates_groups(self):
+        with simulated("latency=0,jitter=0,users=5") as backend:
+            snapshot_id = wrp.record_inventory_snapshot()
+        # net user, net localgroup, then one call per group
+        self.assertEqual(backend.calls, 4)
+        conn = sqlite3.connect(self.db)
+        try:
+            users = conn.execute(
+                "SELECT COUNT(*) FROM accounts WHERE snapshot_id = ?", (snapshot_id,)
+            ).fetchone()[0]
+            members = conn.execute(
+                "SELECT groupname, username FROM memberships WHERE snapshot_id = ? ORDER BY 1, 2",
+                (snapshot_id,),
+            ).fetchall()
+        finally:
+            conn.close()
+        self.assertEqual(users, 5)
+        self.assertEqual(
+            members,
+            [(g, f"user0000{i}") for g in ("Administrators", "Users") for i in range(3)],
+        )
+
+    def test_user_list_reuses_the_fetched_accounts(self):
+        with simulated("latency=0,jitter=0,users=5") as backend, mock.patch.object(
+            wrp, "INVENTORY_ENABLED", True
+        ):
+            rc, _ = self.run_cmd(wrp.cmd_user_list, argparse.Namespace(domain=False, view=False))
+        self.assertEqual(rc, 0)
+        self.assertEqual(backend.calls, 1)
+        conn = sqlite3.connect(self.db)
+        try:
+            rows = conn.execute(
+                "SELECT s.memberships, COUNT(a.username) FROM snapshots s "
+                "JOIN accounts a ON a.snapshot_id = s.id GROUP BY s.id"
+            ).fetchall()
+        finally:
+            conn.close()
+        self.assertEqual(rows, [(0, 5)])
+
+    def test_old_database_is_migrated(self):
+        conn = sqlite3.connect(self.db)
+        conn.execute(
+            "CREATE TABLE snapshots (id INTEGER PRIMARY KEY, taken_at TEXT NOT NULL, "
+            "host TEXT NOT NULL, scope TEXT NOT NULL)"
+        )
+        conn.execute("INSERT INTO snapshots VALUES (1, '2024-01-01 00:00:00', 'h', 'local')")
+        conn.commit()
+        conn.close()
+        conn = wrp._inventory_connect()
+        try:
+            self.assertEqual(
+                conn.execute("SELECT memberships FROM snapshots WHERE id = 1").fetchone(), (1,)
+            )
+        finally:
+            conn.close()
+
+
+class DiffTests(InventoryTestCase):
+    def test_accounts_and_memberships(self):
+        self.full_snapshot(["alice", "bob"], {"Administrators": ["alice"], "Users": ["bob"]})
+        self.full_snapshot(
+            ["alice", "carol"], {"Administrators": ["alice", "carol"], "Users": []}
+        )
+        rc, lines = self.run_cmd(wrp.cmd_inventory_diff, diff_args())
+        self.assertEqual(rc, 0)
+        self.assertEqual(
+            lines[1:],
+            [
+                "+ user carol",
+                "- user bob",
+                "+ carol joined Administrators",
+                "- bob left Users",
+            ],
+        )
+
+    def test_group_filter(self):
+        self.full_snapshot(["alice", "bob"], {"Administrators": ["alice"], "Users": ["bob"]})
+        self.full_snapshot(["alice", "bob"], {"Administrators": ["alice", "bob"], "Users": []})
+        _, lines = self.run_cmd(wrp.cmd_inventory_diff, diff_args(group="Admin*"))
+        self.assertEqual(lines[1:], ["+ bob joined Administrators"])
+
+    def test_no_changes(self):
+        self.full_snapshot(["alice"], {"Users": ["alice"]})
+        self.full_snapshot(["alice"], {"Users": ["alice"]})
+        _, lines = self.run_cmd(wrp.cmd_inventory_diff, diff_args())
+        self.assertEqual(lines[1:], ["(no changes)"])
+
+    def test_single_snapshot(self):
+        self.full_snapshot(["alice"], {})
+        rc, lines = self.run_cmd(wrp.cmd_inventory_diff, diff_args())
+        self.assertEqual(rc, 0)
+        self.assertEqual(lines, ["Only one snapshot available; nothing to compare."])
+
+    def test_accounts_only_snapshots_use_the_nearest_full_ones(self):
+        self.full_snapshot(["alice", "bob"], {"Users": ["alice"]})
+        wrp.record_inventory_snapshot(users=["alice", "bob", "carol"])
+        _, lines = self.run_cmd(wrp.cmd_inventory_diff, diff_args())
+        self.assertEqual(lines[1:], ["+ user carol"])
+
+        self.full_snapshot(["alice", "bob", "carol"], {"Users": ["alice", "carol"]})
+        wrp.record_inventory_snapshot(users=["alice", "carol"])
+        _, lines = self.run_cmd(wrp.cmd_inventory_diff, diff_args(since="2000-01-01"))
+        self.assertEqual(
+            lines[1:],
+            [
+                "+ user carol",
+                "- user bob",
+                "Group memberships: #1 to #3",
+                "+ carol joined Users",
+            ],
+        )
+
+    def test_since_picks_the_base_snapshot(self):
+        self.full_snapshot(["alice"], {})
+        self.full_snapshot(["alice", "bob"], {})
+        self.full_snapshot(["alice", "bob", "carol"], {})
+        conn = sqlite3.connect(self.db)
+        with conn:
+            conn.execute("UPDATE snapshots SET taken_at = '2024-01-01 00:00:00' WHERE id = 1")
+            conn.execute("UPDATE snapshots SET taken_at = '2024-02-01 00:00:00' WHERE id = 2")
+        conn.close()
+
+        _, lines = self.run_cmd(wrp.cmd_inventory_diff, diff_args(since="2024-01-15"))
+        self.assertTrue(lines[0].startswith("Changes from #1 "), lines[0])
+        self.assertEqual(lines[1:], ["+ user bob", "+ user carol"])
+
+        _, lines = self.run_cmd(wrp.cmd_inventory_diff, diff_args(since="2024-02-15"))
+        self.assertTrue(lines[0].startswith("Changes from #2 "), lines[0])
+        self.assertEqual(lines[1:], ["+ user carol"])
+
+        # Nothing that old: the oldest snapshot is the base.
+        _, lines = self.run_cmd(wrp.cmd_inventory_diff, diff_args(since="2020-01-01"))
+        self.assertTrue(lines[0].startswith("Changes from #1 "), lines[0])
+
+    def test_invalid_since(self):
+        self.full_snapshot(["alice"], {})
+        rc, lines = self.run_cmd(wrp.cmd_inventory_diff, diff_args(since="5m"))
+        self.assertEqual(rc, 1)
+        self.assertIn("Ambiguous --since value", lines[0])
+
+
+class ParseSinceTests(unittest.TestCase):
+    def assertAgo(self, value: str, delta: timedelta):
+        expected = datetime.now() - delta
+        parsed = datetime.fromisoformat(wrp._parse_since(value))
+        self.assertLessEqual(abs(parsed - expected), timedelta(seconds=2))
+
+    def test_relative(self):
+        self.assertAgo("90min", timedelta(minutes=90))
+        self.assertAgo("12h", timedelta(hours=12))
+        self.assertAgo("30d", timedelta(days=30))
+        self.assertAgo("2w", timedelta(weeks=2))
+        self.assertAgo("3mo", timedelta(days=90))
+        self.assertAgo(" 12 H ", timedelta(hours=12))
+
+    def test_absolute(self):
+        self.assertEqual(wrp._parse_since("2024-03-01"), "2024-03-01 00:00:00")
+        self.assertEqual(wrp._parse_since("2024-03-01 12:30"), "2024-03-01 12:30:00")
+        self.assertEqual(wrp._parse_since("2024-03-01T12:30:15"), "2024-03-01 12:30:15")
+
+    def test_bare_m_is_ambiguous(self):
+        with self.assertRaisesRegex(ValueError, "use 5min for minutes or 5mo for months"):
+            wrp._parse_since("5m")
+
+    def test_invalid(self):
+        for value in ("yesterday", "5y", "", "2024-13-01"):
+            with self.subTest(value=value), self.assertRaisesRegex(ValueError, "Invalid --since"):
+                wrp._parse_since(value)
+
+
+if __name__ == "__main__":
+    unittest.main()
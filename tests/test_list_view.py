@@ -0,0 +1,200 @@
+"""
+Tests for the model behind the virtualized list view (_ListView): filter,
+type-ahead jump, cursor movement and the rows windowed into the screen. The
+screen height is fixed per test, so no prompt_toolkit application is run.
+
+    python3 -m pytest tests
+"""
+import unittest
+from unittest import mock
+
+from wrp_support import wrpbypass as wrp
+
+NAMES = ["bob", "Alice", "carol", "admin", "Bill", "dave", "Administrator", "guest"]
+
+
+def make_view(names=NAMES, page_size: int = 3) -> "wrp._ListView":
+    view = wrp._ListView("Users", list(names))
+    view._page_size = lambda: page_size
+    return view
+
+
+def shown(view: "wrp._ListView") -> list[str]:
+    return [view.items[i] for i in view._filtered]
+
+
+def rows(fragments) -> list[tuple[str, str]]:
+    # Two header fragments, one row per screen line, then the footer.
+    return [(style, text.strip()) for style, text in fragments[2:-1]]
+
+
+class ModelTests(unittest.TestCase):
+    def test_sorted_case_insensitively(self):
+        view = make_view()
+        self.assertEqual(
+            view.items,
+            ["admin", "Administrator", "Alice", "Bill", "bob", "carol", "dave", "guest"],
+        )
+        self.assertEqual(view.selected(), "admin")
+
+    def test_move_is_clamped(self):
+        view = make_view()
+        view.move(-1)
+        self.assertEqual(view.cursor, 0)
+        view.move(3)
+        self.assertEqual(view.selected(), "Bill")
+        view.move(100)
+        self.assertEqual(view.selected(), "guest")
+
+    def test_empty_list(self):
+        view = make_view([])
+        view.move(1)
+        view.jump("a")
+        self.assertIsNone(view.selected())
+        self.assertEqual(view.cursor, 0)
+
+
+class FilterTests(unittest.TestCase):
+    def test_substring_case_insensitive(self):
+        view = make_view()
+        view.set_filter("AD")
+        self.assertEqual(shown(view), ["admin", "Administrator"])
+        view.set_filter("i")
+        self.assertEqual(shown(view), ["admin", "Administrator", "Alice", "Bill"])
+
+    def test_narrowing_and_widening(self):
+        view = make_view()
+        for text, expected in (
+            ("a", ["admin", "Administrator", "Alice", "carol", "dave"]),
+            ("ad", ["admin", "Administrator"]),
+            ("adm", ["admin", "Administrator"]),
+            ("a", ["admin", "Administrator", "Alice", "carol", "dave"]),
+            ("", NAMES),
+        ):
+            with self.subTest(filter=text):
+                view.set_filter(text)
+                self.assertEqual(sorted(shown(view)), sorted(expected))
+
+    def test_selection_is_kept_when_it_still_matches(self):
+        view = make_view()
+        view.move(6)
+        self.assertEqual(view.selected(), "dave")
+        view.set_filter("a")
+        self.assertEqual(view.selected(), "dave")
+        view.set_filter("adm")
+        self.assertEqual(view.selected(), "admin")
+
+    def test_no_matches(self):
+        view = make_view()
+        view.set_filter("zzz")
+        self.assertIsNone(view.selected())
+        view.set_filter("")
+        self.assertEqual(view.selected(), "admin")
+
+
+class JumpTests(unittest.TestCase):
+    def jump(self, view: "wrp._ListView", chars: str, at: float) -> None:
+        with mock.patch.object(wrp.time, "monotonic", return_value=at):
+            for char in chars:
+                view.jump(char)
+
+    def test_prefix_within_a_second(self):
+        view = make_view()
+        self.jump(view, "b", 100.0)
+        self.assertEqual(view.selected(), "Bill")
+        self.jump(view, "o", 100.5)
+        self.assertEqual(view.selected(), "bob")
+        self.jump(view, "X", 100.9)
+        # "box" matches nothing: lands on the next entry in order.
+        self.assertEqual(view.selected(), "carol")
+
+    def test_prefix_restarts_after_a_pause(self):
+        view = make_view()
+        self.jump(view, "ca", 100.0)
+        self.assertEqual(view.selected(), "carol")
+        self.jump(view, "d", 101.5)
+        self.assertEqual(view.selected(), "dave")
+
+    def test_past_the_end_selects_the_last(self):
+        view = make_view()
+        self.jump(view, "z", 100.0)
+        self.assertEqual(view.selected(), "guest")
+
+    def test_jump_within_the_filter(self):
+        view = make_view()
+        view.set_filter("a")
+        self.jump(view, "b", 100.0)
+        self.assertEqual(view.selected(), "carol")
+
+    def test_large_list(self):
+        names = [f"user{i:06d}" for i in range(200_000)]
+        view = make_view(names, page_size=20)
+        self.jump(view, "user123", 100.0)
+        self.assertEqual(view.selected(), "user123000")
+
+
+class RenderTests(unittest.TestCase):
+    def test_header_and_rows(self):
+        view = make_view()
+        fragments = view._render()
+        self.assertEqual(fragments[0][1], " Users: 8\n")
+        self.assertEqual(
+            rows(fragments),
+            [
+                ("class:menu-highlight", "admin"),
+                ("class:menu-text", "Administrator"),
+                ("class:menu-text", "Alice"),
+            ],
+        )
+        self.assertIn("/=filter", fragments[-1][1])
+
+    def test_window_follows_the_cursor(self):
+        view = make_view()
+        view.move(4)
+        self.assertEqual(
+            [name for _, name in rows(view._render())], ["Alice", "Bill", "bob"]
+        )
+        self.assertEqual(view.top, 2)
+        view.move(-1)
+        # Still on screen: the window does not move.
+        self.assertEqual(
+            [name for _, name in rows(view._render())], ["Alice", "Bill", "bob"]
+        )
+        view.move(-3)
+        self.assertEqual(
+            [name for _, name in rows(view._render())], ["admin", "Administrator", "Alice"]
+        )
+        self.assertEqual(view.top, 0)
+
+    def test_short_list_is_padded(self):
+        view = make_view(page_size=5)
+        view.set_filter("ad")
+        fragments = view._render()
+        self.assertEqual(fragments[0][1], " Users: 2 of 8   filter: ad\n")
+        self.assertEqual(
+            rows(fragments),
+            [
+                ("class:menu-highlight", "admin"),
+                ("class:menu-text", "Administrator"),
+                ("", ""),
+                ("", ""),
+                ("", ""),
+            ],
+        )
+
+    def test_filter_prompt(self):
+        view = make_view()
+        view.filtering = True
+        self.assertEqual(view._render()[0][1], " Users: 8   filter: _\n")
+
+    def test_only_the_visible_rows_are_formatted(self):
+        names = [f"user{i:06d}" for i in range(200_000)]
+        view = make_view(names, page_size=20)
+        view.move(150_000)
+        fragments = view._render()
+        self.assertEqual(len(fragments), 2 + 20 + 1)
+        self.assertEqual(rows(fragments)[-1], ("class:menu-highlight", "user150000"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,228 @@
+"""
+Tests for the read-only NTFS reader in wrpbypass_deb.py.
+
+Every run checks a synthetic image written by bench_deb.NtfsImageBuilder
+(multi-level $I30 B-tree, fragmented and sparse runlists, an attribute
+list with an extension record), compared with the content the test put in.
+Fixture images in tests/fixtures/*.img.gz, made with mkntfs/ntfs-3g (see
+make_ntfs_fixtures.sh), are checked too when present; their values were
+recorded from the ntfs-3g mount, not produced by the reader itself.
+
+    python3 -m pytest tests
+"""
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import wrpbypass_deb as deb  # noqa: E402
+from bench_deb import NtfsImageBuilder  # noqa: E402
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+
+
+class RunlistTests(unittest.TestCase):
+    def test_single_run(self):
+        # length 0x18 (1 byte), LCN 0x5634 (2 bytes)
+        self.assertEqual(deb._decode_runlist(bytes([0x21, 0x18, 0x34, 0x56, 0]), 0, 0),
+                         [(0, 0x5634, 0x18)])
+
+    def test_fragmented_runs_use_signed_relative_offsets(self):
+        data = bytes([0x21, 0x10, 0x00, 0x01,   # 16 clusters at 0x100
+                      0x11, 0x08, 0xF0,         # 8 clusters at 0x100 - 0x10
+                      0x21, 0x04, 0x00, 0x02,   # 4 clusters at 0xF0 + 0x200
+                      0x00])
+        self.assertEqual(deb._decode_runlist(data, 0, 0),
+                         [(0, 0x100, 16), (16, 0xF0, 8), (24, 0x2F0, 4)])
+
+    def test_sparse_run_keeps_lcn_base(self):
+        data = bytes([0x11, 0x04, 0x20, 0x01, 0x08, 0x11, 0x02, 0x10, 0x00])
+        self.assertEqual(deb._decode_runlist(data, 0, 5),
+                         [(5, 0x20, 4), (9, None, 8), (17, 0x30, 2)])
+
+
+def build_synthetic_image(path: Path, label: str = "wrp-synthetic", volume_flags: int = 0,
+                          hiberfil: bytes | None = None) -> dict:
+    """
+    Write a synthetic NTFS image covering the structures the reader has to
+    handle; returns the expected values in the make_ntfs_fixtures.sh format.
+    """
+    builder = NtfsImageBuilder(16 * 1024 * 1024, label=label, volume_flags=volume_flags)
+    files = {
+        "/Windows/System32/Utilman.exe": os.urandom(128 * 1024),
+        "/Ünïcödé name.txt": b"fixture\n",
+        "/frag.bin": os.urandom(96 * 1024),
+        "/links/target.txt": os.urandom(40 * 1024),
+        "/sparse.bin": os.urandom(4096) + bytes(1016 * 1024) + os.urandom(4096),
+    }
+    for i in range(400):
+        files[f"/big/file-{i:03d}.txt"] = f"entry {i}\n".encode()
+    if hiberfil is not None:
+        files["/hiberfil.sys"] = hiberfil
+    builder.mkdir("Windows/servicing/Version/10.0.22621.2428")
+    records = {}
+    for name, data in files.items():
+        records[name] = builder.add_file(
+            name,
+            data,
+            fragments=4 if name in ("/frag.bin", "/links/target.txt") else 1,
+            sparse=name == "/sparse.bin",
+            attribute_list=name == "/links/target.txt",
+        )
+    builder.write(path)
+
+    dirs: dict[str, set] = {}
+    for name in list(files) + ["/Windows/servicing/Version/10.0.22621.2428/"]:
+        parts = name.strip("/").split("/")
+        for depth in range(len(parts)):
+            parent = "/" + "/".join(parts[:depth])
+            dirs.setdefault(parent, set()).add(parts[depth])
+    dirs.setdefault("/Windows/servicing/Version/10.0.22621.2428", set())
+    return {
+        "label": label,
+        "dirs": {d: sorted(names) for d, names in dirs.items()},
+        "files": {
+            name: {
+                "size": len(data),
+                "record": records[name],
+                "sha256": hashlib.sha256(data).hexdigest(),
+            }
+            for name, data in files.items()
+        },
+        "features": {
+            "index_allocation": "/big",
+            "fragmented": "/frag.bin",
+            "attribute_list": "/links/target.txt",
+            "sparse": "/sparse.bin",
+        },
+    }
+
+
+class FixtureImageTests(unittest.TestCase):
+    """
+    Compare the reader with the content of a synthetic image and with values
+    recorded from the ntfs-3g mount (committed fixtures, when present).
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = Path(tempfile.mkdtemp(prefix="wrpbypass-ntfs-test-"))
+        synthetic = cls.tmp / "synthetic.img"
+        cls.expected = {synthetic.name: build_synthetic_image(synthetic)}
+        cls.images = [synthetic] + sorted(FIXTURES.glob("*.img.gz"))
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp, ignore_errors=True)
+
+    def _open(self, image: Path):
+        if image.name in self.expected:
+            return deb.NtfsVolume(image), self.expected[image.name]
+        raw = self.tmp / image.name[: -len(".gz")]
+        if not raw.exists():
+            with gzip.open(image, "rb") as src, raw.open("wb") as dst:
+                shutil.copyfileobj(src, dst)
+        expected = json.loads(
+            image.with_name(image.name.replace(".img.gz", ".expected.json")).read_text("utf-8")
+        )
+        return deb.NtfsVolume(raw), expected
+
+    def test_listings(self):
+        for image in self.images:
+            vol, expected = self._open(image)
+            with vol:
+                for path, names in expected["dirs"].items():
+                    with self.subTest(image=image.name, dir=path):
+                        # ntfs-3g hides the $-metadata files in the root
+                        listed = [n for n in vol.listdir(path) if not n.startswith("$")]
+                        self.assertEqual(sorted(listed), sorted(names))
+
+    def test_files(self):
+        for image in self.images:
+            vol, expected = self._open(image)
+            with vol:
+                for path, info in expected["files"].items():
+                    with self.subTest(image=image.name, file=path):
+                        entry = vol.stat(path)
+                        self.assertIsNotNone(entry)
+                        self.assertEqual(entry.size, info["size"])
+                        self.assertEqual(entry.record, info["record"])
+                        self.assertEqual(vol.sha256(path), info["sha256"])
+
+    def test_volume_metadata(self):
+        for image in self.images:
+            vol, expected = self._open(image)
+            with vol, self.subTest(image=image.name):
+                self.assertEqual(vol.volume_label(), expected["label"])
+                self.assertFalse(vol.volume_flags() & deb.VOLUME_IS_DIRTY)
+                self.assertEqual(vol.hibernation_signature(), b"")
+
+    def test_structures_are_exercised(self):
+        """The fixture really contains the structures the tests are meant to cover."""
+        for image in self.images:
+            vol, expected = self._open(image)
+            features = expected["features"]
+            with vol, self.subTest(image=image.name):
+                big = vol.stat(features["index_allocation"])
+                self.assertIn((deb.AT_INDEX_ALLOCATION, "$I30"), vol._record(big.record))
+
+                frag = vol.stat(features["fragmented"])
+                data = vol._record(frag.record)[(deb.AT_DATA, "")]
+                self.assertGreater(len([r for r in data.runs if r[1] is not None]), 1)
+
+                linked = vol.stat(features["attribute_list"])
+                _, extensions = vol._parse_record(
+                    vol._read_record_raw(linked.record), linked.record
+                )
+                self.assertTrue(extensions)
+
+                sparse = vol.stat(features["sparse"])
+                data = vol._record(sparse.record)[(deb.AT_DATA, "")]
+                self.assertIn(None, [lcn for _, lcn, _ in data.runs])
+
+    def test_b_tree_has_several_levels(self):
+        vol, expected = self._open(self.images[0])
+        with vol:
+            record = vol.stat(expected["features"]["index_allocation"]).record
+            buf, header, read_block = vol._index_nodes(record)
+            depth = 1
+            while True:
+                subnodes = [sub for *_, sub, _end in vol._index_entries(buf, header)
+                            if sub is not None]
+                if not subnodes:
+                    break
+                buf, header = read_block(subnodes[0])
+                depth += 1
+            self.assertGreaterEqual(depth, 3)
+
+
+class VolumeCheckTests(unittest.TestCase):
+    """check_volume() on synthetic dirty / hibernated volumes."""
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp(prefix="wrpbypass-ntfs-test-"))
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+
+    def test_clean_volume(self):
+        build_synthetic_image(self.tmp / "clean.img")
+        self.assertIsNone(deb.check_volume(str(self.tmp / "clean.img")))
+
+    def test_dirty_volume(self):
+        build_synthetic_image(self.tmp / "dirty.img", volume_flags=deb.VOLUME_IS_DIRTY)
+        self.assertIn("dirty", deb.check_volume(str(self.tmp / "dirty.img")))
+
+    def test_hibernated_volume(self):
+        build_synthetic_image(self.tmp / "hibr.img", hiberfil=b"HIBR" + bytes(8188))
+        self.assertIn("hibernated", deb.check_volume(str(self.tmp / "hibr.img")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,286 @@
+"""
+Tests for the account health report (`user report`): `net user` field and
+date parsing, the built-in rules, and the streamed NDJSON/CSV output, using
+canned `net user` output.
+
+    python3 -m pytest tests
+"""
+import contextlib
+import csv
+import json
+import subprocess
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest import mock
+
+from wrp_support import wrpbypass as wrp
+
+NET_USER_EN = """\
+User name                    alice
+Full Name                    Alice Example
+Comment
+User's comment
+Country/region code          000 (System Default)
+Account active               Yes
+Account expires              Never
+
+Password last set            3/14/2024 9:05:12 AM
+Password expires             Never
+Password changeable          3/14/2024 9:05:12 AM
+Password required            Yes
+User may change password     Yes
+
+Workstations allowed         All
+Logon script
+User profile
+Home directory
+Last logon                   6/1/2024 4:30:00 PM
+
+Logon hours allowed          All
+
+Local Group Memberships      *Administrators       *Users
+Global Group memberships     *None
+The command completed successfully.
+"""
+
+NET_USER_RU = """\
+Имя пользователя                    ivan
+Полное имя                          Иван Петров
+Учетная запись активна              Нет
+Учетная запись истекает             01.02.2024 0:00:00
+Последний пароль задан              15.01.2023 10:11:12
+Действие пароля завершается         Никогда
+Требуется пароль                    Нет
+Последний вход                      Никогда
+Команда выполнена успешно.
+"""
+
+NOW = datetime(2024, 7, 1, 12, 0, 0)
+
+
+def net_user(name: str, **fields: str) -> str:
+    # `user report` judges against the current time: log on recently.
+    recent = (datetime.now() - timedelta(days=5)).strftime("%m/%d/%Y %I:%M:%S %p")
+    values = {
+        "Account active": "Yes",
+        "Account expires": "Never",
+        "Password expires": "Never",
+        "Password required": "Yes",
+        "Last logon": recent,
+    }
+    values.update({k.replace("_", " ").capitalize(): v for k, v in fields.items()})
+    lines = [f"User name                    {name}"]
+    lines += [f"{label:<29}{value}" for label, value in values.items()]
+    return "\n".join(lines) + "\nThe command completed successfully.\n"
+
+
+class ReportBackend:
+    """`net user` list plus canned per-account details; unknown names fail."""
+
+    def __init__(self, details: dict[str, str]):
+        self.details = details
+
+    def run(self, args):
+        words = [a for a in args[1:] if not a.startswith("/")]
+        if words == ["user"]:
+            listing = "User accounts for \\\\TEST\n\n" + "-" * 79 + "\n"
+            listing += "   ".join(sorted(self.details) + ["ghost"]) + "\n"
+            return subprocess.CompletedProcess(args, 0, listing + "The command completed successfully.\n", "")
+        if words[:1] == ["user"] and words[1] in self.details:
+            return subprocess.CompletedProcess(args, 0, self.details[words[1]], "")
+        return subprocess.CompletedProcess(
+            args, 2, "", "The user name could not be found.\n\nMore help is available by typing NET HELPMSG 2221.\n"
+        )
+
+
+class ParseNetUserTests(unittest.TestCase):
+    def test_english(self):
+        self.assertEqual(
+            wrp._parse_net_user_details(NET_USER_EN),
+            {
+                "full_name": "Alice Example",
+                "active": "Yes",
+                "expires": "Never",
+                "password_last_set": "3/14/2024 9:05:12 AM",
+                "password_expires": "Never",
+                "password_required": "Yes",
+                "last_logon": "6/1/2024 4:30:00 PM",
+            },
+        )
+
+    def test_russian(self):
+        self.assertEqual(
+            wrp._parse_net_user_details(NET_USER_RU),
+            {
+                "full_name": "Иван Петров",
+                "active": "Нет",
+                "expires": "01.02.2024 0:00:00",
+                "password_last_set": "15.01.2023 10:11:12",
+                "password_expires": "Никогда",
+                "password_required": "Нет",
+                "last_logon": "Никогда",
+            },
+        )
+
+    def test_first_occurrence_wins(self):
+        fields = wrp._parse_net_user_details("Account active  Yes\nAccount active  No\n")
+        self.assertEqual(fields, {"active": "Yes"})
+
+    def test_unrelated_output(self):
+        self.assertEqual(wrp._parse_net_user_details("The user name could not be found."), {})
+
+
+class ParseNetDateTests(unittest.TestCase):
+    def test_formats(self):
+        cases = {
+            "3/14/2024 9:05:12 AM": datetime(2024, 3, 14, 9, 5, 12),
+            "3/14/2024 9:05:12 PM": datetime(2024, 3, 14, 21, 5, 12),
+            "3/14/2024   9:05:12  PM": datetime(2024, 3, 14, 21, 5, 12),
+            "14.03.2024 21:05:12": datetime(2024, 3, 14, 21, 5, 12),
+            "01.02.2024 0:00:00": datetime(2024, 2, 1),
+            "3/14/2024 21:05:12": datetime(2024, 3, 14, 21, 5, 12),
+            "14/03/2024 21:05:12": datetime(2024, 3, 14, 21, 5, 12),
+            "2024-03-14 21:05:12": datetime(2024, 3, 14, 21, 5, 12),
+            "3/14/2024": datetime(2024, 3, 14),
+            "14.03.2024": datetime(2024, 3, 14),
+            # Ambiguous day/month: US order is tried first.
+            "03/04/2024 10:00:00": datetime(2024, 3, 4, 10, 0, 0),
+        }
+        for value, expected in cases.items():
+            with self.subTest(value=value):
+                self.assertEqual(wrp._parse_net_date(value), expected)
+
+    def test_not_a_date(self):
+        for value in ("Never", "Никогда", "", "32.13.2024", "tomorrow"):
+            with self.subTest(value=value):
+                self.assertIsNone(wrp._parse_net_date(value))
+
+
+class ReportRulesTests(unittest.TestCase):
+    def findings(self, stale_days: int = 90, **fields) -> list[str]:
+        rules = wrp._report_rules(stale_days)
+        return [name for name, rule in rules.items() if rule(fields, NOW)]
+
+    def test_healthy_account(self):
+        fields = wrp._parse_net_user_details(NET_USER_EN)
+        fields["password_expires"] = "8/1/2024 9:05:12 AM"
+        self.assertEqual(self.findings(**fields), [])
+
+    def test_russian_account(self):
+        self.assertEqual(
+            self.findings(**wrp._parse_net_user_details(NET_USER_RU)),
+            [
+                "disabled",
+                "expired",
+                "never_logged_in",
+                "password_never_expires",
+                "password_not_required",
+            ],
+        )
+
+    def test_disabled(self):
+        self.assertEqual(self.findings(active="No"), ["disabled"])
+        self.assertEqual(self.findings(active="Yes"), [])
+
+    def test_expired(self):
+        self.assertEqual(self.findings(expires="6/30/2024 11:59:59 PM"), ["expired"])
+        self.assertEqual(self.findings(expires="7/2/2024"), [])
+        self.assertEqual(self.findings(expires="Never"), [])
+
+    def test_never_logged_in(self):
+        self.assertEqual(self.findings(last_logon="Never"), ["never_logged_in"])
+
+    def test_password_rules(self):
+        self.assertEqual(self.findings(password_expires="Never"), ["password_never_expires"])
+        self.assertEqual(self.findings(password_required="No"), ["password_not_required"])
+
+    def test_stale_logon(self):
+        self.assertEqual(self.findings(last_logon="4/1/2024 12:00:00 PM"), ["stale_logon"])
+        # 91 days ago is stale at 90, not at 91.
+        self.assertEqual(self.findings(last_logon="4/1/2024 12:00:00 PM", stale_days=91), [])
+        self.assertEqual(self.findings(last_logon="4/2/2024 12:00:00 PM"), [])
+        self.assertEqual(self.findings(last_logon="garbage"), [])
+
+    def test_missing_fields_trigger_nothing(self):
+        self.assertEqual(self.findings(), [])
+
+
+class UserReportTests(unittest.TestCase):
+    DETAILS = {
+        "alice": net_user("alice"),
+        "bob": net_user("bob", account_active="No"),
+        "carol": net_user("carol", last_logon="Never", password_required="No"),
+        "dave": net_user("dave", last_logon="1/2/2020 8:00:00 AM"),
+    }
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        previous = wrp.set_backend(ReportBackend(self.DETAILS))
+        self.addCleanup(wrp.set_backend, previous)
+        patcher = mock.patch.object(wrp, "_SESSION_CACHE", wrp._SessionCache())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def report(self, *argv: str) -> tuple[int, str]:
+        args = wrp.build_parser().parse_args(["user", "report", *argv])
+        with wrp._CapturedOutput() as out, contextlib.redirect_stdout(out.stdout):
+            rc = args.func(args)
+        return rc, out.stdout.getvalue() + out.stderr.getvalue()
+
+    def test_ndjson(self):
+        path = self.dir / "report.ndjson"
+        rc, shown = self.report("-o", str(path), "--workers", "2")
+        self.assertEqual(rc, 1)  # "ghost" could not be looked up
+        rows = {
+            row["user"]: row
+            for row in map(json.loads, path.read_text(encoding="utf-8").splitlines())
+        }
+        self.assertEqual(sorted(rows), ["alice", "bob", "carol", "dave", "ghost"])
+        findings = {name: row["findings"] for name, row in rows.items()}
+        self.assertEqual(
+            findings,
+            {
+                "alice": ["password_never_expires"],
+                "bob": ["disabled", "password_never_expires"],
+                "carol": ["never_logged_in", "password_never_expires", "password_not_required"],
+                "dave": ["password_never_expires", "stale_logon"],
+                "ghost": [],
+            },
+        )
+        self.assertIn("could not be found", rows["ghost"]["error"])
+        self.assertEqual(rows["bob"]["active"], "No")
+        self.assertIn("Accounts checked: 5", shown)
+        self.assertIn("(errors: 1)", shown)
+        self.assertIn("disabled                 1", shown)
+
+    def test_csv_with_selected_rules(self):
+        path = self.dir / "report.csv"
+        rc, _ = self.report("-o", str(path), "-f", "csv", "--rules", "disabled,stale_logon")
+        self.assertEqual(rc, 1)
+        with path.open(encoding="utf-8-sig", newline="") as f:
+            rows = list(csv.reader(f, delimiter=";"))
+        self.assertEqual(rows[0], wrp.REPORT_COLUMNS)
+        findings = {row[0]: row[wrp.REPORT_COLUMNS.index("findings")] for row in rows[1:]}
+        self.assertEqual(
+            findings, {"alice": "", "bob": "disabled", "carol": "", "dave": "stale_logon", "ghost": ""}
+        )
+
+    def test_console_lists_only_accounts_with_findings(self):
+        _, shown = self.report("--rules", "disabled,never_logged_in")
+        lines = [line.split() for line in shown.splitlines() if line.startswith("  ")]
+        self.assertIn(["bob", "disabled"], lines)
+        self.assertIn(["carol", "never_logged_in"], lines)
+        self.assertNotIn("alice", shown)
+
+    def test_unknown_rule(self):
+        rc, shown = self.report("--rules", "disabled,bogus")
+        self.assertEqual(rc, 1)
+        self.assertIn("Unknown rules: bogus", shown)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,167 @@
+"""
+Tests for the backend scheduler (AIMD limit, retries, circuit breaker,
+cancellation), driven through the simulated `net` backend.
+
+    python3 -m pytest tests
+"""
+import threading
+import time
+import unittest
+
+from wrp_support import simulated, wrpbypass as wrp
+
+ARGS = ["net", "user"]
+
+
+def scheduler(**kwargs) -> "wrp._AdaptiveScheduler":
+    options = dict(backoff_base=0.001, backoff_cap=0.01, breaker_threshold=100)
+    options.update(kwargs)
+    return wrp._AdaptiveScheduler("local", **options)
+
+
+def wait_for(predicate, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached")
+        time.sleep(0.01)
+
+
+class AimdTests(unittest.TestCase):
+    def test_fast_calls_grow_the_limit_up_to_max(self):
+        sched = scheduler(initial_limit=2, max_limit=4, target_latency=1.0)
+        with simulated(local=sched):
+            for _ in range(20):
+                self.assertEqual(wrp._execute(ARGS).returncode, 0)
+        self.assertEqual(sched.limit, 4)
+
+    def test_slow_calls_halve_the_limit(self):
+        sched = scheduler(initial_limit=8, max_limit=8, target_latency=0.01)
+        with simulated("latency=0.05,jitter=0", local=sched):
+            wrp._execute(ARGS)
+        self.assertEqual(sched.limit, 4)
+
+    def test_errors_halve_the_limit(self):
+        sched = scheduler(initial_limit=8, max_limit=8)
+        with simulated("latency=0,jitter=0,errors=1", local=sched):
+            wrp._execute(ARGS)
+        self.assertEqual(sched.limit, 4)
+
+    def test_concurrency_stays_within_the_limit(self):
+        sched = scheduler(initial_limit=2, max_limit=2, target_latency=1.0)
+        with simulated("latency=0.02,jitter=0", local=sched) as backend:
+            threads = [threading.Thread(target=wrp._execute, args=(ARGS,)) for _ in range(8)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        self.assertEqual(backend.calls, 8)
+        self.assertLessEqual(backend.max_inflight, 2)
+
+
+class RetryTests(unittest.TestCase):
+    def test_read_only_commands_are_retried(self):
+        sched = scheduler(retries=3)
+        with simulated("latency=0,jitter=0,errors=1", local=sched) as backend:
+            result = wrp._execute(ARGS, retry=True)
+        self.assertEqual(backend.calls, 4)
+        self.assertEqual(wrp._net_error_code(result), 1722)
+
+    def test_writes_are_not_retried(self):
+        sched = scheduler(retries=3)
+        with simulated("latency=0,jitter=0,errors=1", local=sched) as backend:
+            wrp._execute(["net", "user", "bob", "/add"])
+        self.assertEqual(backend.calls, 1)
+
+    def test_non_transient_errors_are_not_retried(self):
+        sched = scheduler(retries=3)
+        with simulated("latency=0,jitter=0,errors=1,code=2221", local=sched) as backend:
+            wrp._execute(ARGS, retry=True)
+        self.assertEqual(backend.calls, 1)
+
+
+class BreakerTests(unittest.TestCase):
+    def test_open_half_open_closed(self):
+        sched = scheduler(breaker_threshold=2, breaker_cooldown=0.1)
+        with simulated("latency=0,jitter=0,errors=1", local=sched) as backend:
+            wrp._execute(ARGS)
+            wrp._execute(ARGS)
+            self.assertEqual(sched.stats()["state"], "open")
+
+            rejected = wrp._execute(ARGS)
+            self.assertIn("unavailable", rejected.stderr)
+            self.assertEqual(backend.calls, 2)
+
+            time.sleep(0.15)
+            backend.errors = 0
+            self.assertEqual(wrp._execute(ARGS).returncode, 0)
+            self.assertEqual(sched.stats()["state"], "closed")
+            self.assertEqual(backend.calls, 3)
+
+    def test_failed_probe_reopens(self):
+        sched = scheduler(breaker_threshold=1, breaker_cooldown=0.1)
+        with simulated("latency=0,jitter=0,errors=1", local=sched) as backend:
+            wrp._execute(ARGS)
+            time.sleep(0.15)
+            wrp._execute(ARGS)  # the half-open probe fails
+            self.assertEqual(sched.stats()["state"], "open")
+            self.assertIn("unavailable", wrp._execute(ARGS).stderr)
+            self.assertEqual(backend.calls, 2)
+
+    def test_only_one_probe_while_half_open(self):
+        sched = scheduler(breaker_threshold=1, breaker_cooldown=0.05)
+        with simulated("latency=0,jitter=0,errors=1", local=sched) as backend:
+            wrp._execute(ARGS)
+            time.sleep(0.1)
+            backend.errors = 0
+            backend.latency = 0.2
+            probe = threading.Thread(target=wrp._execute, args=(ARGS,))
+            probe.start()
+            wait_for(lambda: backend.inflight == 1)
+            self.assertIn("recovering", wrp._execute(ARGS).stderr)
+            probe.join()
+            self.assertEqual(sched.stats()["state"], "closed")
+
+
+class CancellationTests(unittest.TestCase):
+    def test_cancel_during_backoff(self):
+        sched = scheduler(retries=3, backoff_base=5.0, backoff_cap=5.0)
+        tasks = wrp._TaskManager()
+        with simulated("latency=0,jitter=0,errors=1", local=sched) as backend:
+            task = tasks.start("read", wrp._execute, ARGS, None, "cp866", None, True)
+            wait_for(lambda: backend.calls == 1)
+            task.cancel()
+            wait_for(lambda: not task.running)
+        self.assertEqual(task.status, "cancelled")
+        self.assertEqual(backend.calls, 1)
+        self.assertEqual(sched.stats()["inflight"], 0)
+
+    def test_cancelled_probe_does_not_block_the_breaker(self):
+        # A call admitted before the breaker opened still holds the only
+        # slot, so the half-open probe waits in _acquire and is cancelled
+        # there; the next call must be allowed to probe.
+        sched = scheduler(initial_limit=1, max_limit=1, breaker_cooldown=0.05)
+        tasks = wrp._TaskManager()
+        with simulated("latency=0.3,jitter=0", local=sched) as backend:
+            slow = threading.Thread(target=wrp._execute, args=(ARGS,))
+            slow.start()
+            wait_for(lambda: backend.inflight == 1)
+            with sched._cond:
+                sched._state = "open"
+                sched._opened_at = time.monotonic() - sched.breaker_cooldown
+
+            task = tasks.start("probe", wrp._execute, ARGS)
+            wait_for(lambda: sched.stats()["state"] == "half-open")
+            task.cancel()
+            wait_for(lambda: not task.running)
+            slow.join()
+            self.assertEqual(task.status, "cancelled")
+
+            backend.latency = 0
+            self.assertEqual(wrp._execute(ARGS).returncode, 0)
+            self.assertEqual(sched.stats()["state"], "closed")
+            self.assertEqual(sched.stats()["inflight"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+"""
+wrpbypass.py and wrpbypass_deb.py are standalone scripts and cannot import
+each other, so a few helpers are carried in both. Fail if the copies drift.
+
+    python3 -m pytest tests
+"""
+import ast
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+SHARED = ("_OUTPUT", "_StreamRouter", "_install_output_router", "_CapturedOutput")
+
+
+def _definitions(path: Path) -> dict:
+    tree = ast.parse(path.read_text("utf-8"))
+    found = {}
+    for node in tree.body:
+        if isinstance(node, (ast.ClassDef, ast.FunctionDef)):
+            found[node.name] = ast.dump(node)
+        elif isinstance(node, ast.Assign):
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    found[target.id] = ast.dump(node)
+    return found
+
+
+class SharedCodeTests(unittest.TestCase):
+    def test_output_capture_copies_are_identical(self):
+        windows = _definitions(ROOT / "wrpbypass.py")
+        linux = _definitions(ROOT / "wrpbypass_deb.py")
+        for name in SHARED:
+            with self.subTest(name=name):
+                self.assertIn(name, windows)
+                self.assertIn(name, linux)
+                self.assertEqual(windows[name], linux[name])
+
+
+if __name__ == "__main__":
+    unittest.main()
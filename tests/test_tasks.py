@@ -0,0 +1,154 @@
+"""
+Tests for background tasks (_TaskManager/_Task): output, result, failure
+and cancellation, driven through the simulated `net` backend.
+
+    python3 -m pytest tests
+"""
+import contextlib
+import sys
+import threading
+import time
+import unittest
+from unittest import mock
+
+from wrp_support import simulated, wrpbypass as wrp
+
+ARGS = ["net", "user"]
+
+
+def route_output(test: unittest.TestCase) -> None:
+    # Task threads print(); the router sends that into the task's output.
+    test.addCleanup(setattr, sys, "stdout", sys.stdout)
+    test.addCleanup(setattr, sys, "stderr", sys.stderr)
+    wrp._install_output_router()
+
+
+def local(spec: str = "latency=0,jitter=0"):
+    return simulated(spec, local=wrp._AdaptiveScheduler("local", backoff_base=0.001))
+
+
+def wait_done(task: "wrp._Task", timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while task.running:
+        if time.monotonic() > deadline:
+            raise AssertionError(f"task #{task.id} still running")
+        time.sleep(0.01)
+
+
+class TaskTests(unittest.TestCase):
+    def setUp(self):
+        route_output(self)
+        self.tasks = wrp._TaskManager()
+
+    def test_result_and_output(self):
+        with local():
+            task = self.tasks.start("List users", wrp.run_command, ARGS)
+            wait_done(task)
+        self.assertEqual((task.status, task.rc), ("done", 0))
+        lines, index = task.read_since(0)
+        self.assertIn("user00000", "\n".join(lines))
+        self.assertEqual(index, len(lines))
+        self.assertEqual(task.last_line(), "The command completed successfully.")
+        self.assertEqual(task.read_since(index), ([], index))
+
+    def test_failed_command(self):
+        with local("latency=0,jitter=0,errors=1,code=2221"):
+            task = self.tasks.start("List users", wrp.run_command, ARGS)
+            wait_done(task)
+        self.assertEqual((task.status, task.rc), ("failed", 2))
+        self.assertIn("System error 2221", task.last_line())
+
+    def test_exception_is_reported(self):
+        def boom():
+            raise RuntimeError("boom")
+
+        task = self.tasks.start("Boom", boom)
+        wait_done(task)
+        self.assertEqual(task.status, "failed")
+        self.assertIsNone(task.rc)
+        self.assertEqual(task.last_line(), "Task failed: boom")
+
+    def test_cancel(self):
+        def many_calls():
+            for _ in range(100):
+                wrp._execute(ARGS)
+            return 0
+
+        with local("latency=0.05,jitter=0") as backend:
+            task = self.tasks.start("Many calls", many_calls)
+            while backend.calls < 2:
+                time.sleep(0.01)
+            self.assertEqual(self.tasks.running(), [task])
+            self.tasks.cancel_all()
+            wait_done(task)
+        self.assertTrue(task.cancelled)
+        self.assertEqual(task.status, "cancelled")
+        self.assertLess(backend.calls, 100)
+        self.assertEqual(self.tasks.running(), [])
+
+    def test_cancel_before_the_next_call(self):
+        cancelled = threading.Event()
+
+        def wait_then_call():
+            cancelled.wait(5)
+            wrp._execute(ARGS)
+            return 0
+
+        with local() as backend:
+            task = self.tasks.start("Wait", wait_then_call)
+            task.cancel()
+            cancelled.set()
+            wait_done(task)
+        self.assertEqual(task.status, "cancelled")
+        self.assertEqual(backend.calls, 0)
+
+    def test_ids_and_lookup(self):
+        first = self.tasks.start("one", lambda: 0)
+        second = self.tasks.start("two", lambda: 0)
+        wait_done(first)
+        wait_done(second)
+        self.assertEqual((first.id, second.id), (1, 2))
+        self.assertIs(self.tasks.get(2), second)
+        self.assertIsNone(self.tasks.get(3))
+        self.assertEqual(self.tasks.tasks(), [first, second])
+
+    def test_output_is_capped(self):
+        def chatty():
+            for i in range(12):
+                print(f"line {i}")
+            return 0
+
+        with mock.patch.object(wrp, "TASK_OUTPUT_MAX_LINES", 5):
+            task = self.tasks.start("Chatty", chatty)
+            wait_done(task)
+        lines, index = task.read_since(0)
+        self.assertEqual(lines, [f"line {i}" for i in range(7, 12)])
+        self.assertEqual(index, 12)
+        self.assertEqual(task.read_since(10), (["line 10", "line 11"], 12))
+
+
+class WatchTaskTests(unittest.TestCase):
+    def setUp(self):
+        route_output(self)
+
+    def watch(self, task: "wrp._Task") -> str:
+        with wrp._CapturedOutput() as out, contextlib.redirect_stdout(out.stdout):
+            wrp._watch_task(task)
+        return out.stdout.getvalue() + out.stderr.getvalue()
+
+    def test_shows_output_and_result(self):
+        tasks = wrp._TaskManager()
+        with local():
+            task = tasks.start("List users", wrp.run_command, ARGS)
+            shown = self.watch(task)
+        self.assertIn("user00000", shown)
+        self.assertIn(f"Task #{task.id} finished in 00:00.", shown)
+
+    def test_shows_failure(self):
+        task = wrp._TaskManager().start("Fail", lambda: 3)
+        shown = self.watch(task)
+        self.assertIn(f"Task #{task.id} failed after 00:00 (exit code 3).", shown)
+
+
+if __name__ == "__main__":
+    unittest.main()
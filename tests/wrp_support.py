@@ -0,0 +1,35 @@
+"""
+Shared setup for the tests of wrpbypass.py: import the module with its data
+directory (config, log, inventory database) in a temporary directory, and
+run code against the simulated `net` backend from wrpbypass_sim.py.
+"""
+import contextlib
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault("WRP_DIR", tempfile.mkdtemp(prefix="wrpbypass-test-"))
+
+import wrpbypass  # noqa: E402
+from wrpbypass_sim import SimulatedBackend  # noqa: E402
+
+
+@contextlib.contextmanager
+def simulated(spec: str = "latency=0,jitter=0", **schedulers):
+    """
+    Install a SimulatedBackend (and optionally replacement schedulers, e.g.
+    local=_AdaptiveScheduler(...)) for the duration of the block.
+    """
+    backend = SimulatedBackend(spec)
+    previous = wrpbypass.set_backend(backend)
+    saved = dict(wrpbypass._SCHEDULERS)
+    wrpbypass._SCHEDULERS.update(schedulers)
+    try:
+        yield backend
+    finally:
+        wrpbypass._SCHEDULERS.clear()
+        wrpbypass._SCHEDULERS.update(saved)
+        wrpbypass.set_backend(previous)
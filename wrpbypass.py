@@ -1,5 +1,7 @@
 import argparse
+import bisect
 import csv
+import io
 import json
 import subprocess
 import sys
@@ -8,57 +10,29 @@ from pathlib import Path
 from typing import List
 from datetime import datetime
 import platform
+import random
+import re
 import getpass
+import secrets
+import signal
+import socket
+import sqlite3
+import struct
+import threading
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener, answer_challenge, deliver_challenge
 
 import ctypes
-from prompt_toolkit import prompt
-from prompt_toolkit.formatted_text import HTML
-from prompt_toolkit.shortcuts import print_formatted_text
-from prompt_toolkit.styles import Style
+
+import wrpbypass_client
 
 
 VERSION = "1.4"
 GITHUB = "thenola/wrpbypass"
 
 
-def _detect_data_dir() -> Path:
-    """
-    Choose a writable directory for config/logs.
-
-    Priority:
-    1) WRP_DIR environment variable
-    2) On Windows: C:\\ProgramData\\wrpbypass
-    3) Otherwise: <script_dir>\\data
-    """
-    env = os.environ.get("WRP_DIR")
-    if env:
-        p = Path(env)
-        try:
-            p.mkdir(parents=True, exist_ok=True)
-            return p
-        except Exception:
-            pass
-
-    # On Windows – always use C:\ProgramData\wrpbypass by default
-    if os.name == "nt":
-        base = Path(os.environ.get("ProgramData", r"C:\\ProgramData")) / "wrpbypass"
-    else:
-        try:
-            if getattr(sys, "frozen", False):
-                here = Path(sys.executable).resolve().parent
-            else:
-                here = Path(__file__).resolve().parent
-        except Exception:
-            here = Path.cwd()
-        base = here / "data"
-
-    try:
-        base.mkdir(parents=True, exist_ok=True)
-    except Exception:
-        base = Path.cwd()
-
-    return base
-
+_detect_data_dir = wrpbypass_client.detect_data_dir
 
 DATA_DIR = _detect_data_dir()
 CONFIG_PATH = DATA_DIR / "config.yml"
@@ -70,7 +44,10 @@ _LOG_HEADER_WRITTEN = False
 LOG_ENABLED = True
 LOG_LOG_COMMANDS = True
 
-KERNEL32 = ctypes.WinDLL("kernel32", use_last_error=True)
+# kernel32 is only needed for MoveFileExW; keep the module importable on Linux
+# so the daemon/client pieces can be exercised there over a Unix socket.
+KERNEL32 = ctypes.WinDLL("kernel32", use_last_error=True) if os.name == "nt" else None
+ADVAPI32 = ctypes.WinDLL("advapi32", use_last_error=True) if os.name == "nt" else None
 MOVEFILE_DELAY_UNTIL_REBOOT = 0x00000004
 
 _DEFAULT_STYLE_DICT = {
@@ -99,7 +76,37 @@ _DEFAULT_STYLE_DICT = {
 
 _NO_COLOR_STYLE_DICT = {k: "" for k in _DEFAULT_STYLE_DICT.keys()}
 
-style = Style.from_dict(_DEFAULT_STYLE_DICT)
+# prompt_toolkit is imported on first use: it dominates start-up time, and
+# the daemon client and most CLI commands never draw anything with it.
+_STYLE_DICT = _DEFAULT_STYLE_DICT
+_STYLE = None
+
+
+def _style():
+    global _STYLE
+    if _STYLE is None:
+        from prompt_toolkit.styles import Style
+
+        _STYLE = Style.from_dict(_STYLE_DICT)
+    return _STYLE
+
+
+def prompt(*args, **kwargs) -> str:
+    from prompt_toolkit import prompt as _prompt
+
+    return _prompt(*args, **kwargs)
+
+
+def HTML(value: str):
+    from prompt_toolkit.formatted_text import HTML as _HTML
+
+    return _HTML(value)
+
+
+def print_formatted_text(*args, **kwargs) -> None:
+    from prompt_toolkit.shortcuts import print_formatted_text as _print_formatted_text
+
+    _print_formatted_text(*args, **kwargs)
 
 
 def _str_to_bool(value: str, default: bool = True) -> bool:
@@ -113,32 +120,105 @@ def _str_to_bool(value: str, default: bool = True) -> bool:
 
 def configure_style(use_color: bool) -> None:
     """Rebuild global style with or without colors."""
-    global style
-    style_dict = _DEFAULT_STYLE_DICT if use_color else _NO_COLOR_STYLE_DICT
-    style = Style.from_dict(style_dict)
+    global _STYLE_DICT, _STYLE
+    _STYLE_DICT = _DEFAULT_STYLE_DICT if use_color else _NO_COLOR_STYLE_DICT
+    _STYLE = None
+
+
+# Per-thread output capture. When a thread has a capture buffer attached,
+# print()/info()/error() output of that thread goes into the buffer instead
+# of the console (used by the daemon to return command output to clients).
+# wrpbypass_deb.py carries an identical copy (both are standalone scripts);
+# tests/test_shared_code.py fails if the two drift apart.
+_OUTPUT = threading.local()
+
+
+class _StreamRouter:
+    """sys.stdout/sys.stderr replacement that honours per-thread capture."""
+
+    def __init__(self, stream, name: str):
+        self._stream = stream
+        self._name = name
+
+    def _target(self):
+        buffers = getattr(_OUTPUT, "buffers", None)
+        if buffers is not None:
+            return buffers[self._name]
+        return self._stream
+
+    def write(self, text: str) -> int:
+        return self._target().write(text)
+
+    def flush(self) -> None:
+        self._target().flush()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+def _install_output_router() -> None:
+    """Route sys.stdout/sys.stderr through _StreamRouter (idempotent)."""
+    if not isinstance(sys.stdout, _StreamRouter):
+        sys.stdout = _StreamRouter(sys.stdout, "stdout")
+    if not isinstance(sys.stderr, _StreamRouter):
+        sys.stderr = _StreamRouter(sys.stderr, "stderr")
+
+
+class _CapturedOutput:
+    """Context manager capturing stdout/stderr of the current thread."""
+
+    def __enter__(self):
+        self.stdout = io.StringIO()
+        self.stderr = io.StringIO()
+        self._prev = getattr(_OUTPUT, "buffers", None)
+        _OUTPUT.buffers = {"stdout": self.stdout, "stderr": self.stderr}
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _OUTPUT.buffers = self._prev
+        return False
+
+
+def _emit(tag: str, text: str, to_stderr: bool = False) -> None:
+    buffers = getattr(_OUTPUT, "buffers", None)
+    if buffers is not None:
+        buffers["stderr" if to_stderr else "stdout"].write(text + "\n")
+        return
+    if to_stderr:
+        print_formatted_text(HTML(f"<{tag}>{text}</{tag}>"), style=_style(), file=sys.stderr)
+    else:
+        print_formatted_text(HTML(f"<{tag}>{text}</{tag}>"), style=_style())
 
 
 def info(text: str) -> None:
-    print_formatted_text(HTML(f"<info>{text}</info>"), style=style)
+    _emit("info", text)
 
 
 def ok(text: str) -> None:
-    print_formatted_text(HTML(f"<ok>{text}</ok>"), style=style)
+    _emit("ok", text)
 
 
 def warn(text: str) -> None:
-    print_formatted_text(HTML(f"<warn>{text}</warn>"), style=style)
+    _emit("warn", text)
 
 
 def error(text: str) -> None:
-    print_formatted_text(HTML(f"<error>{text}</error>"), style=style, file=sys.stderr)
+    _emit("error", text, to_stderr=True)
+
+
+_LOG_LOCK = threading.Lock()
 
 
 def log_action(action: str) -> None:
     """Append extended, timestamped entry to wrpbypass.log (best-effort)."""
-    global _LOG_HEADER_WRITTEN, LOG_ENABLED
     if not LOG_ENABLED:
         return
+    with _LOG_LOCK:
+        _log_action_locked(action)
+
+
+def _log_action_locked(action: str) -> None:
+    global _LOG_HEADER_WRITTEN
     try:
         ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
@@ -224,6 +304,14 @@ def _ensure_default_config() -> None:
         "log_enabled: true\n"
         "# log_commands: true|false (default: true) – log underlying net/command calls\n"
         "log_commands: true\n"
+        "# cache_ttl: seconds to reuse read-only net results (default: 120, 0 = off)\n"
+        "cache_ttl: 120\n"
+        "# cache_stale: age in seconds after which cached data is marked stale (default: 60)\n"
+        "cache_stale: 60\n"
+        "# inventory: true|false (default: false) – record account snapshots in inventory.db\n"
+        "inventory: false\n"
+        "# domain_sync: true|false (default: false) – incremental sync for domain user lists\n"
+        "domain_sync: false\n"
     )
     try:
         CONFIG_PATH.write_text(content, encoding="utf-8")
@@ -250,6 +338,8 @@ def _get_system32() -> Path:
 
 def movefile_ex(src: str, dst: str | None) -> None:
     """Schedule rename/move on next reboot."""
+    if KERNEL32 is None:
+        raise OSError("MoveFileExW is only available on Windows.")
     src_w = ctypes.c_wchar_p(src)
     dst_w = ctypes.c_wchar_p(dst) if dst is not None else None
     res = KERNEL32.MoveFileExW(src_w, dst_w, MOVEFILE_DELAY_UNTIL_REBOOT)
@@ -444,22 +534,699 @@ for _stream in ("stdout", "stderr"):
             pass
 
 
-def run_command(args: List[str]) -> int:
-    """Run a Windows command (e.g., net) and print output (cp866 for Russian consoles)."""
+# ---------------------------------------------------------------------------
+# Background tasks for the interactive menu. A task runs a menu action in a
+# worker thread; its output is captured line by line so the menu can stream
+# it, and cancelling a task only terminates the processes started by it.
+# ---------------------------------------------------------------------------
+
+TASK_OUTPUT_MAX_LINES = 10000
+
+
+class _TaskCancelled(Exception):
+    """Raised inside a task thread when the task was cancelled."""
+
+
+class _TaskStream:
+    """File-like sink collecting task output as lines."""
+
+    def __init__(self, task: "_Task"):
+        self._task = task
+        self._partial = ""
+
+    def write(self, text: str) -> int:
+        data = self._partial + text
+        *lines, self._partial = data.split("\n")
+        for line in lines:
+            self._task._append(line)
+        return len(text)
+
+    def flush(self) -> None:
+        if self._partial:
+            self._task._append(self._partial)
+            self._partial = ""
+
+
+class _Task:
+    def __init__(self, task_id: int, title: str):
+        self.id = task_id
+        self.title = title
+        self.started = time.monotonic()
+        self.finished: float | None = None
+        self.status = "running"  # running, done, failed, cancelled
+        self.rc: int | None = None
+        self._lock = threading.Lock()
+        self._lines: list[str] = []
+        self._dropped = 0
+        self._procs: set[subprocess.Popen] = set()
+        self._cancelled = threading.Event()
+
+    # -- output --------------------------------------------------------------
+
+    def _append(self, line: str) -> None:
+        with self._lock:
+            self._lines.append(line)
+            if len(self._lines) > TASK_OUTPUT_MAX_LINES:
+                drop = len(self._lines) - TASK_OUTPUT_MAX_LINES
+                del self._lines[:drop]
+                self._dropped += drop
+
+    def read_since(self, index: int) -> tuple[list[str], int]:
+        """Return output lines after absolute line `index` and the new index."""
+        with self._lock:
+            start = max(index - self._dropped, 0)
+            lines = self._lines[start:]
+            return lines, self._dropped + len(self._lines)
+
+    def last_line(self) -> str:
+        with self._lock:
+            return self._lines[-1] if self._lines else ""
+
+    # -- state ---------------------------------------------------------------
+
+    @property
+    def running(self) -> bool:
+        return self.finished is None
+
+    def elapsed(self) -> float:
+        return (self.finished or time.monotonic()) - self.started
+
+    def attach(self, proc: subprocess.Popen) -> None:
+        with self._lock:
+            self._procs.add(proc)
+        if self._cancelled.is_set():
+            _kill_process_tree(proc)
+            raise _TaskCancelled()
+
+    def detach(self, proc: subprocess.Popen) -> None:
+        with self._lock:
+            self._procs.discard(proc)
+
+    def check_cancelled(self) -> None:
+        if self._cancelled.is_set():
+            raise _TaskCancelled()
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+        with self._lock:
+            procs = list(self._procs)
+        for proc in procs:
+            _kill_process_tree(proc)
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+
+class _TaskManager:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tasks: list[_Task] = []
+        self._next_id = 1
+
+    def start(self, title: str, func, *args) -> _Task:
+        with self._lock:
+            task = _Task(self._next_id, title)
+            self._next_id += 1
+            self._tasks.append(task)
+        t = threading.Thread(
+            target=self._run, args=(task, func, args), name=f"wrp-task-{task.id}", daemon=True
+        )
+        t.start()
+        return task
+
+    def _run(self, task: _Task, func, args) -> None:
+        stream = _TaskStream(task)
+        _OUTPUT.buffers = {"stdout": stream, "stderr": stream}
+        _OUTPUT.task = task
+        try:
+            rc = func(*args)
+            task.rc = rc if isinstance(rc, int) else 0
+            task.status = "cancelled" if task.cancelled else ("done" if task.rc == 0 else "failed")
+        except _TaskCancelled:
+            task.status = "cancelled"
+        except Exception as e:
+            stream.write(f"Task failed: {e}\n")
+            task.status = "failed"
+        finally:
+            stream.flush()
+            _OUTPUT.buffers = None
+            _OUTPUT.task = None
+            task.finished = time.monotonic()
+            log_action(f"Task #{task.id} '{task.title}' {task.status} rc={task.rc}")
+
+    def tasks(self) -> list[_Task]:
+        with self._lock:
+            return list(self._tasks)
+
+    def get(self, task_id: int) -> _Task | None:
+        for task in self.tasks():
+            if task.id == task_id:
+                return task
+        return None
+
+    def running(self) -> list[_Task]:
+        return [t for t in self.tasks() if t.running]
+
+    def cancel_all(self) -> None:
+        for task in self.running():
+            task.cancel()
+
+
+_TASKS = _TaskManager()
+
+
+def _current_task() -> _Task | None:
+    return getattr(_OUTPUT, "task", None)
+
+
+def _isolated_popen_kwargs() -> dict:
+    """
+    Start children outside the console's Ctrl+C group, so Ctrl+C in the menu
+    reaches only wrpbypass and a task is stopped by explicit cancellation.
+    """
+    if os.name == "nt":
+        return {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+    return {"start_new_session": True}
+
+
+def _kill_process_tree(proc: subprocess.Popen) -> None:
+    """Terminate a child process together with anything it started."""
+    if proc.poll() is not None:
+        return
     try:
-        completed = subprocess.run(
+        if os.name == "nt":
+            subprocess.run(
+                ["taskkill", "/T", "/F", "/PID", str(proc.pid)],
+                capture_output=True,
+            )
+        else:
+            os.killpg(proc.pid, signal.SIGKILL)
+    except Exception:
+        try:
+            proc.kill()
+        except Exception:
+            pass
+
+
+def _format_elapsed(seconds: float) -> str:
+    minutes, secs = divmod(int(seconds), 60)
+    return f"{minutes:02d}:{secs:02d}"
+
+
+class _SessionCache:
+    """
+    Thread-safe cache of read-only `net` command results.
+
+    Entries expire after `ttl` seconds and are reported as stale after
+    `stale_after` seconds; concurrent requests for the same command share a
+    single backend call. Any non-cached command invalidates the whole cache,
+    since it may have changed users or groups.
+    """
+
+    def __init__(self, ttl: float = 120.0, stale_after: float = 60.0):
+        self.ttl = ttl
+        self.stale_after = stale_after
+        self._lock = threading.Lock()
+        self._entries: dict[tuple[str, ...], tuple[float, subprocess.CompletedProcess]] = {}
+        self._loading: dict[tuple[str, ...], threading.Event] = {}
+        self._generation = 0
+
+    def get(self, args: List[str], loader, force: bool = False):
+        """Return the cached result for `args`, calling `loader` on a miss
+        (or always, when `force` is set)."""
+        key = tuple(args)
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if not force and entry and time.monotonic() - entry[0] <= self.ttl:
+                    return entry[1]
+                pending = self._loading.get(key)
+                if pending is None:
+                    pending = self._loading[key] = threading.Event()
+                    generation = self._generation
+                    break
+            pending.wait()
+            # A load finished while we waited; that result is fresh enough.
+            force = False
+
+        try:
+            result = loader()
+            if result is not None and result.returncode == 0:
+                with self._lock:
+                    if generation == self._generation:
+                        self._entries[key] = (time.monotonic(), result)
+            return result
+        finally:
+            with self._lock:
+                self._loading.pop(key, None)
+            pending.set()
+
+    def peek(self, args: List[str]):
+        """Return a fresh cached result for `args` or None; never loads or stores."""
+        with self._lock:
+            entry = self._entries.get(tuple(args))
+        if entry and time.monotonic() - entry[0] <= self.ttl:
+            return entry[1]
+        return None
+
+    def age(self, args: List[str]) -> float | None:
+        """Seconds since `args` was cached, or None if not cached/expired."""
+        with self._lock:
+            entry = self._entries.get(tuple(args))
+        if entry is None:
+            return None
+        age = time.monotonic() - entry[0]
+        return age if age <= self.ttl else None
+
+    def is_stale(self, args: List[str]) -> bool:
+        age = self.age(args)
+        return age is not None and age >= self.stale_after
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+
+_SESSION_CACHE = _SessionCache()
+
+
+# ---------------------------------------------------------------------------
+# Backend scheduler. Every `net` call goes through an _AdaptiveScheduler
+# (one for local calls, one for domain calls) which limits concurrency with
+# AIMD driven by latency and errors, retries transient RPC/network errors
+# with jittered exponential backoff, and trips a circuit breaker when the
+# backend keeps failing, so parallel features cannot hammer a busy DC.
+# ---------------------------------------------------------------------------
+
+# Windows / NET error codes worth retrying: network path and RPC failures,
+# timeouts, and "no domain controller / logon server" conditions.
+RETRYABLE_NET_ERRORS = {
+    53,  # ERROR_BAD_NETPATH
+    59,  # ERROR_UNEXP_NET_ERR
+    64,  # ERROR_NETNAME_DELETED
+    121,  # ERROR_SEM_TIMEOUT
+    258,  # WAIT_TIMEOUT
+    1231,  # ERROR_NETWORK_UNREACHABLE
+    1311,  # ERROR_NO_LOGON_SERVERS
+    1460,  # ERROR_TIMEOUT
+    1722,  # RPC_S_SERVER_UNAVAILABLE
+    1723,  # RPC_S_SERVER_TOO_BUSY
+    1726,  # RPC_S_CALL_FAILED
+    1727,  # RPC_S_CALL_FAILED_DNE
+    1818,  # RPC_S_CALL_CANCELLED
+    2453,  # NERR_DCNotFound
+    8206,  # ERROR_DS_BUSY
+    8207,  # ERROR_DS_UNAVAILABLE
+    8250,  # ERROR_DS_SERVER_DOWN
+}
+
+_NET_ERROR_RE = re.compile(
+    r"(?:system error|системная ошибка|net helpmsg)\s+(\d+)", re.IGNORECASE
+)
+
+
+def _net_error_code(completed: subprocess.CompletedProcess) -> int | None:
+    """Extract the Windows/NET error code from `net` output, if any."""
+    if completed.returncode == 0:
+        return None
+    match = _NET_ERROR_RE.search(f"{completed.stderr or ''}\n{completed.stdout or ''}")
+    return int(match.group(1)) if match else None
+
+
+class _AdaptiveScheduler:
+    """
+    AIMD concurrency limiter + retry policy + circuit breaker for one backend.
+
+    The limit grows by ~1 per round of successful calls faster than
+    `target_latency` and is halved (at most once per observed latency) on a
+    retryable error or a slow call.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_limit: int = 16,
+        initial_limit: float = 4.0,
+        target_latency: float = 2.0,
+        retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_cap: float = 10.0,
+        breaker_threshold: int = 5,
+        breaker_cooldown: float = 30.0,
+    ):
+        self.name = name
+        self.max_limit = max_limit
+        self.limit = min(initial_limit, max_limit)
+        self.target_latency = target_latency
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+
+        self._cond = threading.Condition()
+        self._inflight = 0
+        self._last_decrease = 0.0
+        self._failures = 0  # consecutive retryable failures
+        self._state = "closed"  # closed, open, half-open
+        self._opened_at = 0.0
+        self._probe_inflight = False
+
+    # -- circuit breaker -----------------------------------------------------
+
+    def _admit(self) -> tuple[str | None, bool]:
+        """
+        Return (rejection message or None, whether this call is the
+        half-open probe) for a call about to start.
+        """
+        with self._cond:
+            if self._state == "open":
+                remaining = self._opened_at + self.breaker_cooldown - time.monotonic()
+                if remaining > 0:
+                    return (
+                        f"wrpbypass: {self.name} backend unavailable after repeated "
+                        f"errors; retrying in {remaining:.0f}s."
+                    ), False
+                self._state = "half-open"
+            if self._state == "half-open":
+                if self._probe_inflight:
+                    return (
+                        f"wrpbypass: {self.name} backend is recovering, try again shortly."
+                    ), False
+                self._probe_inflight = True
+                return None, True
+        return None, False
+
+    # -- concurrency ---------------------------------------------------------
+
+    def _acquire(self) -> None:
+        task = _current_task()
+        with self._cond:
+            while self._inflight >= max(1, int(self.limit)):
+                self._cond.wait(0.2)
+                if task is not None:
+                    task.check_cancelled()
+            self._inflight += 1
+
+    def _release(self, latency: float | None, failed: bool, probe: bool = False) -> None:
+        with self._cond:
+            self._inflight -= 1
+            if probe:
+                # Only the probe's own slot re-opens the half-open gate; calls
+                # admitted before the breaker opened may still be finishing.
+                self._probe_inflight = False
+            now = time.monotonic()
+            if latency is not None:
+                if failed:
+                    self._failures += 1
+                    if (self._state == "half-open" and probe) or (
+                        self._failures >= self.breaker_threshold
+                    ):
+                        if self._state != "open":
+                            log_action(
+                                f"Scheduler[{self.name}]: circuit opened after "
+                                f"{self._failures} failures"
+                            )
+                        self._state = "open"
+                        self._opened_at = now
+                else:
+                    self._failures = 0
+                    if self._state == "half-open" and probe:
+                        self._state = "closed"
+                        log_action(f"Scheduler[{self.name}]: circuit closed")
+
+                if failed or latency > self.target_latency:
+                    # Multiplicative decrease, once per observed round trip.
+                    if now - self._last_decrease >= latency:
+                        self.limit = max(1.0, self.limit / 2)
+                        self._last_decrease = now
+                else:
+                    self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+            elif probe:
+                self._reopen_probe()
+            self._cond.notify_all()
+
+    def _abandon(self, probe: bool) -> None:
+        """A call gave up before getting a slot (e.g. cancelled while waiting)."""
+        if not probe:
+            return
+        with self._cond:
+            self._probe_inflight = False
+            self._reopen_probe()
+            self._cond.notify_all()
+
+    def _reopen_probe(self) -> None:
+        # The probe ended without a verdict; let the next call probe again.
+        if self._state == "half-open":
+            self._state = "open"
+            self._opened_at = time.monotonic() - self.breaker_cooldown
+
+    # -- public --------------------------------------------------------------
+
+    def run(
+        self, args: List[str], attempt, retry: bool = False
+    ) -> subprocess.CompletedProcess[str]:
+        """
+        Run `attempt()` under the limiter. Transient errors are retried only
+        with `retry` (read-only commands): a write that timed out may still
+        have succeeded, and repeating it gives "already exists" errors.
+        """
+        task = _current_task()
+        retries = self.retries if retry else 0
+        for n in range(retries + 1):
+            rejected, probe = self._admit()
+            if rejected:
+                return subprocess.CompletedProcess(args, 2, "", rejected + "\n")
+
+            try:
+                self._acquire()
+            except BaseException:
+                # Without this a cancelled probe would keep the breaker
+                # half-open for good.
+                self._abandon(probe)
+                raise
+            started = time.monotonic()
+            latency = None
+            failed = False
+            try:
+                result = attempt()
+                latency = time.monotonic() - started
+                failed = _net_error_code(result) in RETRYABLE_NET_ERRORS
+            finally:
+                self._release(latency, failed, probe)
+
+            if not failed or n == retries:
+                return result
+
+            delay = min(self.backoff_cap, self.backoff_base * (2 ** n))
+            delay = random.uniform(delay / 2, delay)
+            log_action(
+                f"Scheduler[{self.name}]: {' '.join(args)} failed with error "
+                f"{_net_error_code(result)}, retry {n + 1}/{retries} in {delay:.1f}s"
+            )
+            if task is not None:
+                if task._cancelled.wait(delay):
+                    raise _TaskCancelled()
+            else:
+                time.sleep(delay)
+        return result
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "limit": round(self.limit, 2),
+                "inflight": self._inflight,
+                "state": self._state,
+                "failures": self._failures,
+            }
+
+
+_SCHEDULERS = {
+    "local": _AdaptiveScheduler("local"),
+    "domain": _AdaptiveScheduler("domain"),
+}
+
+
+def _scheduler_for(args: List[str]) -> _AdaptiveScheduler:
+    is_domain = any(a.lower() == "/domain" for a in args)
+    return _SCHEDULERS["domain" if is_domain else "local"]
+
+
+def _configure_schedulers(cfg: dict) -> None:
+    """Apply sched_* settings from config.yml to both schedulers."""
+    options = {
+        "sched_max_concurrency": ("max_limit", int),
+        "sched_target_latency": ("target_latency", float),
+        "sched_retries": ("retries", int),
+        "sched_breaker_threshold": ("breaker_threshold", int),
+        "sched_breaker_cooldown": ("breaker_cooldown", float),
+    }
+    for key, (attr, conv) in options.items():
+        if key not in cfg:
+            continue
+        try:
+            value = conv(cfg[key])
+        except ValueError:
+            log_action(f"Invalid {key} in config.yml: {cfg[key]!r}")
+            continue
+        for sched in _SCHEDULERS.values():
+            setattr(sched, attr, value)
+            if attr == "max_limit":
+                sched.limit = min(sched.limit, float(value))
+
+
+# Optional replacement for running `net` & co., e.g. a simulated backend for
+# benchmarks (see wrpbypass_sim.py). It must provide run(args) returning a
+# CompletedProcess.
+_BACKEND = None
+
+
+def set_backend(backend):
+    """Replace the command backend (None = real processes); returns the old one."""
+    global _BACKEND
+    previous, _BACKEND = _BACKEND, backend
+    return previous
+
+
+def _execute(
+    args: List[str],
+    on_line=None,
+    encoding: str = "cp866",
+    scope: str | None = None,
+    retry: bool = False,
+) -> subprocess.CompletedProcess[str]:
+    """
+    Run a Windows command (cp866 output by default) through the backend
+    scheduler and return CompletedProcess. `scope` ("local"/"domain")
+    overrides the scheduler picked from the arguments; `retry` allows
+    retrying transient errors and must only be set for read-only commands.
+    """
+    sched = _SCHEDULERS[scope] if scope else _scheduler_for(args)
+    return sched.run(args, lambda: _execute_once(args, on_line, encoding), retry=retry)
+
+
+def _execute_once(
+    args: List[str], on_line=None, encoding: str = "cp866"
+) -> subprocess.CompletedProcess[str]:
+    """
+    Run a Windows command once.
+
+    Inside a background task the process is registered with the task (so it
+    can be cancelled) and stdout lines are passed to `on_line` as they arrive.
+    """
+    task = _current_task()
+    if _BACKEND is not None:
+        if task is not None:
+            task.check_cancelled()
+        result = _BACKEND.run(args)
+        if on_line is not None:
+            for line in result.stdout.splitlines():
+                on_line(line)
+        return result
+
+    if task is None and on_line is None:
+        return subprocess.run(
             args,
             text=True,
             capture_output=True,
             shell=False,
-            encoding="cp866",
+            encoding=encoding,
             errors="replace",
+            **_priority_popen_kwargs(),
+        )
+
+    if task is not None:
+        task.check_cancelled()
+    proc = subprocess.Popen(
+        args,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        encoding=encoding,
+        errors="replace",
+        **_isolated_popen_kwargs(),
+    )
+    if task is not None:
+        task.attach(proc)
+    try:
+        stderr_parts: list[str] = []
+        reader = threading.Thread(
+            target=lambda: stderr_parts.append(proc.stderr.read()), daemon=True
+        )
+        reader.start()
+        stdout_parts: list[str] = []
+        for line in proc.stdout:
+            stdout_parts.append(line)
+            if on_line is not None:
+                on_line(line.rstrip("\r\n"))
+        reader.join()
+        rc = proc.wait()
+    finally:
+        if task is not None:
+            task.detach(proc)
+    if task is not None:
+        task.check_cancelled()
+    return subprocess.CompletedProcess(args, rc, "".join(stdout_parts), "".join(stderr_parts))
+
+
+def _priority_popen_kwargs() -> dict:
+    """Run children of low-priority threads (prefetch) below normal priority."""
+    if getattr(_OUTPUT, "low_priority", False) and os.name == "nt":
+        return {"creationflags": subprocess.BELOW_NORMAL_PRIORITY_CLASS}
+    return {}
+
+
+def _run_backend(
+    args: List[str], cached: bool, on_line=None, read_only: bool = False
+) -> subprocess.CompletedProcess[str]:
+    """
+    cached: read-only command whose result is kept in the session cache.
+    read_only: read-only command that reuses a cached result if there is
+    one but does not store its own (per-account lookups in bulk reports,
+    which nobody reads again and would only grow the cache).
+    """
+    if read_only and not cached:
+        result = _SESSION_CACHE.peek(args) if _SESSION_CACHE.ttl > 0 else None
+        return result if result is not None else _execute(args, on_line, retry=True)
+    if cached and _SESSION_CACHE.ttl > 0:
+        result = _SESSION_CACHE.get(args, lambda: _execute(args, on_line, retry=True))
+        if LOG_SESSION_MODE == "interactive" and _SESSION_CACHE.is_stale(args):
+            age = _format_elapsed(_SESSION_CACHE.age(args) or 0)
+            warn(f"(cached data, {age} old - may be stale)")
+        return result
+    # A modifying command: whatever a running prefetch would still load
+    # is outdated; the menu restarts it once the cache is empty.
+    _PREFETCH.cancel()
+    try:
+        return _execute(args, on_line, retry=cached)
+    finally:
+        _SESSION_CACHE.invalidate()
+
+
+def run_command(args: List[str], cached: bool = False) -> int:
+    """
+    Run a Windows command (e.g., net) and print output (cp866 for Russian consoles).
+    Read-only commands pass cached=True to reuse results from the session cache.
+    Inside a background task, output is streamed line by line.
+    """
+    streamed: list[str] = []
+
+    def on_line(line: str) -> None:
+        streamed.append(line)
+        print(line)
+
+    try:
+        completed = _run_backend(
+            args, cached, on_line if _current_task() is not None else None
         )
     except FileNotFoundError:
         error("Command 'net' not found on this system.")
         return 1
 
-    if completed.stdout:
+    if completed.stdout and not streamed:
         print(completed.stdout.strip())
     if completed.stderr:
         print(completed.stderr.strip(), file=sys.stderr)
@@ -467,17 +1234,12 @@ def run_command(args: List[str]) -> int:
     return completed.returncode
 
 
-def capture_output(args: List[str]) -> subprocess.CompletedProcess[str] | None:
+def capture_output(
+    args: List[str], cached: bool = False, read_only: bool = False
+) -> subprocess.CompletedProcess[str] | None:
     """Run a command and return CompletedProcess without printing."""
     try:
-        completed = subprocess.run(
-            args,
-            text=True,
-            capture_output=True,
-            shell=False,
-            encoding="cp866",
-            errors="replace",
-        )
+        completed = _run_backend(args, cached, read_only=read_only)
     except FileNotFoundError:
         error("Command 'net' not found on this system.")
         return None
@@ -489,19 +1251,46 @@ def capture_output(args: List[str]) -> subprocess.CompletedProcess[str] | None:
 
 
 def cmd_user_list(args: argparse.Namespace) -> int:
+    if getattr(args, "view", False):
+        domain = getattr(args, "domain", False)
+        users = _get_all_usernames(domain=domain)
+        if not users:
+            error("Failed to get user list.")
+            return 1
+        if _browse_accounts("Domain users" if domain else "Users", users, domain=domain):
+            return 0
+        warn("Interactive view is not available here; printing the list.")
+
+    if getattr(args, "domain", False) and DOMAIN_SYNC_ENABLED:
+        users = _DOMAIN_SYNC.usernames()
+        if users is not None:
+            info(f"Domain users (synced snapshot): {len(users)}")
+            _print_name_columns(users)
+            _maybe_record_inventory(domain=True, users=users)
+            return 0
+        warn("Domain sync failed, falling back to `net user /domain`.")
+
     cmd = ["net", "user"]
     if getattr(args, "domain", False):
         cmd.append("/domain")
-    return run_command(cmd)
+    rc = run_command(cmd, cached=True)
+    if rc == 0:
+        _maybe_record_inventory(domain=getattr(args, "domain", False))
+    return rc
 
 
 def _get_all_usernames(domain: bool = False) -> List[str]:
     """Get list of users (local or domain)."""
+    if domain and DOMAIN_SYNC_ENABLED:
+        users = _DOMAIN_SYNC.usernames()
+        if users is not None:
+            return users
+
     base_cmd: List[str] = ["net", "user"]
     if domain:
         base_cmd.append("/domain")
 
-    completed = capture_output(base_cmd)
+    completed = capture_output(base_cmd, cached=True)
     if not completed or not completed.stdout:
         return []
 
@@ -515,8 +1304,7 @@ def _get_all_usernames(domain: bool = False) -> List[str]:
             set(line) <= {"-", " "}
             or "account" in low
             or "учетные записи" in low
-            or "команда выполнена успешно" in low
-            or "command completed successfully" in low
+            or _is_net_footer(line)
         ):
             continue
         users.extend(part for part in line.split() if part)
@@ -549,6 +1337,7 @@ def cmd_user_export(args: argparse.Namespace) -> int:
         return 1
 
     ok(f"Exported users: {len(users)} -> {out_path}")
+    _maybe_record_inventory(domain=getattr(args, "domain", False), users=users)
     return 0
 
 
@@ -621,7 +1410,7 @@ def cmd_user_show(args: argparse.Namespace) -> int:
     cmd = ["net", "user", args.username]
     if getattr(args, "domain", False):
         cmd.append("/domain")
-    return run_command(cmd)
+    return run_command(cmd, cached=True)
 
 
 def cmd_user_add(args: argparse.Namespace) -> int:
@@ -680,22 +1469,30 @@ def cmd_user_allow_password_change(args: argparse.Namespace) -> int:
 
 def cmd_group_list(args: argparse.Namespace) -> int:
     """List local groups."""
-    return run_command(["net", "localgroup"])
+    return run_command(["net", "localgroup"], cached=True)
 
 
 def cmd_group_show(args: argparse.Namespace) -> int:
     """Show local group details."""
-    return run_command(["net", "localgroup", args.groupname])
+    if getattr(args, "view", False):
+        proc = capture_output(["net", "localgroup", args.groupname], cached=True)
+        if not proc or proc.returncode != 0:
+            return proc.returncode if proc else 1
+        members = _parse_net_members(proc.stdout or "")
+        if _browse_accounts(f"Members of {args.groupname}", members):
+            return 0
+        warn("Interactive view is not available here; printing the list.")
+    return run_command(["net", "localgroup", args.groupname], cached=True)
 
 
 def cmd_domain_group_list(args: argparse.Namespace) -> int:
     """List domain groups via `net group /domain`."""
-    return run_command(["net", "group", "/domain"])
+    return run_command(["net", "group", "/domain"], cached=True)
 
 
 def cmd_domain_group_show(args: argparse.Namespace) -> int:
     """Show domain group details via `net group <name> /domain`."""
-    return run_command(["net", "group", args.groupname, "/domain"])
+    return run_command(["net", "group", args.groupname, "/domain"], cached=True)
 
 
 def cmd_group_add(args: argparse.Namespace) -> int:
@@ -728,96 +1525,1923 @@ def cmd_group_set_comment(args: argparse.Namespace) -> int:
     )
 
 
-def build_parser() -> argparse.ArgumentParser:
-    parser = argparse.ArgumentParser(
-        prog="wrpbypass",
-        description="CLI tool for Windows local user and group administration.",
-    )
+# ---------------------------------------------------------------------------
+# Virtualized list view for large user/group listings: a full-screen
+# prompt_toolkit application that formats only the rows that fit on screen,
+# with paging, type-ahead jump to prefix, incremental filter and per-row
+# actions. Render cost depends on the screen height, not the list size.
+# ---------------------------------------------------------------------------
+
+LIST_VIEW_ACTIONS = [
+    ("Enter", "show"),
+    ("Ctrl+E", "enable"),
+    ("Ctrl+D", "disable"),
+    ("Ctrl+G", "add to group"),
+]
+
+
+class _ListView:
+    """Scrollable, filterable list of names; run() returns (action, name)."""
+
+    def __init__(self, title: str, items: List[str]):
+        self.title = title
+        self.items = sorted(items, key=str.lower)
+        self._keys = [item.lower() for item in self.items]
+        self.filter = ""
+        self.filtering = False
+        self._filtered = list(range(len(self.items)))
+        self.cursor = 0
+        self.top = 0
+        self._jump = ""
+        self._jump_at = 0.0
+
+    # -- model -------------------------------------------------------------
+
+    def set_filter(self, text: str) -> None:
+        needle = text.lower()
+        # Narrowing the filter only needs to re-check the current matches.
+        if needle.startswith(self.filter.lower()):
+            base = self._filtered
+        else:
+            base = range(len(self.items))
+        current = self.selected()
+        self._filtered = [i for i in base if needle in self._keys[i]]
+        self.filter = text
+        self.cursor = 0
+        if current is not None:
+            for pos, i in enumerate(self._filtered):
+                if self.items[i] == current:
+                    self.cursor = pos
+                    break
+
+    def jump(self, char: str) -> None:
+        """Type-ahead: move to the first entry starting with the typed prefix."""
+        now = time.monotonic()
+        self._jump = (self._jump if now - self._jump_at < 1.0 else "") + char.lower()
+        self._jump_at = now
+        pos = bisect.bisect_left(self._filtered, self._jump, key=lambda i: self._keys[i])
+        if self._filtered:
+            self.cursor = min(pos, len(self._filtered) - 1)
+
+    def move(self, delta: int) -> None:
+        if self._filtered:
+            self.cursor = max(0, min(len(self._filtered) - 1, self.cursor + delta))
+
+    def selected(self) -> str | None:
+        if not self._filtered:
+            return None
+        return self.items[self._filtered[self.cursor]]
+
+    # -- view --------------------------------------------------------------
+
+    def _page_size(self) -> int:
+        from prompt_toolkit.application.current import get_app
+
+        # Two header lines and one footer line.
+        return max(1, get_app().output.get_size().rows - 3)
+
+    def _render(self):
+        height = self._page_size()
+        if self.cursor < self.top:
+            self.top = self.cursor
+        elif self.cursor >= self.top + height:
+            self.top = self.cursor - height + 1
+
+        shown = len(self._filtered)
+        header = f" {self.title}: {shown}"
+        if shown != len(self.items):
+            header += f" of {len(self.items)}"
+        if self.filter or self.filtering:
+            header += f"   filter: {self.filter}" + ("_" if self.filtering else "")
+        fragments = [("class:logo-main", header + "\n"), ("class:border-soft", "\n")]
+
+        for pos in range(self.top, min(self.top + height, shown)):
+            name = self.items[self._filtered[pos]]
+            row_style = "class:menu-highlight" if pos == self.cursor else "class:menu-text"
+            fragments.append((row_style, f" {name} \n"))
+        for _ in range(height - max(0, min(height, shown - self.top))):
+            fragments.append(("", "\n"))
+
+        keys = "  ".join(f"{key}={label}" for key, label in LIST_VIEW_ACTIONS)
+        fragments.append(
+            ("class:menu-number", f" {keys}  /=filter  type=jump  PgUp/PgDn  Esc=back")
+        )
+        return fragments
+
+    def run(self) -> tuple[str, str] | None:
+        from prompt_toolkit.application import Application
+        from prompt_toolkit.key_binding import KeyBindings
+        from prompt_toolkit.keys import Keys
+        from prompt_toolkit.layout import Layout
+        from prompt_toolkit.layout.containers import Window
+        from prompt_toolkit.layout.controls import FormattedTextControl
+
+        kb = KeyBindings()
+
+        @kb.add("up")
+        def _(event):
+            self.move(-1)
+
+        @kb.add("down")
+        def _(event):
+            self.move(1)
+
+        @kb.add("pageup")
+        def _(event):
+            self.move(-self._page_size())
+
+        @kb.add("pagedown")
+        def _(event):
+            self.move(self._page_size())
+
+        @kb.add("home")
+        def _(event):
+            self.cursor = 0
+
+        @kb.add("end")
+        def _(event):
+            self.move(len(self._filtered))
+
+        @kb.add("escape", eager=True)
+        def _(event):
+            if self.filtering:
+                self.filtering = False
+                self.set_filter("")
+            else:
+                event.app.exit(result=None)
+
+        @kb.add("c-c")
+        def _(event):
+            event.app.exit(result=None)
+
+        @kb.add("enter")
+        def _(event):
+            if self.filtering:
+                self.filtering = False
+            elif self.selected() is not None:
+                event.app.exit(result=("show", self.selected()))
+
+        for key, action in (("c-e", "enable"), ("c-d", "disable"), ("c-g", "add to group")):
+
+            @kb.add(key)
+            def _(event, action=action):
+                if self.selected() is not None:
+                    event.app.exit(result=(action, self.selected()))
+
+        @kb.add("backspace")
+        def _(event):
+            if self.filtering:
+                self.set_filter(self.filter[:-1])
+
+        @kb.add(Keys.Any)
+        def _(event):
+            char = event.data
+            if not char.isprintable():
+                return
+            if self.filtering:
+                self.set_filter(self.filter + char)
+            elif char == "/":
+                self.filtering = True
+            else:
+                self.jump(char)
 
-    parser.add_argument(
-        "--nocolor",
-        action="store_true",
-        help="Disable colored output (monochrome).",
-    )
+        app = Application(
+            layout=Layout(Window(FormattedTextControl(self._render), wrap_lines=False)),
+            key_bindings=kb,
+            style=_style(),
+            full_screen=True,
+        )
+        return app.run()
 
-    subparsers = parser.add_subparsers(dest="command", required=True)
 
-    # user subcommands
-    user_parser = subparsers.add_parser(
-        "user", help="Operations with local users."
-    )
-    user_sub = user_parser.add_subparsers(dest="user_cmd", required=True)
+def _browse_accounts(title: str, names: List[str], domain: bool = False) -> bool:
+    """
+    Open the list view over `names` and run row actions until Esc.
+    Returns False if the full-screen view cannot be used (caller falls back).
+    """
+    view = _ListView(title, names)
+    while True:
+        try:
+            result = view.run()
+        except Exception as e:
+            log_action(f"List view unavailable: {e!r}")
+            return False
+        if result is None:
+            return True
+
+        action, name = result
+        if action == "show":
+            cmd_user_show(argparse.Namespace(username=name, domain=domain))
+        elif domain:
+            warn("Enable/disable and group changes are only available for local accounts.")
+        elif action == "enable":
+            cmd_user_enable(argparse.Namespace(username=name))
+            log_action(f"Enabled user '{name}'")
+        elif action == "disable":
+            cmd_user_disable(argparse.Namespace(username=name))
+            log_action(f"Disabled user '{name}'")
+        elif action == "add to group":
+            group = ask(f"Add '{name}' to local group")
+            if group:
+                cmd_group_add_member(argparse.Namespace(groupname=group, username=name))
+                log_action(f"Added user '{name}' to group '{group}'")
+        try:
+            pause("")
+        except KeyboardInterrupt:
+            return True
+
+
+# ---------------------------------------------------------------------------
+# Account health report (`user report`): collect `net user <name>` details
+# for every account concurrently (through the session cache and backend
+# scheduler), evaluate rules and stream NDJSON/CSV rows as they arrive.
+# ---------------------------------------------------------------------------
+
+# `net user <name>` field labels (English / Russian consoles) -> report keys.
+_NET_USER_FIELDS = {
+    "account active": "active",
+    "учетная запись активна": "active",
+    "account expires": "expires",
+    "срок действия учетной записи": "expires",
+    "учетная запись истекает": "expires",
+    "password last set": "password_last_set",
+    "последний пароль задан": "password_last_set",
+    "password expires": "password_expires",
+    "действие пароля завершается": "password_expires",
+    "password required": "password_required",
+    "требуется пароль": "password_required",
+    "last logon": "last_logon",
+    "последний вход": "last_logon",
+    "full name": "full_name",
+    "полное имя": "full_name",
+}
+_YES = {"yes", "да"}
+_NO = {"no", "нет"}
+_NEVER = {"never", "никогда"}
+_NET_DATE_FORMATS = (
+    "%m/%d/%Y %I:%M:%S %p",
+    "%d.%m.%Y %H:%M:%S",
+    "%m/%d/%Y %H:%M:%S",
+    "%d/%m/%Y %H:%M:%S",
+    "%Y-%m-%d %H:%M:%S",
+    "%m/%d/%Y",
+    "%d.%m.%Y",
+)
+
+REPORT_COLUMNS = [
+    "user",
+    "active",
+    "expires",
+    "password_last_set",
+    "password_expires",
+    "password_required",
+    "last_logon",
+    "findings",
+    "error",
+]
+
+
+def _parse_net_date(value: str) -> datetime | None:
+    value = " ".join(value.split())
+    for fmt in _NET_DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    return None
 
-    user_list = user_sub.add_parser("list", help="List users.")
-    user_list.add_argument(
-        "--domain",
-        action="store_true",
-        help="Show domain users (net user /domain).",
-    )
-    user_list.set_defaults(func=cmd_user_list)
 
-    user_export = user_sub.add_parser(
-        "export",
-        help=(
-            "Export user list to CSV or JSON "
-            "(extended wrpbypass feature)."
-        ),
-    )
-    user_export.add_argument("path", help="Path to output file.")
-    user_export.add_argument(
-        "--format",
-        "-f",
-        default="csv",
-        choices=["csv", "json"],
-        help="Output format: csv or json (default: csv).",
-    )
-    user_export.add_argument(
-        "--domain",
-        action="store_true",
-        help="Export domain users (net user /domain).",
-    )
-    user_export.set_defaults(func=cmd_user_export)
+def _parse_net_user_details(stdout: str) -> dict[str, str]:
+    """Map the interesting `net user <name>` lines to report keys."""
+    fields: dict[str, str] = {}
+    for line in stdout.splitlines():
+        low = line.lower()
+        for label, key in _NET_USER_FIELDS.items():
+            if low.startswith(label) and key not in fields:
+                fields[key] = line[len(label):].strip()
+                break
+    return fields
 
-    user_search = user_sub.add_parser(
-        "search",
-        help=(
-            "Search users by name substring "
-            "(wrpbypass feature over `net user`)."
-        ),
-    )
-    user_search.add_argument("pattern", help="Substring to search in username.")
-    user_search.add_argument(
-        "--domain",
-        action="store_true",
-        help="Search among domain users (net user /domain).",
-    )
-    user_search.set_defaults(func=cmd_user_search)
 
-    user_bulk = user_sub.add_parser(
-        "bulk-add",
-        help=(
-            "Bulk create users from CSV "
-            "(not available in standard Windows tools)."
-        ),
-    )
-    user_bulk.add_argument("file", help="Path to CSV file.")
-    user_bulk.add_argument(
-        "--delimiter",
-        default=";",
-        help="CSV delimiter (default: ';').",
-    )
-    user_bulk.set_defaults(func=cmd_user_bulk_add)
+def _report_rules(stale_days: int) -> dict:
+    """Built-in rules: name -> predicate(fields, now)."""
 
-    user_show = user_sub.add_parser("show", help="Show user details.")
-    user_show.add_argument("username", help="User name.")
-    user_show.add_argument(
-        "--domain",
-        action="store_true",
-        help="Show domain user info (net user /domain).",
-    )
-    user_show.set_defaults(func=cmd_user_show)
+    def flag(value: str | None, words: set) -> bool:
+        return (value or "").strip().lower() in words
 
-    user_add = user_sub.add_parser("add", help="Create user.")
+    def older_than(value: str | None, now: datetime, days: int) -> bool:
+        moment = _parse_net_date(value or "")
+        return moment is not None and (now - moment).days > days
+
+    return {
+        "disabled": lambda f, now: flag(f.get("active"), _NO),
+        "expired": lambda f, now: (
+            (lambda d: d is not None and d < now)(_parse_net_date(f.get("expires", "")))
+        ),
+        "never_logged_in": lambda f, now: flag(f.get("last_logon"), _NEVER),
+        "password_never_expires": lambda f, now: flag(f.get("password_expires"), _NEVER),
+        "password_not_required": lambda f, now: flag(f.get("password_required"), _NO),
+        "stale_logon": lambda f, now: older_than(f.get("last_logon"), now, stale_days),
+    }
+
+
+def cmd_user_report(args: argparse.Namespace) -> int:
+    """Evaluate health rules for every account, streaming detail rows."""
+    from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+    domain = getattr(args, "domain", False)
+    rules = _report_rules(args.stale_days)
+    if args.rules:
+        selected = [r.strip() for r in args.rules.split(",") if r.strip()]
+        unknown = [r for r in selected if r not in rules]
+        if unknown:
+            error(f"Unknown rules: {', '.join(unknown)}. Available: {', '.join(rules)}")
+            return 1
+        rules = {name: rules[name] for name in selected}
+
+    users = _get_all_usernames(domain=domain)
+    if not users:
+        error("Failed to get user list.")
+        return 1
+
+    out = None
+    writer = None
+    if args.output:
+        out_path = Path(args.output)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        if args.format == "csv":
+            out = out_path.open("w", newline="", encoding="utf-8-sig")
+            writer = csv.writer(out, delimiter=";")
+            writer.writerow(REPORT_COLUMNS)
+        else:
+            out = out_path.open("w", encoding="utf-8")
+
+    def collect(name: str) -> dict:
+        cmd = ["net", "user", name] + (["/domain"] if domain else [])
+        proc = capture_output(cmd, read_only=True)
+        if not proc or proc.returncode != 0:
+            return {"user": name, "error": (proc.stderr.strip() if proc else "failed")}
+        fields = _parse_net_user_details(proc.stdout or "")
+        fields["user"] = name
+        return fields
+
+    now = datetime.now()
+    counts = {name: 0 for name in rules}
+    failed = 0
+    started = time.monotonic()
+
+    def emit(row: dict) -> None:
+        nonlocal failed
+        if "error" in row:
+            failed += 1
+            findings: list[str] = []
+        else:
+            findings = [name for name, pred in rules.items() if pred(row, now)]
+            for name in findings:
+                counts[name] += 1
+        row["findings"] = findings
+        if out is None:
+            if findings:
+                print(f"  {row['user']:<25} {', '.join(findings)}")
+        elif writer is not None:
+            writer.writerow(
+                [
+                    ",".join(row[k]) if k == "findings" else row.get(k, "")
+                    for k in REPORT_COLUMNS
+                ]
+            )
+        else:
+            out.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+    # Keep a bounded window of in-flight lookups so memory does not grow
+    # with the number of accounts; the scheduler limits real concurrency.
+    window = max(1, args.workers) * 2
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+            pending = set()
+            names = iter(users)
+            for name in names:
+                pending.add(pool.submit(collect, name))
+                if len(pending) >= window:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        emit(fut.result())
+            for fut in pending:
+                emit(fut.result())
+    finally:
+        if out is not None:
+            out.close()
+
+    elapsed = time.monotonic() - started
+    info(f"Accounts checked: {len(users)} in {elapsed:.1f}s (errors: {failed})")
+    for name, count in counts.items():
+        (warn if count else ok)(f"  {name:<24} {count}")
+    if args.output:
+        ok(f"Details written to {args.output}")
+    log_action(
+        f"User report ({'domain' if domain else 'local'}): {len(users)} accounts, "
+        + ", ".join(f"{k}={v}" for k, v in counts.items())
+    )
+    return 0 if failed == 0 else 1
+
+
+# ---------------------------------------------------------------------------
+# Account inventory: optional SQLite store in DATA_DIR with one snapshot per
+# enumeration (users + group memberships), so changes between visits can be
+# answered with indexed queries instead of diffing exported CSV files.
+# Snapshots recorded as a side effect of `user list`/`user export` reuse the
+# account list those commands fetched and skip group memberships
+# (memberships = 0); only `inventory snapshot` enumerates every group.
+# ---------------------------------------------------------------------------
+
+INVENTORY_DB = DATA_DIR / "inventory.db"
+INVENTORY_ENABLED = False  # config: inventory (record snapshot on user list/export)
+
+_INVENTORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    taken_at TEXT NOT NULL,
+    host TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    memberships INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS idx_snapshots_time ON snapshots(host, scope, taken_at);
+
+CREATE TABLE IF NOT EXISTS accounts (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots(id) ON DELETE CASCADE,
+    username TEXT NOT NULL COLLATE NOCASE,
+    PRIMARY KEY (snapshot_id, username)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_accounts_user ON accounts(username, snapshot_id);
+
+CREATE TABLE IF NOT EXISTS memberships (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots(id) ON DELETE CASCADE,
+    groupname TEXT NOT NULL COLLATE NOCASE,
+    username TEXT NOT NULL COLLATE NOCASE,
+    PRIMARY KEY (snapshot_id, groupname, username)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_memberships_group ON memberships(groupname, snapshot_id);
+CREATE INDEX IF NOT EXISTS idx_memberships_user ON memberships(username, snapshot_id);
+"""
+
+
+def _is_net_footer(line: str) -> bool:
+    low = line.lower()
+    return "command completed successfully" in low or "команда выполнена успешно" in low
+
+
+def _parse_net_groups(stdout: str) -> List[str]:
+    """Parse `net localgroup` / `net group /domain` output (`*Name` lines)."""
+    return [line.strip()[1:].strip() for line in stdout.splitlines() if line.strip().startswith("*")]
+
+
+def _parse_net_members(stdout: str, columns: bool = False) -> List[str]:
+    """
+    Parse members listed after the dashed separator of `net localgroup <g>`
+    (one per line) or `net group <g> /domain` (several per line).
+    """
+    members: List[str] = []
+    in_list = False
+    for line in stdout.splitlines():
+        stripped = line.strip()
+        if not in_list:
+            in_list = bool(stripped) and set(stripped) <= {"-"}
+            continue
+        if not stripped:
+            continue
+        if _is_net_footer(stripped):
+            break
+        if columns:
+            members.extend(stripped.split())
+        else:
+            members.append(stripped)
+    return members
+
+
+def _collect_inventory(domain: bool = False) -> tuple[List[str], dict[str, List[str]]] | None:
+    """Enumerate users and group memberships (local or domain)."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    users = _get_all_usernames(domain=domain)
+    if not users:
+        return None
+
+    list_cmd = ["net", "group", "/domain"] if domain else ["net", "localgroup"]
+    completed = capture_output(list_cmd, cached=True)
+    groups = _parse_net_groups(completed.stdout) if completed and completed.stdout else []
+
+    def members(group: str) -> List[str]:
+        cmd = ["net", "group", group, "/domain"] if domain else ["net", "localgroup", group]
+        proc = capture_output(cmd, read_only=True)
+        if not proc or proc.returncode != 0:
+            return []
+        return _parse_net_members(proc.stdout or "", columns=domain)
+
+    # The backend scheduler decides how many of these actually run at once.
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        memberships = dict(zip(groups, pool.map(members, groups)))
+    return users, memberships
+
+
+def _inventory_connect() -> "sqlite3.Connection":
+    conn = sqlite3.connect(str(INVENTORY_DB), timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.executescript(_INVENTORY_SCHEMA)
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(snapshots)")]
+    if "memberships" not in columns:
+        # Databases from before accounts-only snapshots: all of them are full.
+        with conn:
+            conn.execute(
+                "ALTER TABLE snapshots ADD COLUMN memberships INTEGER NOT NULL DEFAULT 1"
+            )
+    return conn
+
+
+def _inventory_host(args: argparse.Namespace | None = None) -> str:
+    host = getattr(args, "host", None) if args is not None else None
+    return host or os.environ.get("COMPUTERNAME") or platform.node() or "unknown"
+
+
+def _inventory_scope(domain: bool) -> str:
+    return "domain" if domain else "local"
+
+
+def record_inventory_snapshot(
+    domain: bool = False, users: List[str] | None = None
+) -> int | None:
+    """
+    Enumerate accounts and store them as a new snapshot; returns its id.
+    With `users` (an account list the caller already has) nothing is
+    enumerated and the snapshot records accounts only.
+    """
+    if users is not None:
+        memberships: dict[str, List[str]] | None = None
+    else:
+        collected = _collect_inventory(domain=domain)
+        if collected is None:
+            error("Failed to enumerate accounts for inventory snapshot.")
+            return None
+        users, memberships = collected
+
+    conn = _inventory_connect()
+    try:
+        # One transaction per snapshot keeps large domains fast.
+        with conn:
+            cur = conn.execute(
+                "INSERT INTO snapshots (taken_at, host, scope, memberships) VALUES (?, ?, ?, ?)",
+                (
+                    datetime.now().isoformat(sep=" ", timespec="seconds"),
+                    _inventory_host(),
+                    _inventory_scope(domain),
+                    int(memberships is not None),
+                ),
+            )
+            snapshot_id = cur.lastrowid
+            conn.executemany(
+                "INSERT OR IGNORE INTO accounts (snapshot_id, username) VALUES (?, ?)",
+                ((snapshot_id, u) for u in users),
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO memberships (snapshot_id, groupname, username) "
+                "VALUES (?, ?, ?)",
+                (
+                    (snapshot_id, group, member)
+                    for group, members in (memberships or {}).items()
+                    for member in members
+                ),
+            )
+    finally:
+        conn.close()
+
+    if memberships is None:
+        detail = "accounts only"
+    else:
+        detail = f"{sum(len(m) for m in memberships.values())} memberships"
+    log_action(
+        f"Inventory snapshot #{snapshot_id} ({_inventory_scope(domain)}): "
+        f"{len(users)} users, {detail}"
+    )
+    return snapshot_id
+
+
+def _maybe_record_inventory(domain: bool, users: List[str] | None = None) -> None:
+    """
+    Record an accounts-only snapshot after an enumeration when `inventory:
+    true` is configured. `users` is the list the command already fetched;
+    without it the list comes from the session cache.
+    """
+    if INVENTORY_ENABLED:
+        if users is None:
+            users = _get_all_usernames(domain=domain)
+        if not users:
+            return
+        snapshot_id = record_inventory_snapshot(domain=domain, users=users)
+        if snapshot_id is not None:
+            info(f"Inventory snapshot #{snapshot_id} recorded.")
+
+
+def _parse_since(value: str) -> str:
+    """
+    Convert --since (YYYY-MM-DD[ HH:MM[:SS]] or relative 90min / 12h / 30d /
+    2w / 3mo) into the snapshot timestamp format. A bare "m" is rejected as
+    ambiguous (minutes or months).
+    """
+    from datetime import timedelta
+
+    value = value.strip()
+    units = {"min": 60, "h": 3600, "d": 86400, "w": 7 * 86400, "mo": 30 * 86400}
+    m = re.fullmatch(r"(\d+)\s*([a-z]+)", value.lower())
+    if m and m.group(2) == "m":
+        raise ValueError(
+            f"Ambiguous --since value: {value!r} (use {m.group(1)}min for minutes "
+            f"or {m.group(1)}mo for months)."
+        )
+    if m and m.group(2) in units:
+        moment = datetime.now() - timedelta(seconds=int(m.group(1)) * units[m.group(2)])
+    else:
+        try:
+            moment = datetime.fromisoformat(value)
+        except ValueError:
+            raise ValueError(
+                f"Invalid --since value: {value!r} "
+                "(use YYYY-MM-DD or e.g. 90min, 12h, 30d, 2w, 3mo)."
+            )
+    return moment.isoformat(sep=" ", timespec="seconds")
+
+
+def _latest_snapshot(conn, host: str, scope: str, before: str | None = None):
+    sql = "SELECT id, taken_at FROM snapshots WHERE host = ? AND scope = ?"
+    params: list = [host, scope]
+    if before is not None:
+        sql += " AND taken_at <= ?"
+        params.append(before)
+    sql += " ORDER BY taken_at DESC, id DESC LIMIT 1"
+    return conn.execute(sql, params).fetchone()
+
+
+def _membership_snapshot(conn, host: str, scope: str, snap):
+    """The latest snapshot with group memberships at or before `snap`."""
+    return conn.execute(
+        "SELECT id, taken_at FROM snapshots WHERE host = ? AND scope = ? AND memberships = 1 "
+        "AND (taken_at < ? OR (taken_at = ? AND id <= ?)) "
+        "ORDER BY taken_at DESC, id DESC LIMIT 1",
+        (host, scope, snap[1], snap[1], snap[0]),
+    ).fetchone()
+
+
+def _like_pattern(value: str) -> str:
+    return value.replace("*", "%").replace("?", "_")
+
+
+def cmd_inventory_snapshot(args: argparse.Namespace) -> int:
+    """Record a new inventory snapshot."""
+    started = time.monotonic()
+    snapshot_id = record_inventory_snapshot(domain=args.domain)
+    if snapshot_id is None:
+        return 1
+    conn = _inventory_connect()
+    try:
+        users = conn.execute(
+            "SELECT COUNT(*) FROM accounts WHERE snapshot_id = ?", (snapshot_id,)
+        ).fetchone()[0]
+        members = conn.execute(
+            "SELECT COUNT(*) FROM memberships WHERE snapshot_id = ?", (snapshot_id,)
+        ).fetchone()[0]
+    finally:
+        conn.close()
+    ok(
+        f"Snapshot #{snapshot_id}: {users} users, {members} group memberships "
+        f"({time.monotonic() - started:.1f}s) -> {INVENTORY_DB}"
+    )
+    return 0
+
+
+def cmd_inventory_list(args: argparse.Namespace) -> int:
+    """List recorded snapshots."""
+    conn = _inventory_connect()
+    try:
+        rows = conn.execute(
+            "SELECT s.id, s.taken_at, s.host, s.scope, "
+            "(SELECT COUNT(*) FROM accounts a WHERE a.snapshot_id = s.id), s.memberships "
+            "FROM snapshots s ORDER BY s.taken_at, s.id"
+        ).fetchall()
+    finally:
+        conn.close()
+    if not rows:
+        warn("No inventory snapshots recorded yet.")
+        return 0
+    for sid, taken_at, host, scope, users, full in rows:
+        kind = "" if full else "  (accounts only)"
+        print(f"  #{sid:<5} {taken_at}  {host:<16} {scope:<7} users={users}{kind}")
+    return 0
+
+
+def cmd_inventory_diff(args: argparse.Namespace) -> int:
+    """Show accounts and memberships that changed since a point in time."""
+    host = _inventory_host(args)
+    scope = _inventory_scope(args.domain)
+    conn = _inventory_connect()
+    try:
+        latest = _latest_snapshot(conn, host, scope)
+        if latest is None:
+            warn(f"No {scope} snapshots for {host}. Run `inventory snapshot` first.")
+            return 1
+        if args.since:
+            try:
+                since = _parse_since(args.since)
+            except ValueError as e:
+                error(str(e))
+                return 1
+            base = _latest_snapshot(conn, host, scope, before=since)
+            if base is None:
+                # Nothing that old: compare against the oldest snapshot.
+                base = conn.execute(
+                    "SELECT id, taken_at FROM snapshots WHERE host = ? AND scope = ? "
+                    "ORDER BY taken_at, id LIMIT 1",
+                    (host, scope),
+                ).fetchone()
+        else:
+            base = conn.execute(
+                "SELECT id, taken_at FROM snapshots WHERE host = ? AND scope = ? AND id <> ? "
+                "ORDER BY taken_at DESC, id DESC LIMIT 1",
+                (host, scope, latest[0]),
+            ).fetchone()
+        if base is None or base[0] == latest[0]:
+            warn("Only one snapshot available; nothing to compare.")
+            return 0
+
+        new_id, old_id = latest[0], base[0]
+        info(f"Changes from #{old_id} ({base[1]}) to #{new_id} ({latest[1]}):")
+
+        group_filter = ""
+        group_params: list = []
+        if args.group:
+            group_filter = " AND groupname LIKE ?"
+            group_params = [_like_pattern(args.group)]
+
+        def account_delta(a: int, b: int) -> List[str]:
+            return [
+                r[0]
+                for r in conn.execute(
+                    "SELECT username FROM accounts WHERE snapshot_id = ? "
+                    "EXCEPT SELECT username FROM accounts WHERE snapshot_id = ? "
+                    "ORDER BY 1",
+                    (a, b),
+                )
+            ]
+
+        def member_delta(a: int, b: int) -> list[tuple[str, str]]:
+            return conn.execute(
+                "SELECT groupname, username FROM memberships WHERE snapshot_id = ?"
+                + group_filter
+                + " EXCEPT SELECT groupname, username FROM memberships WHERE snapshot_id = ?"
+                + group_filter
+                + " ORDER BY 1, 2",
+                [a, *group_params, b, *group_params],
+            ).fetchall()
+
+        # Accounts-only snapshots (from `user list`/`user export`) carry no
+        # memberships: compare the nearest full snapshots instead.
+        new_full = _membership_snapshot(conn, host, scope, latest)
+        old_full = _membership_snapshot(conn, host, scope, base)
+        compare_members = (
+            new_full is not None and old_full is not None and new_full[0] != old_full[0]
+        )
+
+        changes = 0
+        if not args.group:
+            for name in account_delta(new_id, old_id):
+                ok(f"  + user {name}")
+                changes += 1
+            for name in account_delta(old_id, new_id):
+                warn(f"  - user {name}")
+                changes += 1
+        if compare_members:
+            if (new_full[0], old_full[0]) != (new_id, old_id):
+                info(f"  Group memberships: #{old_full[0]} to #{new_full[0]}")
+            for group, name in member_delta(new_full[0], old_full[0]):
+                ok(f"  + {name} joined {group}")
+                changes += 1
+            for group, name in member_delta(old_full[0], new_full[0]):
+                warn(f"  - {name} left {group}")
+                changes += 1
+        elif args.group:
+            warn(
+                "  No two snapshots with group memberships in this range "
+                "(they are recorded by `inventory snapshot`)."
+            )
+            return 0
+    finally:
+        conn.close()
+
+    if not changes:
+        info("  (no changes)")
+    return 0
+
+
+def cmd_inventory_history(args: argparse.Namespace) -> int:
+    """Show presence and group memberships of one user across snapshots."""
+    host = _inventory_host(args)
+    scope = _inventory_scope(args.domain)
+    conn = _inventory_connect()
+    try:
+        rows = conn.execute(
+            "SELECT s.id, s.taken_at, s.memberships, "
+            "EXISTS (SELECT 1 FROM accounts a WHERE a.snapshot_id = s.id AND a.username = ?), "
+            "(SELECT group_concat(m.groupname, ', ') FROM memberships m "
+            " WHERE m.snapshot_id = s.id AND m.username = ?) "
+            "FROM snapshots s WHERE s.host = ? AND s.scope = ? ORDER BY s.taken_at, s.id",
+            (args.username, args.username, host, scope),
+        ).fetchall()
+    finally:
+        conn.close()
+    if not rows:
+        warn(f"No {scope} snapshots for {host}.")
+        return 1
+
+    previous = None
+    for sid, taken_at, full, present, groups in rows:
+        if full:
+            shown = groups or "-"
+        else:
+            # Accounts-only snapshot: memberships unknown, not changed.
+            groups = previous[1] if previous else ""
+            shown = "(groups not recorded)"
+        state = (bool(present), groups or "")
+        marker = " " if state == previous else "*"
+        status = "present" if present else "absent "
+        print(f" {marker} #{sid:<5} {taken_at}  {status}  {shown}")
+        previous = state
+    return 0
+
+
+def cmd_inventory_query(args: argparse.Namespace) -> int:
+    """Query memberships of a snapshot (latest by default)."""
+    host = _inventory_host(args)
+    scope = _inventory_scope(args.domain)
+    conn = _inventory_connect()
+    try:
+        with_members = bool(args.group or args.user)
+        if args.snapshot:
+            snap = conn.execute(
+                "SELECT id, taken_at, memberships FROM snapshots WHERE id = ?", (args.snapshot,)
+            ).fetchone()
+            if snap is not None and with_members and not snap[2]:
+                warn(
+                    f"Snapshot #{snap[0]} has no group memberships "
+                    "(recorded by `user list`/`user export`)."
+                )
+                return 1
+        else:
+            snap = _latest_snapshot(conn, host, scope)
+            if snap is not None and with_members:
+                snap = _membership_snapshot(conn, host, scope, snap)
+        if snap is None:
+            warn("Snapshot not found.")
+            return 1
+
+        if args.group:
+            sql = (
+                "SELECT groupname, username FROM memberships WHERE snapshot_id = ? "
+                "AND groupname LIKE ?"
+            )
+            params: list = [snap[0], _like_pattern(args.group)]
+            if args.user:
+                sql += " AND username LIKE ?"
+                params.append(_like_pattern(args.user))
+        elif args.user:
+            sql = (
+                "SELECT a.username, m.groupname FROM accounts a "
+                "LEFT JOIN memberships m ON m.snapshot_id = a.snapshot_id "
+                "AND m.username = a.username "
+                "WHERE a.snapshot_id = ? AND a.username LIKE ?"
+            )
+            params = [snap[0], _like_pattern(args.user)]
+        else:
+            sql = "SELECT username, NULL FROM accounts WHERE snapshot_id = ?"
+            params = [snap[0]]
+        rows = conn.execute(sql + " ORDER BY 1, 2", params).fetchall()
+    finally:
+        conn.close()
+
+    if args.format == "json":
+        key_a, key_b = ("group", "user") if args.group else ("user", "group")
+        print(
+            json.dumps(
+                {
+                    "snapshot": snap[0],
+                    "taken_at": snap[1],
+                    "rows": [{key_a: a, key_b: b} for a, b in rows],
+                },
+                ensure_ascii=False,
+                indent=2,
+            )
+        )
+    else:
+        info(f"Snapshot #{snap[0]} ({snap[1]}): {len(rows)} rows")
+        for a, b in rows:
+            print(f"  {a:<30} {b or ''}")
+    return 0
+
+
+# ---------------------------------------------------------------------------
+# Incremental domain sync. Instead of re-enumerating `net user /domain` on
+# every call, keep a local snapshot of domain accounts (keyed by objectGUID)
+# plus a high-water mark: the DC's highestCommittedUSN at the last sync.
+# Later runs ask the same DC only for objects with uSNChanged above the mark
+# (including tombstones for deletions) and merge them in. The mark is
+# invalid - and a full resync is done - when the DC or its invocationId
+# changed, its USN went backwards, or the mark is older than the forest's
+# tombstone lifetime (read from the Directory Service object; 60 days when
+# unset, as in forests created before Windows Server 2003 SP1).
+# ---------------------------------------------------------------------------
+
+DOMAIN_SYNC_FILE = DATA_DIR / "domain_sync.json"
+DOMAIN_SYNC_ENABLED = False  # config: domain_sync
+TOMBSTONE_LIFETIME_DAYS = 60  # AD default when tombstoneLifetime is not set
+
+# PowerShell/ADSI query against one DC. Output: a header line
+# "#<TAB>server<TAB>invocationId<TAB>highestCommittedUSN<TAB>tombstoneLifetime"
+# (read before the search, so changes made during it are picked up next
+# time), then "guid<TAB>usnChanged<TAB>isDeleted<TAB>sAMAccountName" per
+# account. Full and incremental runs use the same account filter (by
+# objectClass, which tombstones keep; objectCategory is stripped on delete).
+_ADSI_SYNC_SCRIPT = r"""
+$ErrorActionPreference = 'Stop'
+[Console]::OutputEncoding = [Text.Encoding]::UTF8
+try {
+  $server = '__SERVER__'
+  if (-not $server) { $server = [string]([ADSI]'LDAP://RootDSE').dnsHostName }
+  $root = [ADSI]("LDAP://$server/RootDSE")
+  $usn = [string]$root.highestCommittedUSN
+  $svc = [ADSI]("LDAP://$server/" + [string]$root.dsServiceName)
+  $inv = (New-Object Guid (,[byte[]]$svc.invocationId.Value)).ToString()
+  $tsl = __TOMBSTONE_DEFAULT__
+  try {
+    $ds = [ADSI]("LDAP://$server/CN=Directory Service,CN=Windows NT,CN=Services," + [string]$root.configurationNamingContext)
+    if ($ds.tombstoneLifetime.Count -and [int]$ds.tombstoneLifetime.Value -gt 0) { $tsl = [int]$ds.tombstoneLifetime.Value }
+  } catch {}
+  "#`t$server`t$inv`t$usn`t$tsl"
+  $s = New-Object DirectoryServices.DirectorySearcher([ADSI]("LDAP://$server/" + [string]$root.defaultNamingContext))
+  $s.PageSize = 1000
+  $since = __SINCE__
+  $accounts = '(objectClass=user)(!(objectClass=computer))'
+  if ($since -gt 0) {
+    $s.Filter = "(&$accounts(uSNChanged>=$since))"
+    $s.Tombstone = $true
+  } else {
+    $s.Filter = "(&$accounts)"
+  }
+  [void]$s.PropertiesToLoad.AddRange([string[]]@('samaccountname','usnchanged','isdeleted','objectguid'))
+  foreach ($r in $s.FindAll()) {
+    $p = $r.Properties
+    $guid = (New-Object Guid (,[byte[]]$p['objectguid'][0])).ToString()
+    $del = if ($p['isdeleted'].Count -and $p['isdeleted'][0]) { 1 } else { 0 }
+    "$guid`t$($p['usnchanged'][0])`t$del`t$($p['samaccountname'][0])"
+  }
+} catch {
+  $code = $_.Exception.HResult -band 0xFFFF
+  [Console]::Error.WriteLine("System error $code has occurred. $($_.Exception.Message)")
+  exit 2
+}
+"""
+
+
+class _SyncBatch:
+    def __init__(
+        self,
+        server: str,
+        invocation: str,
+        usn: int,
+        rows: list,
+        tombstone_days: int = TOMBSTONE_LIFETIME_DAYS,
+    ):
+        self.server = server
+        self.invocation = invocation
+        self.usn = usn
+        self.rows = rows  # (guid, usn, deleted, name)
+        self.tombstone_days = tombstone_days
+
+
+def _parse_sync_output(stdout: str) -> _SyncBatch | None:
+    header = None
+    rows = []
+    for line in stdout.splitlines():
+        parts = line.rstrip("\r").split("\t")
+        if parts[0] == "#" and len(parts) in (4, 5):
+            header = parts[1:]
+        elif len(parts) == 4 and header is not None:
+            guid, usn, deleted, name = parts
+            rows.append((guid.lower(), int(usn or 0), deleted == "1", name))
+    if header is None:
+        return None
+    tombstone_days = int(header[3]) if len(header) > 3 and header[3].isdigit() else 0
+    return _SyncBatch(
+        header[0],
+        header[1],
+        int(header[2] or 0),
+        rows,
+        tombstone_days or TOMBSTONE_LIFETIME_DAYS,
+    )
+
+
+class _AdsiSyncSource:
+    """Query a domain controller through ADSI (PowerShell, no RSAT needed)."""
+
+    def fetch(self, since: int, server: str | None) -> _SyncBatch | None:
+        if server and not re.fullmatch(r"[A-Za-z0-9.\-]+", server):
+            server = None
+        script = (
+            _ADSI_SYNC_SCRIPT.replace("__SERVER__", server or "")
+            .replace("__SINCE__", str(int(since)))
+            .replace("__TOMBSTONE_DEFAULT__", str(TOMBSTONE_LIFETIME_DAYS))
+        )
+        try:
+            completed = _execute(
+                [
+                    "powershell.exe",
+                    "-NoProfile",
+                    "-NonInteractive",
+                    "-ExecutionPolicy",
+                    "Bypass",
+                    "-Command",
+                    script,
+                ],
+                encoding="utf-8",
+                scope="domain",
+                retry=True,
+            )
+        except FileNotFoundError:
+            error("powershell.exe not found; domain sync is unavailable.")
+            return None
+        if completed.returncode != 0:
+            if completed.stderr:
+                print(completed.stderr.strip(), file=sys.stderr)
+            return None
+        return _parse_sync_output(completed.stdout)
+
+
+class _FileSyncSource:
+    """
+    LDAP-like stand-in backed by a JSON file (WRP_LDAP_STANDIN=path):
+    {"server": ..., "invocation": ..., "highest_usn": N, "tombstone_lifetime": N,
+     "objects": [{"guid": ..., "name": ..., "usn": N, "deleted": false}]}
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+
+    def fetch(self, since: int, server: str | None) -> _SyncBatch | None:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            error(f"Cannot read LDAP stand-in {self.path}: {e}")
+            return None
+        rows = []
+        for obj in data.get("objects", []):
+            usn = int(obj.get("usn", 0))
+            deleted = bool(obj.get("deleted", False))
+            if (since > 0 and usn >= since) or (since <= 0 and not deleted):
+                rows.append((str(obj["guid"]).lower(), usn, deleted, obj.get("name", "")))
+        return _SyncBatch(
+            data.get("server", "standin"),
+            data.get("invocation", ""),
+            int(data.get("highest_usn", 0)),
+            rows,
+            int(data.get("tombstone_lifetime") or TOMBSTONE_LIFETIME_DAYS),
+        )
+
+
+class _DomainSync:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state: dict | None = None
+        self._synced_at = 0.0  # monotonic time of the last sync in this process
+
+    def _source(self):
+        standin = os.environ.get("WRP_LDAP_STANDIN")
+        return _FileSyncSource(standin) if standin else _AdsiSyncSource()
+
+    def _load(self) -> dict | None:
+        try:
+            state = json.loads(DOMAIN_SYNC_FILE.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        return state if state.get("version") == 1 else None
+
+    def _save(self, state: dict) -> None:
+        tmp = DOMAIN_SYNC_FILE.with_suffix(".tmp")
+        tmp.write_text(json.dumps(state, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, DOMAIN_SYNC_FILE)
+
+    def _mark_valid(self, state: dict | None) -> bool:
+        if not state:
+            return False
+        try:
+            synced = datetime.fromisoformat(state["synced_at"])
+        except (KeyError, ValueError):
+            return False
+        lifetime = state.get("tombstone_days", TOMBSTONE_LIFETIME_DAYS)
+        return (datetime.now() - synced).days < lifetime
+
+    def sync(self, full: bool = False) -> dict | None:
+        """Bring the local snapshot up to date; returns sync statistics."""
+        with self._lock:
+            started = time.monotonic()
+            source = self._source()
+            state = self._state or self._load()
+            mode = "full"
+            changes = 0
+            batch = None
+
+            if not full and self._mark_valid(state):
+                batch = source.fetch(state["usn"] + 1, state["server"])
+                if batch is None:
+                    return None
+                if (
+                    batch.server.lower() != state["server"].lower()
+                    or batch.invocation != state["invocation"]
+                    or batch.usn < state["usn"]
+                ):
+                    log_action(
+                        f"Domain sync: high-water mark invalid ({state['server']} "
+                        f"usn={state['usn']} -> {batch.server} usn={batch.usn}), full resync"
+                    )
+                    batch = None
+                else:
+                    mode = "incremental"
+                    users = state["users"]
+                    for guid, _usn, deleted, name in batch.rows:
+                        if deleted:
+                            changes += users.pop(guid, None) is not None
+                        elif users.get(guid) != name:
+                            users[guid] = name
+                            changes += 1
+
+            if batch is None:
+                batch = source.fetch(0, None)
+                if batch is None:
+                    return None
+                users = {guid: name for guid, _usn, deleted, name in batch.rows if not deleted}
+                changes = len(users)
+
+            state = {
+                "version": 1,
+                "server": batch.server,
+                "invocation": batch.invocation,
+                "usn": batch.usn,
+                "tombstone_days": batch.tombstone_days,
+                "synced_at": datetime.now().isoformat(timespec="seconds"),
+                "users": users,
+            }
+            self._save(state)
+            self._state = state
+            self._synced_at = time.monotonic()
+
+            stats = {
+                "mode": mode,
+                "server": batch.server,
+                "usn": batch.usn,
+                "fetched": len(batch.rows),
+                "changes": changes,
+                "total": len(users),
+                "seconds": time.monotonic() - started,
+            }
+            log_action(
+                f"Domain sync ({mode}) from {batch.server}: fetched {stats['fetched']}, "
+                f"changes {changes}, total {stats['total']}, usn {batch.usn}"
+            )
+            return stats
+
+    def _age(self, state: dict | None) -> float | None:
+        """Seconds since the snapshot was synced (by any process), or None."""
+        if self._state is state and self._synced_at:
+            return time.monotonic() - self._synced_at
+        try:
+            return (datetime.now() - datetime.fromisoformat(state["synced_at"])).total_seconds()
+        except (TypeError, KeyError, ValueError):
+            return None
+
+    def usernames(self) -> List[str] | None:
+        """
+        Domain user names from the synced snapshot. It is refreshed only when
+        older than cache_ttl, so separate CLI calls in quick succession reuse
+        the snapshot on disk instead of each querying the DC.
+        """
+        state = self._state or self._load()
+        age = self._age(state)
+        if age is None or age < 0 or age > _SESSION_CACHE.ttl:
+            if self.sync() is None:
+                return None
+        elif self._state is None:
+            self._state = state
+        return sorted(self._state["users"].values(), key=str.lower)
+
+
+_DOMAIN_SYNC = _DomainSync()
+
+
+def _print_name_columns(names: List[str], width: int = 25, per_row: int = 3) -> None:
+    for i in range(0, len(names), per_row):
+        print("".join(f"{n:<{width}}" for n in names[i : i + per_row]).rstrip())
+
+
+def cmd_user_sync(args: argparse.Namespace) -> int:
+    """Synchronise the local snapshot of domain accounts."""
+    stats = _DOMAIN_SYNC.sync(full=args.full)
+    if stats is None:
+        error("Domain sync failed.")
+        return 1
+    ok(
+        f"Domain sync ({stats['mode']}) from {stats['server']}: "
+        f"{stats['fetched']} fetched, {stats['changes']} changed, "
+        f"{stats['total']} accounts, {stats['seconds']:.1f}s"
+    )
+    return 0
+
+
+# ---------------------------------------------------------------------------
+# Daemon mode: `wrpbypass serve` keeps a warm process (config loaded, session
+# cache hot) and answers length-prefixed JSON-RPC 2.0 requests over a named
+# pipe (Windows) or a Unix socket (Linux). wrpbypass_client.py (also behind
+# `wrpbypass --connect ...`) is the matching thin client. Framing and
+# authentication are provided by multiprocessing.connection (4-byte length
+# prefix + HMAC challenge).
+# ---------------------------------------------------------------------------
+
+SERVE_KEY_FILE = DATA_DIR / wrpbypass_client.SERVE_KEY_NAME
+SERVE_MAX_MESSAGE = 1024 * 1024
+# Seconds a new client gets to complete the authentication handshake.
+SERVE_HANDSHAKE_TIMEOUT = 5.0
+# Only non-interactive commands may run inside the daemon; `serve` itself and
+# full-screen views (--view, the menu) are refused.
+RPC_ALLOWED_COMMANDS = frozenset({
+    cmd_user_list, cmd_user_export, cmd_user_search, cmd_user_sync, cmd_user_report,
+    cmd_user_bulk_add, cmd_user_show, cmd_user_add, cmd_user_delete, cmd_user_enable,
+    cmd_user_disable, cmd_user_set_password, cmd_user_set_expiry,
+    cmd_user_require_password, cmd_user_allow_password_change,
+    cmd_group_list, cmd_group_show, cmd_domain_group_list, cmd_domain_group_show,
+    cmd_group_add, cmd_group_delete, cmd_group_add_member, cmd_group_remove_member,
+    cmd_group_set_comment,
+    cmd_inventory_snapshot, cmd_inventory_list, cmd_inventory_diff,
+    cmd_inventory_history, cmd_inventory_query,
+})
+ADMINISTRATORS_SID = "S-1-5-32-544"
+SYSTEM_SID = "S-1-5-18"
+WIN_BUILTIN_ADMINISTRATORS_SID = 26  # WELL_KNOWN_SID_TYPE
+
+RPC_PARSE_ERROR = -32700
+RPC_INVALID_REQUEST = -32600
+RPC_METHOD_NOT_FOUND = -32601
+RPC_INVALID_PARAMS = -32602
+RPC_INTERNAL_ERROR = -32603
+RPC_SERVER_BUSY = -32000
+RPC_SHUTTING_DOWN = -32001
+RPC_ACCESS_DENIED = -32002
+
+
+def _serve_family() -> str:
+    return wrpbypass_client.serve_family()
+
+
+def _default_serve_address() -> str:
+    return wrpbypass_client.default_serve_address(DATA_DIR)
+
+
+def _serve_authkey(create: bool = False) -> bytes | None:
+    """Read (or create) the shared secret used to authenticate clients."""
+    try:
+        return SERVE_KEY_FILE.read_bytes().strip()
+    except FileNotFoundError:
+        if not create:
+            return None
+    key = secrets.token_hex(32).encode("ascii")
+    fd = os.open(str(SERVE_KEY_FILE), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    try:
+        # The mode is ignored on Windows: replace the inherited ACL before the
+        # key is written, otherwise Users could read it from ProgramData.
+        _restrict_to_admins(SERVE_KEY_FILE)
+    except OSError:
+        os.close(fd)
+        SERVE_KEY_FILE.unlink(missing_ok=True)
+        raise
+    with os.fdopen(fd, "wb") as f:
+        f.write(key)
+    return key
+
+
+def _restrict_to_admins(path: Path) -> None:
+    """Windows: owner-only DACL (Administrators + SYSTEM, no inheritance)."""
+    if os.name != "nt":
+        return
+    res = subprocess.run(
+        [
+            "icacls", str(path), "/inheritance:r",
+            "/grant:r", f"*{ADMINISTRATORS_SID}:F", f"*{SYSTEM_SID}:F",
+        ],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    if res.returncode != 0:
+        raise OSError(f"icacls failed on {path}: {res.stderr.strip()}")
+
+
+def _peer_allowed(conn) -> bool:
+    """
+    Check who is on the other end of an accepted connection: on Windows the
+    pipe client's token must be an elevated Administrator (the pipe itself
+    is created by multiprocessing with the default DACL); on Unix the peer
+    must be root or the daemon's own user, and is refused if the platform
+    cannot tell who it is.
+    """
+    if os.name == "nt":
+        handle = conn._handle  # PipeConnection has no public accessor
+        if not ADVAPI32.ImpersonateNamedPipeClient(ctypes.c_void_p(handle)):
+            return False
+        try:
+            sid = ctypes.create_string_buffer(68)  # SECURITY_MAX_SID_SIZE
+            size = ctypes.c_ulong(len(sid))
+            member = ctypes.c_int(0)
+            if not ADVAPI32.CreateWellKnownSid(
+                WIN_BUILTIN_ADMINISTRATORS_SID, None, sid, ctypes.byref(size)
+            ):
+                return False
+            # NULL token = the impersonation token of this thread.
+            if not ADVAPI32.CheckTokenMembership(None, sid, ctypes.byref(member)):
+                return False
+            return bool(member.value)
+        finally:
+            ADVAPI32.RevertToSelf()
+    uid = _peer_uid(conn.fileno())
+    return uid is not None and uid in (0, os.getuid())
+
+
+def _peer_uid(fd: int) -> int | None:
+    """
+    Effective uid of the process on the other end of a Unix socket:
+    SO_PEERCRED on Linux, getpeereid() on macOS/BSD, None when neither exists.
+    """
+    if hasattr(socket, "SO_PEERCRED"):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM, fileno=os.dup(fd))
+        try:
+            creds = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+        finally:
+            sock.close()
+        _pid, uid, _gid = struct.unpack("3i", creds)
+        return uid
+    getpeereid = getattr(ctypes.CDLL(None, use_errno=True), "getpeereid", None)
+    if getpeereid is None:
+        return None
+    uid, gid = ctypes.c_uint32(), ctypes.c_uint32()
+    if getpeereid(fd, ctypes.byref(uid), ctypes.byref(gid)) != 0:
+        errno = ctypes.get_errno()
+        raise OSError(errno, os.strerror(errno))
+    return uid.value
+
+
+class _HandshakeConnection:
+    """
+    Connection wrapper for the authentication handshake: every message must
+    arrive before the deadline, so a client that connects and stays silent
+    cannot hold its thread (and client slot) forever.
+    """
+
+    def __init__(self, conn, timeout: float):
+        self._conn = conn
+        self._deadline = time.monotonic() + timeout
+
+    def send_bytes(self, data: bytes) -> None:
+        self._conn.send_bytes(data)
+
+    def recv_bytes(self, maxlength: int | None = None) -> bytes:
+        remaining = self._deadline - time.monotonic()
+        if remaining <= 0 or not self._conn.poll(remaining):
+            raise TimeoutError("authentication timed out")
+        return self._conn.recv_bytes(maxlength)
+
+
+def _set_recv_timeout(conn, seconds: float) -> None:
+    """SO_RCVTIMEO on a Unix socket connection (0 = block); guards half-sent messages."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM, fileno=os.dup(conn.fileno()))
+    try:
+        sec = int(seconds)
+        sock.setsockopt(
+            socket.SOL_SOCKET,
+            socket.SO_RCVTIMEO,
+            struct.pack("ll", sec, int((seconds - sec) * 1_000_000)),
+        )
+    finally:
+        sock.close()
+
+
+class _RpcClientState:
+    def __init__(self, conn):
+        self.conn = conn
+        self.send_lock = threading.Lock()
+        self.inflight = 0
+        self.cond = threading.Condition()
+
+
+class _RpcServer:
+    """
+    Multiplexed JSON-RPC server. Each client may pipeline several requests;
+    they run concurrently on a shared worker pool and responses are sent
+    back (possibly out of order) tagged with the request id.
+    """
+
+    def __init__(
+        self,
+        address: str,
+        authkey: bytes,
+        max_clients: int = 8,
+        max_inflight: int = 4,
+        workers: int = 8,
+        handshake_timeout: float = SERVE_HANDSHAKE_TIMEOUT,
+    ):
+        from concurrent.futures import ThreadPoolExecutor
+
+        self.address = address
+        self.authkey = authkey
+        self.max_clients = max_clients
+        self.max_inflight = max_inflight
+        self.handshake_timeout = handshake_timeout
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="wrp-rpc")
+        self._stopping = threading.Event()
+        self._clients: set[_RpcClientState] = set()
+        self._clients_lock = threading.Lock()
+        self._threads: list[threading.Thread] = []
+
+        # No authkey here: Listener.accept() would run the HMAC handshake on
+        # the accepting thread. Each client thread authenticates its own
+        # connection instead (see _admit).
+        old_umask = os.umask(0o077) if os.name != "nt" else None
+        try:
+            self._listener = Listener(address, family=_serve_family())
+        finally:
+            if old_umask is not None:
+                os.umask(old_umask)
+
+        self._methods = {
+            "ping": self._rpc_ping,
+            "run": self._rpc_run,
+            "users": self._rpc_users,
+            "shutdown": self._rpc_shutdown,
+        }
+
+    # -- lifecycle ---------------------------------------------------------
+
+    def serve_forever(self) -> None:
+        try:
+            while not self._stopping.is_set():
+                try:
+                    conn = self._listener.accept()
+                except (OSError, EOFError) as e:
+                    if self._stopping.is_set():
+                        break
+                    log_action(f"serve: rejected connection: {e!r}")
+                    continue
+                if self._stopping.is_set():
+                    conn.close()
+                    break
+                self._start_client(conn)
+        except KeyboardInterrupt:
+            info("Ctrl+C received, shutting down...")
+        finally:
+            self._shutdown()
+
+    def request_stop(self) -> None:
+        """Stop accepting connections; wakes up the blocking accept()."""
+        if self._stopping.is_set():
+            return
+        self._stopping.set()
+        try:
+            Client(self.address, family=_serve_family()).close()
+        except Exception:
+            pass
+
+    def _shutdown(self) -> None:
+        self._stopping.set()
+        try:
+            self._listener.close()
+        except Exception:
+            pass
+        # Client threads finish their in-flight requests before closing.
+        for t in list(self._threads):
+            t.join()
+        self._pool.shutdown(wait=True)
+        log_action("serve: stopped")
+
+    # -- per-client handling ----------------------------------------------
+
+    def _start_client(self, conn) -> None:
+        with self._clients_lock:
+            if len(self._clients) >= self.max_clients:
+                self._send(
+                    _RpcClientState(conn),
+                    _rpc_error(None, RPC_SERVER_BUSY, "Too many clients connected."),
+                )
+                conn.close()
+                return
+            state = _RpcClientState(conn)
+            self._clients.add(state)
+        t = threading.Thread(target=self._client_loop, args=(state,), daemon=True)
+        self._threads = [th for th in self._threads if th.is_alive()] + [t]
+        t.start()
+
+    def _admit(self, state: _RpcClientState) -> bool:
+        """Authenticate the client, then check who it is (on the client's thread)."""
+        conn = state.conn
+        try:
+            if os.name != "nt":
+                _set_recv_timeout(conn, self.handshake_timeout)
+            timed = _HandshakeConnection(conn, self.handshake_timeout)
+            deliver_challenge(timed, self.authkey)
+            answer_challenge(timed, self.authkey)
+            if os.name != "nt":
+                _set_recv_timeout(conn, 0)
+        except (AuthenticationError, OSError, EOFError) as e:
+            log_action(f"serve: rejected connection: {e!r}")
+            return False
+
+        try:
+            allowed = _peer_allowed(conn)
+        except OSError as e:
+            log_action(f"serve: cannot identify client: {e!r}")
+            allowed = False
+        if not allowed:
+            log_action("serve: rejected connection from unprivileged client")
+            self._send(state, _rpc_error(None, RPC_ACCESS_DENIED, "Access denied."))
+        return allowed
+
+    def _client_loop(self, state: _RpcClientState) -> None:
+        try:
+            if not self._admit(state):
+                return
+            while not self._stopping.is_set():
+                try:
+                    if not state.conn.poll(0.2):
+                        continue
+                    data = state.conn.recv_bytes(SERVE_MAX_MESSAGE)
+                except (EOFError, OSError):
+                    break
+                self._handle_message(state, data)
+        finally:
+            with state.cond:
+                while state.inflight:
+                    state.cond.wait()
+            with self._clients_lock:
+                self._clients.discard(state)
+            try:
+                state.conn.close()
+            except Exception:
+                pass
+
+    def _handle_message(self, state: _RpcClientState, data: bytes) -> None:
+        try:
+            req = json.loads(data.decode("utf-8"))
+        except (UnicodeDecodeError, ValueError):
+            self._send(state, _rpc_error(None, RPC_PARSE_ERROR, "Parse error."))
+            return
+
+        req_id = req.get("id") if isinstance(req, dict) else None
+        if (
+            not isinstance(req, dict)
+            or req.get("jsonrpc") != "2.0"
+            or not isinstance(req.get("method"), str)
+        ):
+            self._send(state, _rpc_error(req_id, RPC_INVALID_REQUEST, "Invalid request."))
+            return
+
+        method = self._methods.get(req["method"])
+        if method is None:
+            self._send(
+                state,
+                _rpc_error(req_id, RPC_METHOD_NOT_FOUND, f"Unknown method: {req['method']}"),
+            )
+            return
+
+        if self._stopping.is_set():
+            self._send(state, _rpc_error(req_id, RPC_SHUTTING_DOWN, "Server is shutting down."))
+            return
+
+        with state.cond:
+            if state.inflight >= self.max_inflight:
+                busy = True
+            else:
+                busy = False
+                state.inflight += 1
+        if busy:
+            self._send(
+                state,
+                _rpc_error(
+                    req_id,
+                    RPC_SERVER_BUSY,
+                    f"Too many requests in flight (limit {self.max_inflight}).",
+                ),
+            )
+            return
+
+        params = req.get("params") or {}
+        self._pool.submit(self._invoke, state, req_id, method, params)
+
+    def _invoke(self, state: _RpcClientState, req_id, method, params) -> None:
+        try:
+            if not isinstance(params, dict):
+                resp = _rpc_error(req_id, RPC_INVALID_PARAMS, "params must be an object.")
+            else:
+                try:
+                    resp = {"jsonrpc": "2.0", "id": req_id, "result": method(params)}
+                except ValueError as e:
+                    resp = _rpc_error(req_id, RPC_INVALID_PARAMS, str(e))
+                except Exception as e:
+                    log_action(f"serve: internal error: {e!r}")
+                    resp = _rpc_error(req_id, RPC_INTERNAL_ERROR, f"Internal error: {e}")
+            if req_id is not None:
+                self._send(state, resp)
+        finally:
+            with state.cond:
+                state.inflight -= 1
+                state.cond.notify_all()
+
+    def _send(self, state: _RpcClientState, resp: dict) -> None:
+        payload = json.dumps(resp, ensure_ascii=False).encode("utf-8")
+        with state.send_lock:
+            try:
+                state.conn.send_bytes(payload)
+            except (OSError, EOFError):
+                pass
+
+    # -- methods ------------------------------------------------------------
+
+    def _rpc_ping(self, params: dict) -> dict:
+        return {"version": VERSION, "pid": os.getpid()}
+
+    def _rpc_run(self, params: dict) -> dict:
+        argv = params.get("argv")
+        if not isinstance(argv, list) or not all(isinstance(a, str) for a in argv):
+            raise ValueError("argv must be a list of strings.")
+        log_action(f"serve: run {argv!r}")
+        with _CapturedOutput() as out:
+            rc = _run_argv(argv, check=_rpc_check_command)
+        return {"rc": rc, "stdout": out.stdout.getvalue(), "stderr": out.stderr.getvalue()}
+
+    def _rpc_users(self, params: dict) -> dict:
+        with _CapturedOutput() as out:
+            users = _get_all_usernames(domain=bool(params.get("domain", False)))
+        return {"users": users, "stderr": out.stderr.getvalue()}
+
+    def _rpc_shutdown(self, params: dict) -> dict:
+        threading.Thread(target=self.request_stop, daemon=True).start()
+        return {"stopping": True}
+
+
+def _rpc_check_command(args: argparse.Namespace) -> None:
+    """Raise ValueError for commands that must not run inside the daemon."""
+    func = getattr(args, "func", None)
+    if func not in RPC_ALLOWED_COMMANDS:
+        raise ValueError(f"'{args.command}' cannot be run through the daemon.")
+    if getattr(args, "view", False):
+        raise ValueError("--view is interactive and cannot be run through the daemon.")
+
+
+def _rpc_error(req_id, code: int, message: str) -> dict:
+    return {"jsonrpc": "2.0", "id": req_id, "error": {"code": code, "message": message}}
+
+
+def _rpc_call(address: str | None, method: str, params: dict) -> dict | None:
+    """Send a single JSON-RPC request to a running daemon; None on failure."""
+    try:
+        return wrpbypass_client.rpc_call(
+            address or _default_serve_address(),
+            wrpbypass_client.read_authkey(DATA_DIR),
+            method,
+            params,
+        )
+    except wrpbypass_client.RpcError as e:
+        error(str(e))
+        return None
+
+
+def cmd_serve(args: argparse.Namespace) -> int:
+    """Run as a local daemon answering JSON-RPC requests."""
+    address = args.address or _default_serve_address()
+
+    if args.stop:
+        result = _rpc_call(address, "shutdown", {})
+        if result is None:
+            return 1
+        ok("Daemon is shutting down.")
+        return 0
+
+    if os.name != "nt" and os.path.exists(address):
+        # Only a refused connection proves the socket is stale; anything else
+        # (a timeout, a full backlog, ...) may be a live daemon.
+        try:
+            Client(address, family="AF_UNIX").close()
+        except (ConnectionRefusedError, FileNotFoundError):
+            try:
+                os.unlink(address)
+            except FileNotFoundError:
+                pass
+        except Exception as e:
+            error(f"A daemon is already running on {address} ({e}).")
+            return 1
+        else:
+            error(f"A daemon is already running on {address}.")
+            return 1
+
+    _install_output_router()
+    try:
+        server = _RpcServer(
+            address,
+            _serve_authkey(create=True),
+            max_clients=args.max_clients,
+            max_inflight=args.max_inflight,
+            workers=args.workers,
+        )
+    except OSError as e:
+        error(f"Cannot listen on {address}: {e}")
+        return 1
+
+    # Warm the account cache without delaying the first connection.
+    threading.Thread(target=_get_all_usernames, daemon=True).start()
+
+    info(f"wrpbypass daemon listening on {address} (Ctrl+C to stop).")
+    log_action(f"serve: listening on {address}")
+    try:
+        server.serve_forever()
+    finally:
+        if os.name != "nt":
+            try:
+                os.unlink(address)
+            except OSError:
+                pass
+    ok("Daemon stopped.")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="wrpbypass",
+        description="CLI tool for Windows local user and group administration.",
+        epilog=(
+            "Use `wrpbypass --connect[=ADDRESS] <command> ...` as the first "
+            "argument to send the command to a running `wrpbypass serve` daemon."
+        ),
+    )
+
+    parser.add_argument(
+        "--nocolor",
+        action="store_true",
+        help="Disable colored output (monochrome).",
+    )
+
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    # user subcommands
+    user_parser = subparsers.add_parser(
+        "user", help="Operations with local users."
+    )
+    user_sub = user_parser.add_subparsers(dest="user_cmd", required=True)
+
+    user_list = user_sub.add_parser("list", help="List users.")
+    user_list.add_argument(
+        "--domain",
+        action="store_true",
+        help="Show domain users (net user /domain).",
+    )
+    user_list.add_argument(
+        "--view",
+        action="store_true",
+        help="Browse in a scrollable, filterable list with per-user actions.",
+    )
+    user_list.set_defaults(func=cmd_user_list)
+
+    user_export = user_sub.add_parser(
+        "export",
+        help=(
+            "Export user list to CSV or JSON "
+            "(extended wrpbypass feature)."
+        ),
+    )
+    user_export.add_argument("path", help="Path to output file.")
+    user_export.add_argument(
+        "--format",
+        "-f",
+        default="csv",
+        choices=["csv", "json"],
+        help="Output format: csv or json (default: csv).",
+    )
+    user_export.add_argument(
+        "--domain",
+        action="store_true",
+        help="Export domain users (net user /domain).",
+    )
+    user_export.set_defaults(func=cmd_user_export)
+
+    user_search = user_sub.add_parser(
+        "search",
+        help=(
+            "Search users by name substring "
+            "(wrpbypass feature over `net user`)."
+        ),
+    )
+    user_search.add_argument("pattern", help="Substring to search in username.")
+    user_search.add_argument(
+        "--domain",
+        action="store_true",
+        help="Search among domain users (net user /domain).",
+    )
+    user_search.set_defaults(func=cmd_user_search)
+
+    user_sync = user_sub.add_parser(
+        "sync",
+        help=(
+            "Incrementally sync the local snapshot of domain users "
+            "(only changed accounts are fetched)."
+        ),
+    )
+    user_sync.add_argument(
+        "--full",
+        action="store_true",
+        help="Ignore the stored high-water mark and re-read all accounts.",
+    )
+    user_sync.set_defaults(func=cmd_user_sync)
+
+    user_report = user_sub.add_parser(
+        "report",
+        help=(
+            "Account health report: disabled, expired, never logged in, "
+            "password never expires, ..."
+        ),
+    )
+    user_report.add_argument(
+        "--domain",
+        action="store_true",
+        help="Report on domain accounts (net user /domain).",
+    )
+    user_report.add_argument(
+        "--rules",
+        default=None,
+        help=(
+            "Comma-separated rules to evaluate (default: all): disabled, expired, "
+            "never_logged_in, password_never_expires, password_not_required, stale_logon."
+        ),
+    )
+    user_report.add_argument(
+        "--stale-days",
+        type=int,
+        default=90,
+        help="stale_logon: last logon older than this many days (default: 90).",
+    )
+    user_report.add_argument(
+        "--output",
+        "-o",
+        default=None,
+        help="Write per-account details to this file (streamed as results arrive).",
+    )
+    user_report.add_argument(
+        "--format",
+        "-f",
+        default="ndjson",
+        choices=["ndjson", "csv"],
+        help="Detail file format (default: ndjson).",
+    )
+    user_report.add_argument(
+        "--workers",
+        type=int,
+        default=16,
+        help="Parallel lookups (further limited by the backend scheduler, default: 16).",
+    )
+    user_report.set_defaults(func=cmd_user_report)
+
+    user_bulk = user_sub.add_parser(
+        "bulk-add",
+        help=(
+            "Bulk create users from CSV "
+            "(not available in standard Windows tools)."
+        ),
+    )
+    user_bulk.add_argument("file", help="Path to CSV file.")
+    user_bulk.add_argument(
+        "--delimiter",
+        default=";",
+        help="CSV delimiter (default: ';').",
+    )
+    user_bulk.set_defaults(func=cmd_user_bulk_add)
+
+    user_show = user_sub.add_parser("show", help="Show user details.")
+    user_show.add_argument("username", help="User name.")
+    user_show.add_argument(
+        "--domain",
+        action="store_true",
+        help="Show domain user info (net user /domain).",
+    )
+    user_show.set_defaults(func=cmd_user_show)
+
+    user_add = user_sub.add_parser("add", help="Create user.")
     user_add.add_argument("username", help="User name.")
     user_add.add_argument("password", help="Password.")
     user_add.add_argument(
@@ -913,6 +3537,11 @@ def build_parser() -> argparse.ArgumentParser:
 
     group_show = group_sub.add_parser("show", help="Show group details.")
     group_show.add_argument("groupname", help="Group name.")
+    group_show.add_argument(
+        "--view",
+        action="store_true",
+        help="Browse members in a scrollable, filterable list with per-user actions.",
+    )
     group_show.set_defaults(func=cmd_group_show)
 
     group_add = group_sub.add_parser("add", help="Create local group.")
@@ -958,9 +3587,419 @@ def build_parser() -> argparse.ArgumentParser:
     domain_group_show.add_argument("groupname", help="Domain group name.")
     domain_group_show.set_defaults(func=cmd_domain_group_show)
 
+    # inventory subcommands
+    inventory_parser = subparsers.add_parser(
+        "inventory",
+        help="Account inventory snapshots (SQLite in the data directory).",
+    )
+    inventory_sub = inventory_parser.add_subparsers(dest="inventory_cmd", required=True)
+
+    def add_scope_args(p: argparse.ArgumentParser) -> None:
+        p.add_argument(
+            "--domain",
+            action="store_true",
+            help="Use domain snapshots instead of local ones.",
+        )
+        p.add_argument(
+            "--host",
+            default=None,
+            help="Computer name the snapshots belong to (default: this computer).",
+        )
+
+    inv_snapshot = inventory_sub.add_parser(
+        "snapshot", help="Enumerate users and groups and record a snapshot."
+    )
+    inv_snapshot.add_argument(
+        "--domain",
+        action="store_true",
+        help="Snapshot domain users and groups (net user/group /domain).",
+    )
+    inv_snapshot.set_defaults(func=cmd_inventory_snapshot)
+
+    inv_list = inventory_sub.add_parser("list", help="List recorded snapshots.")
+    inv_list.set_defaults(func=cmd_inventory_list)
+
+    inv_diff = inventory_sub.add_parser(
+        "diff",
+        help="Show added/removed users and group memberships.",
+    )
+    inv_diff.add_argument(
+        "--since",
+        default=None,
+        help=(
+            "Compare the latest snapshot with the one taken at or before this "
+            "time (YYYY-MM-DD or relative: 90min, 12h, 30d, 2w, 3mo). "
+            "Default: the previous snapshot."
+        ),
+    )
+    inv_diff.add_argument(
+        "--group",
+        default=None,
+        help="Only show membership changes of this group (wildcards: * ?).",
+    )
+    add_scope_args(inv_diff)
+    inv_diff.set_defaults(func=cmd_inventory_diff)
+
+    inv_history = inventory_sub.add_parser(
+        "history", help="Show one user's presence and groups across snapshots."
+    )
+    inv_history.add_argument("username", help="User name.")
+    add_scope_args(inv_history)
+    inv_history.set_defaults(func=cmd_inventory_history)
+
+    inv_query = inventory_sub.add_parser(
+        "query", help="Query users and memberships of a snapshot."
+    )
+    inv_query.add_argument("--user", default=None, help="User name (wildcards: * ?).")
+    inv_query.add_argument("--group", default=None, help="Group name (wildcards: * ?).")
+    inv_query.add_argument(
+        "--snapshot", type=int, default=None, help="Snapshot id (default: latest)."
+    )
+    inv_query.add_argument(
+        "--format",
+        "-f",
+        default="table",
+        choices=["table", "json"],
+        help="Output format (default: table).",
+    )
+    add_scope_args(inv_query)
+    inv_query.set_defaults(func=cmd_inventory_query)
+
+    # daemon mode
+    serve = subparsers.add_parser(
+        "serve",
+        help="Run as a local daemon (named pipe / Unix socket) for scripted calls.",
+    )
+    serve.add_argument(
+        "--address",
+        default=None,
+        help=(
+            "Pipe or socket address (default: \\\\.\\pipe\\wrpbypass on Windows, "
+            "<data_dir>/wrpbypass.sock elsewhere)."
+        ),
+    )
+    serve.add_argument(
+        "--max-clients",
+        type=int,
+        default=8,
+        help="Maximum simultaneously connected clients (default: 8).",
+    )
+    serve.add_argument(
+        "--max-inflight",
+        type=int,
+        default=4,
+        help="Maximum concurrent requests per client (default: 4).",
+    )
+    serve.add_argument(
+        "--workers",
+        type=int,
+        default=8,
+        help="Worker threads shared by all clients (default: 8).",
+    )
+    serve.add_argument(
+        "--stop",
+        action="store_true",
+        help="Ask a running daemon to shut down gracefully.",
+    )
+    serve.set_defaults(func=cmd_serve)
+
     return parser
 
 
+def _dispatch(parser: argparse.ArgumentParser, args: argparse.Namespace) -> int:
+    """Run the command selected by parsed CLI arguments."""
+    if not hasattr(args, "func"):
+        parser.print_help()
+        return 1
+
+    rc = args.func(args)
+    if rc == 5:
+        error(
+            "Access denied. Run Command Prompt/PowerShell as administrator."
+        )
+    return rc
+
+
+def _run_argv(argv: List[str], check=None) -> int:
+    """
+    Parse and run CLI arguments without exiting the process (daemon mode).
+    `check(args)` may raise ValueError to refuse the parsed command.
+    """
+    parser = build_parser()
+    try:
+        args = parser.parse_args(argv)
+    except SystemExit as e:
+        return e.code if isinstance(e.code, int) else 2
+    if check is not None:
+        check(args)
+    return _dispatch(parser, args)
+
+
+# ---------------------------------------------------------------------------
+# Session prefetch: when the interactive menu starts, users, groups and the
+# Administrators membership are loaded into the session cache in the
+# background, so the first menu action does not wait on a cold `net` call.
+# ---------------------------------------------------------------------------
+
+PREFETCH_COMMANDS = [
+    ["net", "user"],
+    ["net", "localgroup"],
+    ["net", "localgroup", "Administrators"],
+]
+# Local machines have few accounts; prefetch their details too (for "Show user").
+PREFETCH_USER_DETAILS_MAX = 50
+
+
+class _Prefetcher:
+    def __init__(self):
+        self._thread: threading.Thread | None = None
+        self._cancelled = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, force: bool = False) -> None:
+        """
+        Start a background prefetch unless one is already running or the
+        session cache is off (cache_ttl: 0), where it would only waste calls.
+        """
+        if self.running or _SESSION_CACHE.ttl <= 0:
+            return
+        self._cancelled = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, args=(force, self._cancelled), name="wrp-prefetch", daemon=True
+        )
+        self._thread.start()
+
+    def cancel(self) -> None:
+        """
+        Stop a running prefetch before its next `net` call (the call in
+        flight finishes; the cache drops its result if it was invalidated).
+        """
+        self._cancelled.set()
+
+    def _run(self, force: bool, cancelled: threading.Event) -> None:
+        _OUTPUT.low_priority = True
+        started = time.monotonic()
+        # Errors are reported when the operator actually opens the data.
+        with _CapturedOutput():
+            try:
+                for cmd in PREFETCH_COMMANDS:
+                    if cancelled.is_set():
+                        break
+                    _SESSION_CACHE.get(
+                        cmd, lambda cmd=cmd: _execute(cmd, retry=True), force=force
+                    )
+                else:
+                    for name in _get_all_usernames()[:PREFETCH_USER_DETAILS_MAX]:
+                        if cancelled.is_set():
+                            break
+                        cmd = ["net", "user", name]
+                        _SESSION_CACHE.get(
+                            cmd, lambda cmd=cmd: _execute(cmd, retry=True), force=force
+                        )
+            except Exception as e:
+                log_action(f"Prefetch failed: {e!r}")
+                return
+        if cancelled.is_set():
+            log_action("Prefetch cancelled")
+            return
+        log_action(f"Prefetched users and groups in {time.monotonic() - started:.1f}s")
+
+
+_PREFETCH = _Prefetcher()
+
+
+def _session_cache_status() -> str | None:
+    """Menu status line for the prefetched data (HTML), refreshing stale data."""
+    if _SESSION_CACHE.ttl <= 0:
+        return None
+    age = _SESSION_CACHE.age(PREFETCH_COMMANDS[0])
+    if age is None or age >= _SESSION_CACHE.stale_after:
+        _PREFETCH.start(force=age is not None)
+    if age is None:
+        if _PREFETCH.running:
+            return "<status-busy>Loading users and groups in background...</status-busy>"
+        return None
+    if age >= _SESSION_CACHE.stale_after:
+        return (
+            f"<status-offline>Cached users/groups are {_format_elapsed(age)} old (stale, "
+            "refreshing; R = refresh now)</status-offline>"
+        )
+    return f"<status-online>Users/groups cached {_format_elapsed(age)} ago (R = refresh)</status-online>"
+
+
+def _run_program_foreground(cmdline: str, cwd: str | None) -> int:
+    """Run a program attached to this console (interactive, blocks the menu)."""
+    completed = subprocess.run(cmdline, shell=True, cwd=cwd)
+    info(f"Program exited with code {completed.returncode}.")
+    log_action(f"Ran program '{cmdline}' (cwd={cwd or 'current'}) exit={completed.returncode}")
+    return completed.returncode
+
+
+def _run_program(cmdline: str, cwd: str | None, new_console: bool) -> int:
+    """
+    Run a custom program as a background task. Console programs get their
+    own window (Windows), anything else has its output streamed to the task
+    and gets no stdin, so it cannot be interactive.
+    """
+    task = _current_task()
+    if new_console and os.name == "nt":
+        proc = subprocess.Popen(
+            cmdline, shell=True, cwd=cwd, creationflags=subprocess.CREATE_NEW_CONSOLE
+        )
+        if task is not None:
+            task.attach(proc)
+        info(f"Started '{cmdline}' in a new console window (pid {proc.pid}).")
+        try:
+            rc = proc.wait()
+        finally:
+            if task is not None:
+                task.detach(proc)
+    else:
+        proc = subprocess.Popen(
+            cmdline,
+            shell=True,
+            cwd=cwd,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            encoding="cp866" if os.name == "nt" else None,
+            errors="replace",
+            **_isolated_popen_kwargs(),
+        )
+        if task is not None:
+            task.attach(proc)
+        try:
+            for line in proc.stdout:
+                print(line.rstrip("\r\n"))
+            rc = proc.wait()
+        except BaseException:
+            _kill_process_tree(proc)
+            raise
+        finally:
+            if task is not None:
+                task.detach(proc)
+    if task is not None:
+        task.check_cancelled()
+    info(f"Program exited with code {rc}.")
+    log_action(f"Ran program '{cmdline}' (cwd={cwd or 'current'}) exit={rc}")
+    return rc
+
+
+def _check_admin_membership(username: str) -> int:
+    """Print whether `username` is a member of the local Administrators group."""
+    proc = capture_output(["net", "localgroup", "Administrators"], cached=True)
+    is_admin = False
+    if proc and proc.stdout:
+        for line in proc.stdout.splitlines():
+            if username.lower() in line.lower().split():
+                is_admin = True
+                break
+    if is_admin:
+        ok(f"User '{username}' IS in Administrators group.")
+    else:
+        warn(f"User '{username}' is NOT in Administrators group.")
+    return 0
+
+
+def _clear_status_line(length: int) -> None:
+    if length:
+        sys.stdout.write("\r" + " " * length + "\r")
+        sys.stdout.flush()
+
+
+def _watch_task(task: _Task) -> None:
+    """
+    Stream task output with an elapsed-time indicator until it finishes.
+    Ctrl+C offers to cancel the task or leave it running in the background.
+    """
+    index = 0
+    status_len = 0
+    while True:
+        try:
+            while True:
+                lines, index = task.read_since(index)
+                if lines or not task.running:
+                    _clear_status_line(status_len)
+                    status_len = 0
+                    for line in lines:
+                        print(line)
+                if not task.running:
+                    break
+                status = (
+                    f"[#{task.id}] {task.title} - running {_format_elapsed(task.elapsed())}"
+                    " (Ctrl+C: cancel / background)"
+                )
+                sys.stdout.write("\r" + status)
+                sys.stdout.flush()
+                status_len = len(status)
+                time.sleep(0.2)
+            break
+        except KeyboardInterrupt:
+            _clear_status_line(status_len)
+            status_len = 0
+            try:
+                answer = ask(
+                    "Task is still running: [c]ancel, [b]ackground, Enter = keep watching"
+                ).lower()
+            except KeyboardInterrupt:
+                answer = "c"
+            if answer.startswith("c"):
+                warn(f"Cancelling task #{task.id}...")
+                task.cancel()
+            elif answer.startswith("b"):
+                info(f"Task #{task.id} keeps running in background (menu item 13).")
+                return
+
+    elapsed = _format_elapsed(task.elapsed())
+    if task.status == "done":
+        ok(f"Task #{task.id} finished in {elapsed}.")
+    elif task.status == "cancelled":
+        warn(f"Task #{task.id} cancelled after {elapsed}.")
+    else:
+        error(f"Task #{task.id} failed after {elapsed} (exit code {task.rc}).")
+
+
+def _run_task(title: str, func, *args) -> None:
+    """Start a menu action as a background task and watch it."""
+    _watch_task(_TASKS.start(title, func, *args))
+
+
+def _menu_tasks() -> None:
+    """List background tasks; watch or cancel one."""
+    tasks = _TASKS.tasks()
+    if not tasks:
+        info("No background tasks.")
+        return
+    for task in tasks:
+        last = task.last_line().strip()
+        if len(last) > 40:
+            last = last[:37] + "..."
+        print(
+            f"  #{task.id:<3} {task.status:<9} {_format_elapsed(task.elapsed())}  "
+            f"{task.title}  {('| ' + last) if last else ''}"
+        )
+    answer = ask("Task number to watch, 'c <number>' to cancel (Enter = back)").strip()
+    if not answer:
+        return
+    cancel = answer.lower().startswith("c")
+    number = answer[1:].strip() if cancel else answer
+    task = _TASKS.get(int(number)) if number.isdigit() else None
+    if task is None:
+        warn("Unknown task number.")
+    elif cancel:
+        if task.running:
+            task.cancel()
+            warn(f"Task #{task.id} cancelled.")
+        else:
+            info(f"Task #{task.id} already {task.status}.")
+    else:
+        _watch_task(task)
+
+
 def main(argv: List[str] | None = None) -> int:
     """
     Two working modes:
@@ -968,22 +4007,35 @@ def main(argv: List[str] | None = None) -> int:
     - Interactive menu (no arguments) — simple prompt-based workflow.
     Ctrl+C anywhere results in a clean exit without traceback.
     """
-    global LOG_SESSION_MODE
+    global LOG_SESSION_MODE, LOG_ENABLED, LOG_LOG_COMMANDS
+    global INVENTORY_ENABLED, DOMAIN_SYNC_ENABLED
     try:
         if argv is None:
             argv = sys.argv[1:]
 
+        # Thin client: forward everything to a running daemon, skipping
+        # config/log setup entirely.
+        if argv and (argv[0] == "--connect" or argv[0].startswith("--connect=")):
+            return wrpbypass_client.main(argv)
+
         # Ensure config.yml exists and read settings
         _ensure_default_config()
         cfg = _load_config()
         use_color = _str_to_bool(cfg.get("color", "true"), default=True)
 
         # Logging-related config
-        global LOG_ENABLED, LOG_LOG_COMMANDS
         LOG_ENABLED = _str_to_bool(cfg.get("log_enabled", "true"), default=True)
         LOG_LOG_COMMANDS = _str_to_bool(
             cfg.get("log_commands", "true"), default=True
         )
+        try:
+            _SESSION_CACHE.ttl = float(cfg.get("cache_ttl", "120"))
+            _SESSION_CACHE.stale_after = float(cfg.get("cache_stale", "60"))
+        except ValueError:
+            pass
+        _configure_schedulers(cfg)
+        INVENTORY_ENABLED = _str_to_bool(cfg.get("inventory", "false"), default=False)
+        DOMAIN_SYNC_ENABLED = _str_to_bool(cfg.get("domain_sync", "false"), default=False)
 
         # Environment override: WRP_NOCOLOR=1 disables colors completely
         env_nc = os.environ.get("WRP_NOCOLOR")
@@ -1007,21 +4059,14 @@ def main(argv: List[str] | None = None) -> int:
                 use_color = False
 
             configure_style(use_color)
-
-            if not hasattr(args, "func"):
-                parser.print_help()
-                return 1
-
-            rc = args.func(args)
-            if rc == 5:
-                error(
-                    "Access denied. Run Command Prompt/PowerShell as administrator."
-                )
-            return rc
+            return _dispatch(parser, args)
 
         # No arguments: run simple interactive menu.
         LOG_SESSION_MODE = "interactive"
         configure_style(use_color)
+        _install_output_router()
+        # Warm the session cache while the menu is drawn.
+        _PREFETCH.start()
         while True:
             clear_screen()
             # Colored ASCII logo
@@ -1037,79 +4082,100 @@ def main(argv: List[str] | None = None) -> int:
 <logo-main>                               88</logo-main>
 """
                 ),
-                style=style,
+                style=_style(),
             )
 
             print_formatted_text(
                 HTML("  <menu-number>1)</menu-number> <menu-text>List users</menu-text>"),
-                style=style,
+                style=_style(),
             )
             print_formatted_text(
                 HTML("  <menu-number>2)</menu-number> <menu-text>Show user</menu-text>"),
-                style=style,
+                style=_style(),
             )
             print_formatted_text(
                 HTML("  <menu-number>3)</menu-number> <menu-text>Create user</menu-text>"),
-                style=style,
+                style=_style(),
             )
             print_formatted_text(
                 HTML("  <menu-number>4)</menu-number> <menu-text>Delete user</menu-text>"),
-                style=style,
+                style=_style(),
             )
             print_formatted_text(
                 HTML("  <menu-number>5)</menu-number> <menu-text>Enable / disable user</menu-text>"),
-                style=style,
+                style=_style(),
             )
             print_formatted_text(
                 HTML("  <menu-number>6)</menu-number> <menu-text>Change user password</menu-text>"),
-                style=style,
+                style=_style(),
             )
             print_formatted_text(
                 HTML("  <menu-number>7)</menu-number> <menu-text>List local groups</menu-text>"),
-                style=style,
+                style=_style(),
             )
             print_formatted_text(
                 HTML(
                     "  <menu-warn>8)</menu-warn> <menu-warn>Schedule Utilman.exe restore (after reboot)</menu-warn>"
                 ),
-                style=style,
+                style=_style(),
             )
             print_formatted_text(
                 HTML(
                     "  <menu-warn>9)</menu-warn> <menu-warn>Install Utilman.exe hook (replace with wrpbypass)</menu-warn>"
                 ),
-                style=style,
+                style=_style(),
             )
             print_formatted_text(
                 HTML(
                     "  <menu-warn>10)</menu-warn> <menu-warn>Restore Utilman.exe now (no reboot, if possible)</menu-warn>"
                 ),
-                style=style,
+                style=_style(),
             )
             print_formatted_text(
                 HTML("  <menu-number>11)</menu-number> <menu-text>Run custom program / command</menu-text>"),
-                style=style,
+                style=_style(),
             )
             print_formatted_text(
                 HTML("  <menu-number>12)</menu-number> <menu-text>Show system info</menu-text>"),
-                style=style,
+                style=_style(),
+            )
+            print_formatted_text(
+                HTML("  <menu-number>13)</menu-number> <menu-text>Background tasks</menu-text>"),
+                style=_style(),
             )
             print_formatted_text(
                 HTML("  <menu-number>0)</menu-number> <menu-text>Exit</menu-text>"),
-                style=style,
+                style=_style(),
             )
+            cache_status = _session_cache_status()
+            if cache_status:
+                print_formatted_text(HTML(f"\n  {cache_status}"), style=_style())
+            running = _TASKS.running()
+            if running:
+                print_formatted_text(
+                    HTML(
+                        f"\n  <status-busy>Background tasks running: {len(running)}</status-busy>"
+                    ),
+                    style=_style(),
+                )
 
             choice = ask("\nwrpbypass")
 
             try:
                 if choice == "1":
-                    ns = argparse.Namespace(domain=False)
-                    cmd_user_list(ns)
+                    # Browse prefetched users; while the cache is still cold,
+                    # list them as a (cancellable) background task instead.
+                    users = []
+                    if _SESSION_CACHE.age(["net", "user"]) is not None:
+                        users = _get_all_usernames()
+                    if not (users and _browse_accounts("Users", users)):
+                        ns = argparse.Namespace(domain=False)
+                        _run_task("List users", cmd_user_list, ns)
                 elif choice == "2":
                     name = ask("Username")
                     if name:
                         ns = argparse.Namespace(username=name, domain=False)
-                        cmd_user_show(ns)
+                        _run_task(f"Show user '{name}'", cmd_user_show, ns)
                 elif choice == "3":
                     name = ask("New username")
                     if not name:
@@ -1160,7 +4226,7 @@ def main(argv: List[str] | None = None) -> int:
                     log_action(f"Changed password for user '{name}'")
                 elif choice == "7":
                     ns = argparse.Namespace()
-                    cmd_group_list(ns)
+                    _run_task("List local groups", cmd_group_list, ns)
                 elif choice == "8":
                     confirm = ask(
                         "Schedule Utilman.exe restore on next reboot? [yes/no]"
@@ -1191,9 +4257,10 @@ def main(argv: List[str] | None = None) -> int:
                             "  3) explorer.exe\n"
                             "  4) mmc.exe\n"
                         ),
-                        style=style,
+                        style=_style(),
                     )
                     preset = ask("Preset number (Enter=custom)")
+                    new_console = preset in ("1", "2", "3", "4")
                     if preset == "1":
                         cmdline = "cmd.exe"
                     elif preset == "2":
@@ -1213,11 +4280,14 @@ def main(argv: List[str] | None = None) -> int:
                     ).strip()
                     cwd = start_dir or None
                     try:
-                        completed = subprocess.run(cmdline, shell=True, cwd=cwd)
-                        info(f"Program exited with code {completed.returncode}.")
-                        log_action(
-                            f"Ran program '{cmdline}' (cwd={cwd or 'current'}) exit={completed.returncode}"
-                        )
+                        if os.name == "nt":
+                            _run_task(
+                                f"Run '{cmdline}'", _run_program, cmdline, cwd, new_console
+                            )
+                        else:
+                            # No separate console window to hand out: keep the
+                            # program interactive in this terminal.
+                            _run_program_foreground(cmdline, cwd)
                     except Exception as e:
                         error(f"Failed to run program: {e}")
                         log_action(f"Failed to run program '{cmdline}': {e}")
@@ -1234,28 +4304,28 @@ def main(argv: List[str] | None = None) -> int:
                             f"<info>Domain/Workgroup:</info> {domain or 'unknown'}\n"
                             f"<info>Windows:</info> {win_ver}"
                         ),
-                        style=style,
+                        style=_style(),
                     )
                     check_user = ask(
                         "Username to check in Administrators (Enter to skip)"
                     ).strip()
                     if check_user:
-                        proc = capture_output(
-                            ["net", "localgroup", "Administrators"]
+                        _run_task(
+                            f"Check Administrators membership of '{check_user}'",
+                            _check_admin_membership,
+                            check_user,
                         )
-                        is_admin = False
-                        if proc and proc.stdout:
-                            for line in proc.stdout.splitlines():
-                                if check_user.lower() in line.lower().split():
-                                    is_admin = True
-                                    break
-                        if is_admin:
-                            ok(f"User '{check_user}' IS in Administrators group.")
-                        else:
-                            warn(
-                                f"User '{check_user}' is NOT in Administrators group."
-                            )
                     log_action("Viewed system info screen")
+                elif choice == "13":
+                    _menu_tasks()
+                elif choice.lower() == "r":
+                    if _SESSION_CACHE.ttl <= 0:
+                        warn("Session cache is off (cache_ttl: 0); nothing to refresh.")
+                    else:
+                        # The redrawn header shows the refresh progress.
+                        _SESSION_CACHE.invalidate()
+                        _PREFETCH.start(force=True)
+                        continue
                 elif choice == "0":
                     ok("Exit.")
                     return 0
@@ -1274,6 +4344,10 @@ def main(argv: List[str] | None = None) -> int:
     except KeyboardInterrupt:
         ok("\nExit by Ctrl+C.")
         return 0
+    finally:
+        # Never leave child processes of background tasks behind.
+        _TASKS.cancel_all()
+        _PREFETCH.cancel()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Thin client for a running `wrpbypass serve` daemon.
+
+Forwards CLI arguments over the daemon's named pipe (Windows) or Unix
+socket and prints the output it sends back. Only the standard library
+pieces needed for that are imported, so a call costs little more than the
+process start and one round trip:
+
+    wrpbypass_client.py user list
+    wrpbypass_client.py --connect=\\\\.\\pipe\\wrpbypass user show alice
+
+`wrpbypass --connect ...` runs the same code; wrpbypass.py also takes its
+data directory and daemon address from here.
+"""
+import json
+import os
+import sys
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client
+from pathlib import Path
+from typing import List
+
+SERVE_KEY_NAME = "serve.key"
+
+
+class RpcError(Exception):
+    """The daemon could not be reached or answered with an error."""
+
+
+def detect_data_dir() -> Path:
+    """
+    Choose a writable directory for config/logs.
+
+    Priority:
+    1) WRP_DIR environment variable
+    2) On Windows: C:\\ProgramData\\wrpbypass
+    3) Otherwise: <script_dir>\\data
+    """
+    env = os.environ.get("WRP_DIR")
+    if env:
+        p = Path(env)
+        try:
+            p.mkdir(parents=True, exist_ok=True)
+            return p
+        except Exception:
+            pass
+
+    # On Windows – always use C:\ProgramData\wrpbypass by default
+    if os.name == "nt":
+        base = Path(os.environ.get("ProgramData", r"C:\\ProgramData")) / "wrpbypass"
+    else:
+        try:
+            if getattr(sys, "frozen", False):
+                here = Path(sys.executable).resolve().parent
+            else:
+                here = Path(__file__).resolve().parent
+        except Exception:
+            here = Path.cwd()
+        base = here / "data"
+
+    try:
+        base.mkdir(parents=True, exist_ok=True)
+    except Exception:
+        base = Path.cwd()
+
+    return base
+
+
+def serve_family() -> str:
+    return "AF_PIPE" if os.name == "nt" else "AF_UNIX"
+
+
+def default_serve_address(data_dir: Path) -> str:
+    if os.name == "nt":
+        return r"\\.\pipe\wrpbypass"
+    return str(data_dir / "wrpbypass.sock")
+
+
+def read_authkey(data_dir: Path) -> bytes:
+    """The shared secret written by `wrpbypass serve`."""
+    path = data_dir / SERVE_KEY_NAME
+    try:
+        return path.read_bytes().strip()
+    except FileNotFoundError:
+        raise RpcError(f"Daemon key not found: {path}. Is `wrpbypass serve` running?")
+
+
+def rpc_call(address: str, authkey: bytes, method: str, params: dict) -> dict:
+    """Send a single JSON-RPC request to a running daemon; RpcError on failure."""
+    try:
+        conn = Client(address, family=serve_family(), authkey=authkey)
+    except AuthenticationError:
+        raise RpcError(f"Daemon at {address} rejected the key in {SERVE_KEY_NAME}.")
+    except (OSError, EOFError) as e:
+        raise RpcError(f"Cannot connect to wrpbypass daemon at {address}: {e}")
+    try:
+        req = {"jsonrpc": "2.0", "id": 1, "method": method, "params": params}
+        conn.send_bytes(json.dumps(req, ensure_ascii=False).encode("utf-8"))
+        resp = json.loads(conn.recv_bytes().decode("utf-8"))
+    except (OSError, EOFError, ValueError) as e:
+        raise RpcError(f"Daemon connection failed: {e}")
+    finally:
+        conn.close()
+
+    if "error" in resp:
+        raise RpcError(f"Daemon error {resp['error'].get('code')}: {resp['error'].get('message')}")
+    return resp.get("result") or {}
+
+
+def connect_and_run(address: str | None, argv: List[str], data_dir: Path | None = None) -> int:
+    """Forward CLI arguments to the daemon and print its output."""
+    data_dir = data_dir or detect_data_dir()
+    try:
+        result = rpc_call(
+            address or default_serve_address(data_dir),
+            read_authkey(data_dir),
+            "run",
+            {"argv": argv},
+        )
+    except RpcError as e:
+        print(f"[!] {e}", file=sys.stderr)
+        return 1
+    if result.get("stdout"):
+        sys.stdout.write(result["stdout"])
+        sys.stdout.flush()
+    if result.get("stderr"):
+        sys.stderr.write(result["stderr"])
+        sys.stderr.flush()
+    return int(result.get("rc", 1))
+
+
+def main(argv: List[str] | None = None) -> int:
+    if argv is None:
+        argv = sys.argv[1:]
+    address = None
+    if argv and (argv[0] == "--connect" or argv[0].startswith("--connect=")):
+        address = argv[0].partition("=")[2] or None
+        argv = argv[1:]
+    if not argv:
+        print("usage: wrpbypass_client.py [--connect=ADDRESS] <command> ...", file=sys.stderr)
+        return 2
+    return connect_and_run(address, argv)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,19 +1,103 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 import argparse
+import errno
+import hashlib
+import io
+import json
 import os
+import re
+import shutil
+import stat
+import struct
 import subprocess
 import sys
+import tempfile
+import threading
+import time
 from pathlib import Path
+from typing import NamedTuple
+
+
+# ---------------------------------------------------------------------------
+# System layer. Everything that needs root, real block devices or external
+# tools (commands, mount/umount, loop devices) goes through SYSTEM, so the
+# helper can run against a fake layer (bench_deb.FakeSystem: temporary
+# directories, no root) in tests and benchmarks. Use set_system() to swap it.
+# ---------------------------------------------------------------------------
+
+
+class System:
+    """The real system: subprocesses, mount(8), losetup(8)."""
+
+    def run(self, cmd) -> str:
+        print(f"[+] Run: {' '.join(cmd)}")
+        res = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        if res.returncode != 0:
+            print(f"[!] Command failed: {res.stderr.strip()}")
+            raise RuntimeError(f"Command exited with code {res.returncode}")
+        return res.stdout.strip()
+
+    def supported(self) -> bool:
+        # On Windows there is no geteuid – this tool is meant for Linux.
+        return hasattr(os, "geteuid")
+
+    def is_root(self) -> bool:
+        return os.geteuid() == 0
+
+    def driver_available(self, driver: str) -> bool:
+        """Whether a mount driver can be used here (kernel module or FUSE helper)."""
+        if driver == "auto":
+            return True
+        if driver == "ntfs-3g":
+            return shutil.which("ntfs-3g") is not None or shutil.which("mount.ntfs-3g") is not None
+        try:
+            if driver in Path("/proc/filesystems").read_text().split():
+                return True
+        except OSError:
+            pass
+        modules = Path("/lib/modules") / os.uname().release
+        return any(modules.glob(f"kernel/fs/{driver}/{driver}.ko*"))
+
+    def mount(self, device, mountpoint, fstype=None, options=None) -> Path:
+        """Mount `device`; returns the directory its contents appear under."""
+        mountpoint = Path(mountpoint)
+        mountpoint.mkdir(parents=True, exist_ok=True)
+        cmd = ["mount"]
+        if fstype:
+            cmd += ["-t", fstype]
+        if options:
+            cmd += ["-o", options]
+        self.run(cmd + [str(device), str(mountpoint)])
+        return mountpoint
+
+    def umount(self, mountpoint) -> None:
+        self.run(["umount", str(mountpoint)])
+
+    def ismount(self, path) -> bool:
+        # Path.is_mount() не существует, используем os.path.ismount
+        return os.path.ismount(str(path))
+
+    def attach_image(self, image) -> str:
+        """Attach a disk image to a loop device (with partition scan)."""
+        return self.run(["losetup", "--find", "--show", "--partscan", str(image)])
+
+    def detach_image(self, loop) -> None:
+        self.run(["losetup", "--detach", str(loop)])
+
+
+SYSTEM: System = System()
+
+
+def set_system(system: System) -> System:
+    """Install a system layer (e.g. bench_deb.FakeSystem); returns the previous one."""
+    global SYSTEM
+    previous, SYSTEM = SYSTEM, system
+    return previous
 
 
 def run(cmd):
-    print(f"[+] Run: {' '.join(cmd)}")
-    res = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-    if res.returncode != 0:
-        print(f"[!] Command failed: {res.stderr.strip()}")
-        raise RuntimeError(f"Command exited with code {res.returncode}")
-    return res.stdout.strip()
+    return SYSTEM.run(cmd)
 
 
 def ensure_root():
@@ -21,78 +105,411 @@ def ensure_root():
     Ensure we run as root on Unix-like systems.
     On Windows, this script is not supported and will exit with a message.
     """
-    # On Windows there is no geteuid – this tool is meant for Linux.
-    if not hasattr(os, "geteuid"):
+    if not SYSTEM.supported():
         print("[!] wrpbypass_deb.py is intended to run on Linux (Debian/Ubuntu Live).")
         print("[!] Please boot a Linux live environment and run it there as root.")
         sys.exit(1)
 
-    if os.geteuid() != 0:
+    if not SYSTEM.is_root():
         print("[!] This program must be run as root (sudo).")
         sys.exit(1)
 
 
-def mount_partition(device, mountpoint):
-    mountpoint = Path(mountpoint)
-    mountpoint.mkdir(parents=True, exist_ok=True)
-    # try ntfs-3g if available
+# Mount drivers in order of preference: the in-kernel ntfs3 driver is much
+# faster than FUSE ntfs-3g for metadata-heavy work; "auto" lets mount(8)
+# decide. Defaults can be changed via environment (interactive/systemd use)
+# or --mount-drivers / --mount-options / --ignore-volume-checks.
+MOUNT_DRIVERS = [
+    d.strip() for d in os.environ.get("WRP_MOUNT_DRIVERS", "ntfs3,ntfs-3g,auto").split(",") if d.strip()
+]
+MOUNT_OPTIONS = os.environ.get("WRP_MOUNT_OPTIONS", "")
+IGNORE_VOLUME_CHECKS = os.environ.get("WRP_IGNORE_VOLUME_CHECKS", "") == "1"
+
+# Options only one driver understands. Unprefixed, they are passed to that
+# driver only; "driver:option" in MOUNT_OPTIONS always targets one driver.
+DRIVER_ONLY_OPTIONS = {
+    "windows_names": "ntfs-3g",
+    "big_writes": "ntfs-3g",
+    "streams_interface": "ntfs-3g",
+    "remove_hiberfile": "ntfs-3g",
+    "recover": "ntfs-3g",
+    "norecover": "ntfs-3g",
+    "prealloc": "ntfs3",
+    "sparse": "ntfs3",
+    "showmeta": "ntfs3",
+    "nohidden": "ntfs3",
+    "sys_immutable": "ntfs3",
+}
+
+
+def driver_mount_options(options: str, driver: str) -> str:
+    """
+    The part of a MOUNT_OPTIONS string that applies to `driver`, e.g.
+    "noatime,ntfs3:prealloc,ntfs-3g:windows_names" gives "noatime,prealloc"
+    for ntfs3 and "noatime,windows_names" for ntfs-3g.
+    """
+    selected = []
+    for option in options.split(","):
+        option = option.strip()
+        if not option:
+            continue
+        target, sep, rest = option.partition(":")
+        if sep and "=" not in target:
+            if target == driver:
+                selected.append(rest)
+            continue
+        if DRIVER_ONLY_OPTIONS.get(option.split("=", 1)[0], driver) == driver:
+            selected.append(option)
+    return ",".join(selected)
+
+
+def check_volume(device) -> str | None:
+    """
+    Pre-mount check of an NTFS volume: the reason it must not be mounted
+    read-write (hibernated / Fast Startup, dirty), or None. Devices that
+    cannot be read or are not NTFS are left to mount(8).
+    """
     try:
-        run(["mount", "-t", "ntfs-3g", device, str(mountpoint)])
-    except Exception:
-        # fallback to default mount
-        run(["mount", device, str(mountpoint)])
-    print(f"[+] Partition {device} mounted at {mountpoint}")
-    return mountpoint
+        vol = NtfsVolume(device)
+    except (OSError, NtfsError):
+        return None
+    with vol:
+        try:
+            signature = vol.hibernation_signature()
+        except (OSError, NtfsError):
+            signature = b""
+        if signature.lower() == b"hibr":
+            return (
+                "Windows is hibernated or was shut down with Fast Startup (hiberfil.sys "
+                "is active). Boot Windows and shut down fully (shutdown /s /t 0) first."
+            )
+        try:
+            flags = vol.volume_flags()
+        except (OSError, NtfsError):
+            return None
+        if flags & VOLUME_IS_DIRTY:
+            return (
+                "the NTFS volume is marked dirty. Run chkdsk from Windows "
+                "(or ntfsfix -d as a last resort) first."
+            )
+    return None
+
+
+def mount_partition(device, mountpoint, drivers=None, options=None, ignore_checks=None):
+    drivers = MOUNT_DRIVERS if drivers is None else drivers
+    options = MOUNT_OPTIONS if options is None else options
+    ignore_checks = IGNORE_VOLUME_CHECKS if ignore_checks is None else ignore_checks
+
+    if not ignore_checks:
+        reason = check_volume(device)
+        if reason:
+            print(f"[!] Refusing to mount {device}: {reason}")
+            print("[!] Use --ignore-volume-checks to mount anyway.")
+            raise RuntimeError(f"{device}: {reason}")
+
+    errors = []
+    for driver in drivers:
+        if not SYSTEM.driver_available(driver):
+            errors.append(f"{driver}: not available")
+            continue
+        try:
+            mountpoint = SYSTEM.mount(
+                device,
+                mountpoint,
+                fstype=None if driver == "auto" else driver,
+                options=driver_mount_options(options, driver),
+            )
+        except Exception as e:
+            errors.append(f"{driver}: {e}")
+            continue
+        print(f"[+] Partition {device} mounted at {mountpoint} ({driver})")
+        return mountpoint
+    raise RuntimeError(f"could not mount {device} ({'; '.join(errors) or 'no usable driver'})")
+
+
+def configure_mount(drivers, options: str = "", ignore_checks: bool = False) -> None:
+    global MOUNT_DRIVERS, MOUNT_OPTIONS, IGNORE_VOLUME_CHECKS
+    MOUNT_DRIVERS, MOUNT_OPTIONS, IGNORE_VOLUME_CHECKS = list(drivers), options, ignore_checks
 
 
 def umount_partition(mountpoint):
-    run(["umount", str(mountpoint)])
+    SYSTEM.umount(mountpoint)
     print(f"[+] Unmounted: {mountpoint}")
 
 
-def backup_and_replace_utilman(win_root, wrp_exe_src, dry_run=False):
+class MountSession:
+    """
+    Keeps one Windows root available across several operations.
+
+    With `win_root` nothing is mounted (already-mounted tree or extracted
+    image directory). Otherwise the device is mounted on first use, an
+    existing mount of the same device is reused, and only a mount made by
+    the session is undone on close.
+    """
+
+    def __init__(self, device=None, mountpoint="/mnt/win", win_root=None):
+        self.device = device
+        self.mountpoint = mountpoint
+        self._root = Path(win_root) if win_root else None
+        self._owned = False
+        self.umount_error = None
+
+    @property
+    def mounted(self) -> bool:
+        return self._root is not None
+
+    @property
+    def root(self) -> Path:
+        if self._root is None:
+            # Live mount table, not the cached inventory: batch restore
+            # reuses loop devices that other workers mounted and released.
+            mounts = BLOCK_INVENTORY.mountpoints(self.device) if self.device else []
+            if mounts:
+                self._check_existing_mount(mounts[0])
+                print(f"[i] {self.device} is already mounted at {mounts[0]}, reusing it")
+                self._root = Path(mounts[0])
+            else:
+                self._root = mount_partition(self.device, self.mountpoint)
+                self._owned = True
+        return self._root
+
+    def _check_existing_mount(self, mountpoint: str) -> None:
+        """Apply the pre-mount checks to a mount made by someone else."""
+        if not IGNORE_VOLUME_CHECKS:
+            reason = check_volume(self.device)
+            if reason:
+                print(f"[!] Refusing to use {self.device} (mounted at {mountpoint}): {reason}")
+                print("[!] Use --ignore-volume-checks to use it anyway.")
+                raise RuntimeError(f"{self.device}: {reason}")
+        try:
+            read_only = bool(os.statvfs(mountpoint).f_flag & os.ST_RDONLY)
+        except OSError as e:
+            raise RuntimeError(f"{self.device}: cannot stat {mountpoint}: {e}")
+        if read_only:
+            # ntfs-3g falls back to read-only on hibernated/dirty volumes.
+            raise RuntimeError(
+                f"{self.device} is mounted read-only at {mountpoint}; "
+                "unmount it (or remount it read-write) first"
+            )
+
+    def close(self) -> None:
+        root, owned = self._root, self._owned
+        self._root, self._owned = None, False
+        if owned and SYSTEM.ismount(root):
+            try:
+                umount_partition(root)
+            except Exception as e:
+                self.umount_error = f"umount {root}: {e}"
+                print(f"[!] Ошибка размонтирования: {e}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ---------------------------------------------------------------------------
+# Verified copy engine. Data is moved in-kernel with copy_file_range (or
+# sendfile) where the filesystems allow it, falling back to a plain chunked
+# copy; each chunk is hashed as it is copied (the source chunk is still in
+# the page cache). The result is fsynced, renamed into place atomically and
+# read back to check the hash, so a yanked USB stick or a misbehaving NTFS
+# driver is caught here rather than at the logon screen.
+# ---------------------------------------------------------------------------
+
+COPY_CHUNK = 8 * 1024 * 1024
+MANIFEST_SUFFIX = ".manifest.json"
+_FALLBACK_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF}
+
+
+class CopyError(RuntimeError):
+    """Raised when a copy cannot be completed or fails verification."""
+
+
+def sha256_file(path, chunk_size: int = COPY_CHUNK) -> tuple[str, int]:
+    """Return (sha256 hex digest, size) of a file."""
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def _fsync_dir(path) -> None:
+    """fsync a directory so renames in it are durable (best effort on FUSE)."""
+    try:
+        fd = os.open(str(path), os.O_RDONLY | getattr(os, "O_DIRECTORY", 0))
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass  # ntfs-3g and some FUSE drivers reject directory fsync
+    finally:
+        os.close(fd)
+
+
+def _copy_fd(src_fd: int, dst_fd: int, size: int, digest) -> str:
+    """Copy `size` bytes, hashing each chunk; return the method that was used."""
+    methods = []
+    if hasattr(os, "copy_file_range"):
+        methods.append("copy_file_range")
+    if hasattr(os, "sendfile"):
+        methods.append("sendfile")
+    methods.append("read/write")
+
+    for method in methods:
+        pos = 0
+        try:
+            while pos < size:
+                count = min(COPY_CHUNK, size - pos)
+                if method == "copy_file_range":
+                    done = os.copy_file_range(src_fd, dst_fd, count, pos, pos)
+                elif method == "sendfile":
+                    os.lseek(dst_fd, pos, os.SEEK_SET)
+                    done = os.sendfile(dst_fd, src_fd, pos, count)
+                else:
+                    chunk = os.pread(src_fd, count, pos)
+                    done = os.pwrite(dst_fd, chunk, pos)
+                if done <= 0:
+                    raise CopyError(f"source shrank during copy at offset {pos}")
+                digest.update(chunk[:done] if method == "read/write" else os.pread(src_fd, done, pos))
+                pos += done
+            return method
+        except OSError as e:
+            if pos or e.errno not in _FALLBACK_ERRNOS or method == "read/write":
+                raise
+            # Not supported between these filesystems: try the next method.
+    raise CopyError("no copy method available")
+
+
+def copy_verified(src, dst, tmp=None) -> tuple[str, int]:
+    """
+    Copy src -> dst via a temporary file, fsync, atomic rename, read-back verify.
+    Returns (sha256, size). Raises CopyError/OSError on failure; dst is then
+    left untouched.
+    """
+    src, dst = Path(src), Path(dst)
+    tmp = Path(tmp) if tmp else dst.with_name(dst.name + ".wrpnew")
+    digest = hashlib.sha256()
+    src_fd = os.open(str(src), os.O_RDONLY)
+    try:
+        size = os.fstat(src_fd).st_size
+        dst_fd = os.open(str(tmp), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            method = _copy_fd(src_fd, dst_fd, size, digest)
+            os.ftruncate(dst_fd, size)
+            os.fsync(dst_fd)
+            if hasattr(os, "posix_fadvise"):
+                # Drop cached pages so the read-back below hits the device.
+                os.posix_fadvise(dst_fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(dst_fd)
+    except BaseException:
+        os.close(src_fd)
+        if tmp.exists():
+            tmp.unlink()
+        raise
+    os.close(src_fd)
+
+    expected = digest.hexdigest()
+    written, written_size = sha256_file(tmp)
+    if (written, written_size) != (expected, size):
+        tmp.unlink()
+        raise CopyError(f"verification failed for {tmp}: {written} != {expected}")
+    os.replace(tmp, dst)
+    _fsync_dir(dst.parent)
+
+    actual, _ = sha256_file(dst)
+    if actual != expected:
+        raise CopyError(f"read-back of {dst} does not match source ({actual} != {expected})")
+    print(f"[+] Copied {size} bytes via {method}, sha256 {expected} (verified)")
+    return expected, size
+
+
+def manifest_path(backup) -> Path:
+    return Path(str(backup) + MANIFEST_SUFFIX)
+
+
+def write_manifest(backup, sha256: str, size: int) -> Path:
+    """Record the original binary's hash next to its backup (atomic write)."""
+    path = manifest_path(backup)
+    tmp = path.with_name(path.name + ".wrpnew")
+    data = {
+        "file": Path(backup).name,
+        "sha256": sha256,
+        "size": size,
+        "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    _fsync_dir(path.parent)
+    return path
+
+
+def read_manifest(backup) -> dict | None:
+    try:
+        with open(manifest_path(backup), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"[!] Cannot read manifest {manifest_path(backup)}: {e}")
+        return {}
+
+
+def backup_and_replace_utilman(win_root, wrp_exe_src, dry_run=False) -> bool:
     windows_dir = Path(win_root) / "Windows" / "System32"
     if not windows_dir.is_dir():
         print(f"[!] {windows_dir} not found. This does not look like a Windows system root.")
-        return
+        return False
     utilman = windows_dir / "Utilman.exe"
     utilman_backup = windows_dir / "Utilman.exe.tmp"
     wrp_exe_dst = windows_dir / "wrpbypass.exe"
 
     if not utilman.exists():
         print(f"[!] {utilman} not found. Make sure you selected the correct partition.")
-        return
+        return False
 
     if not Path(wrp_exe_src).exists():
         print(f"[!] wrpbypass.exe not found at {wrp_exe_src}")
-        return
+        return False
 
-    # Backup Utilman.exe
+    # Backup Utilman.exe (rename on the same volume) and record its hash
     if utilman_backup.exists():
         print("[!] Backup Utilman.exe.tmp already exists. Skipping backup.")
     else:
         print(f"[+] Renaming {utilman} -> {utilman_backup}")
         if not dry_run:
+            sha256, size = sha256_file(utilman)
+            print(f"[+] Original Utilman.exe: {size} bytes, sha256 {sha256}")
             utilman.rename(utilman_backup)
+            _fsync_dir(windows_dir)
+            print(f"[+] Manifest written: {write_manifest(utilman_backup, sha256, size)}")
 
-    # Copy our wrpbypass.exe
-    print(f"[+] Copy {wrp_exe_src} -> {wrp_exe_dst}")
-    if not dry_run:
-        run(["cp", str(wrp_exe_src), str(wrp_exe_dst)])
-
-    # Replace Utilman.exe
-    print(f"[+] Replacing {utilman} with wrpbypass.exe")
+    # Copy our wrpbypass.exe (staged as wrpbypass.exe) and atomically
+    # replace Utilman.exe with it
+    print(f"[+] Copy {wrp_exe_src} -> {wrp_exe_dst} -> {utilman}")
     if not dry_run:
-        if utilman.exists():
-            utilman.unlink()
-        wrp_exe_dst.rename(utilman)
+        try:
+            copy_verified(wrp_exe_src, utilman, tmp=wrp_exe_dst)
+        except (OSError, CopyError) as e:
+            print(f"[!] Copy failed: {e}")
+            return False
 
     print("[+] Replacement completed. On the logon screen, press the Ease of Access button to start wrpbypass.")
     if dry_run:
         print("[DRY-RUN] No files were actually modified.")
+    return True
 
 
-def restore_files(win_root, dry_run=False):
+def restore_files(win_root, dry_run=False, force=False) -> bool:
     windows_dir = Path(win_root) / "Windows" / "System32"
     utilman = windows_dir / "Utilman.exe"
     utilman_backup = windows_dir / "Utilman.exe.tmp"
@@ -100,7 +517,24 @@ def restore_files(win_root, dry_run=False):
 
     if not utilman_backup.exists():
         print("[!] Backup file Utilman.exe.tmp not found. Nothing to restore.")
-        return
+        return False
+
+    # Confirm the backup is the genuine binary recorded at install time
+    manifest = read_manifest(utilman_backup)
+    if manifest is None:
+        print("[!] No manifest next to Utilman.exe.tmp; its integrity cannot be verified.")
+    else:
+        sha256, size = sha256_file(utilman_backup)
+        if manifest.get("sha256") != sha256 or manifest.get("size") != size:
+            print(
+                f"[!] Utilman.exe.tmp does not match its manifest "
+                f"(sha256 {sha256}, expected {manifest.get('sha256')})."
+            )
+            if not force:
+                print("[!] Refusing to restore; use --force to restore anyway.")
+                return False
+        else:
+            print(f"[+] Backup verified against manifest (sha256 {sha256})")
 
     # Remove standalone wrpbypass.exe if present
     if wrp_exe.exists():
@@ -108,75 +542,1360 @@ def restore_files(win_root, dry_run=False):
         if not dry_run:
             wrp_exe.unlink()
 
-    # Remove current Utilman.exe if it is not the backup
-    if utilman.exists() and utilman != utilman_backup:
-        print(f"[+] Removing current {utilman}")
-        if not dry_run:
-            utilman.unlink()
-
+    # os.replace swaps the backup in atomically: there is no moment without
+    # a Utilman.exe, even if the session is interrupted.
     print(f"[+] Restoring {utilman_backup} -> {utilman}")
     if not dry_run:
-        utilman_backup.rename(utilman)
+        os.replace(utilman_backup, utilman)
+        manifest_path(utilman_backup).unlink(missing_ok=True)
+        _fsync_dir(windows_dir)
 
     print("[+] Files successfully restored.")
     if dry_run:
         print("[DRY-RUN] No files were actually modified.")
+    return True
+
+
+def run_mode(session: MountSession, args: argparse.Namespace) -> bool:
+    """Run one install/restore/inspect operation against an open session."""
+    dry_run = getattr(args, "dry_run", False)
+    if args.mode == "inspect":
+        if session.mounted:
+            return inspect_tree(session.root) == 0
+        # Read-only and mount-free; works on image files without root.
+        return inspect_volume(session.device) == 0
+    if args.mode == "install":
+        if not args.wrpbypass_exe:
+            print("[!] In install mode you must pass --wrpbypass-exe /path/to/wrpbypass.exe")
+            return False
+        return backup_and_replace_utilman(session.root, args.wrpbypass_exe, dry_run=dry_run)
+    return restore_files(session.root, dry_run=dry_run, force=getattr(args, "force", False))
 
 
 def _run_with_args(args: argparse.Namespace) -> int:
     """Core logic shared between CLI and interactive modes."""
-    ensure_root()
+    devices, win_roots = args.device or [], args.win_root or []
+    if args.mode == "status":
+        return status_report(devices, win_roots, as_json=args.json)
+    if args.mode == "restore" and not win_roots and (
+        len(devices) > 1 or any(Path(d).is_file() for d in devices)
+    ):
+        return batch_restore(
+            devices, jobs=args.jobs, dry_run=args.dry_run, force=args.force, as_json=args.json
+        )
+    if len(devices) + len(win_roots) != 1:
+        print(f"[!] --mode {args.mode} takes exactly one --device or --win-root.")
+        return 1
+    args.device = devices[0] if devices else None
+    win_root = win_roots[0] if win_roots else None
+    if win_root and not Path(win_root).is_dir():
+        print(f"[!] --win-root {win_root} is not a directory.")
+        return 1
+    if not win_root and args.mode != "inspect":
+        ensure_root()
+
+    with MountSession(args.device, args.mountpoint, win_root=win_root) as session:
+        try:
+            return 0 if run_mode(session, args) else 1
+        except RuntimeError as e:
+            print(f"[!] {e}")
+            return 1
+
+
+# ---------------------------------------------------------------------------
+# Read-only NTFS access. Parses the boot sector, MFT records (with update
+# sequence fixups), attributes, runlists and $I30 directory indexes using
+# positioned block reads on the device or image file, so installations can
+# be inspected without mounting (and without touching hibernated or dirty
+# volumes). Compressed/encrypted streams are reported, not decoded.
+# ---------------------------------------------------------------------------
+
+AT_ATTRIBUTE_LIST = 0x20
+AT_FILE_NAME = 0x30
+AT_VOLUME_NAME = 0x60
+AT_VOLUME_INFORMATION = 0x70
+AT_DATA = 0x80
+AT_INDEX_ROOT = 0x90
+AT_INDEX_ALLOCATION = 0xA0
+AT_END = 0xFFFFFFFF
+
+MFT_RECORD_MFT = 0
+MFT_RECORD_VOLUME = 3
+MFT_RECORD_UPCASE = 10
+MFT_RECORD_ROOT = 5
+
+FILE_NAME_DOS = 2
+INDEX_ENTRY_NODE = 0x01
+INDEX_ENTRY_END = 0x02
+ATTR_COMPRESSED = 0x0001
+ATTR_ENCRYPTED = 0x4000
+VOLUME_IS_DIRTY = 0x0001
+
+
+class NtfsError(Exception):
+    """Raised when the volume or a structure on it cannot be parsed."""
+
+
+class NtfsAttribute:
+    """One (possibly merged) MFT attribute."""
+
+    def __init__(self, type_: int, name: str, flags: int):
+        self.type = type_
+        self.name = name
+        self.flags = flags
+        self.resident = True
+        self.value = b""
+        self.runs: list[tuple[int, int | None, int]] = []  # (vcn, lcn, clusters)
+        self.size = 0
+        self.initialized = 0
+
+
+class NtfsEntry:
+    """Result of a path lookup: MFT record number, directory flag and size."""
+
+    def __init__(self, path: str, record: int, is_dir: bool, size: int):
+        self.path = path
+        self.record = record
+        self.is_dir = is_dir
+        self.size = size
+
+    def __repr__(self) -> str:
+        kind = "dir" if self.is_dir else f"{self.size} bytes"
+        return f"<NtfsEntry {self.path} #{self.record} {kind}>"
+
+
+def _decode_runlist(data: bytes, pos: int, start_vcn: int) -> list[tuple[int, int | None, int]]:
+    runs = []
+    vcn, lcn = start_vcn, 0
+    while pos < len(data) and data[pos]:
+        header = data[pos]
+        len_size, off_size = header & 0x0F, header >> 4
+        pos += 1
+        length = int.from_bytes(data[pos:pos + len_size], "little")
+        pos += len_size
+        if off_size:
+            lcn += int.from_bytes(data[pos:pos + off_size], "little", signed=True)
+            runs.append((vcn, lcn, length))
+        else:
+            runs.append((vcn, None, length))  # sparse
+        pos += off_size
+        vcn += length
+    return runs
+
+
+def _apply_fixups(buf: bytearray, magic: bytes) -> bytearray:
+    if buf[:4] != magic:
+        raise NtfsError(f"bad {magic.decode()} record signature {bytes(buf[:4])!r}")
+    usa_off, usa_count = struct.unpack_from("<HH", buf, 4)
+    usn = buf[usa_off:usa_off + 2]
+    for i in range(1, usa_count):
+        end = i * 512
+        if end > len(buf):
+            break
+        if buf[end - 2:end] != usn:
+            raise NtfsError("update sequence mismatch (torn write?)")
+        buf[end - 2:end] = buf[usa_off + 2 * i:usa_off + 2 * i + 2]
+    return buf
+
+
+class NtfsVolume:
+    """
+    Read-only view of an NTFS volume on a block device or image file.
+
+        with NtfsVolume("/dev/sda3") as vol:
+            entry = vol.stat("/Windows/System32/Utilman.exe.tmp")
+            digest = vol.sha256("/Windows/System32/Utilman.exe.tmp")
+    """
+
+    def __init__(self, path: str, offset: int = 0):
+        self.path = str(path)
+        self.offset = offset
+        self._fd = os.open(self.path, os.O_RDONLY)
+        try:
+            self._read_boot_sector()
+            self._records: dict[int, dict[tuple[int, str], NtfsAttribute]] = {}
+            self._upcase: list[int] | None = None
+            self._mft = self._bootstrap_mft()
+        except BaseException:
+            os.close(self._fd)
+            raise
+
+    # -- low level ---------------------------------------------------------
+
+    def close(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _pread(self, pos: int, size: int) -> bytes:
+        data = os.pread(self._fd, size, self.offset + pos)
+        if len(data) != size:
+            raise NtfsError(f"short read at offset {pos} ({len(data)}/{size} bytes)")
+        return data
+
+    def _read_boot_sector(self) -> None:
+        boot = self._pread(0, 512)
+        if boot[3:11] != b"NTFS    ":
+            raise NtfsError("not an NTFS volume (bad OEM id)")
+        self.bytes_per_sector = struct.unpack_from("<H", boot, 0x0B)[0]
+        spc = boot[0x0D]
+        spc = 1 << (256 - spc) if spc > 0x80 else spc
+        self.cluster_size = self.bytes_per_sector * spc
+        self.total_bytes = struct.unpack_from("<Q", boot, 0x28)[0] * self.bytes_per_sector
+        self.mft_lcn = struct.unpack_from("<Q", boot, 0x30)[0]
+        self.record_size = self._scaled_size(struct.unpack_from("<b", boot, 0x40)[0])
+        self.index_block_size = self._scaled_size(struct.unpack_from("<b", boot, 0x44)[0])
+        self.serial = struct.unpack_from("<Q", boot, 0x48)[0]
+        if not self.cluster_size or self.cluster_size & (self.cluster_size - 1):
+            raise NtfsError(f"implausible cluster size {self.cluster_size}")
+        if self.record_size not in (1024, 2048, 4096):
+            raise NtfsError(f"implausible MFT record size {self.record_size}")
+
+    def _scaled_size(self, raw: int) -> int:
+        return 1 << -raw if raw < 0 else raw * self.cluster_size
+
+    def _read_runs(self, runs, pos: int, size: int) -> bytes:
+        """Read `size` bytes at stream offset `pos` through a runlist."""
+        out = bytearray()
+        cs = self.cluster_size
+        for vcn, lcn, length in runs:
+            run_start, run_end = vcn * cs, (vcn + length) * cs
+            if run_end <= pos or size <= 0:
+                continue
+            if run_start >= pos + size:
+                break
+            lo = max(pos, run_start)
+            n = min(pos + size, run_end) - lo
+            if lcn is None:
+                out += bytes(n)
+            else:
+                out += self._pread(lcn * cs + (lo - run_start), n)
+            pos, size = lo + n, size - n
+        if size > 0:
+            raise NtfsError("stream offset beyond runlist")
+        return bytes(out)
+
+    # -- MFT ---------------------------------------------------------------
+
+    def _bootstrap_mft(self) -> NtfsAttribute:
+        raw = bytearray(self._pread(self.mft_lcn * self.cluster_size, self.record_size))
+        attrs, extensions = self._parse_record(_apply_fixups(raw, b"FILE"), 0)
+        mft = attrs.get((AT_DATA, ""))
+        if mft is None or mft.resident:
+            raise NtfsError("$MFT has no non-resident $DATA")
+        # A fragmented $MFT keeps the rest of its runlist in extension
+        # records, which live inside the extents already known.
+        self._mft = mft
+        for ref in extensions:
+            ext_attrs, _ = self._parse_record(self._read_record_raw(ref), ref)
+            ext = ext_attrs.get((AT_DATA, ""))
+            if ext is not None:
+                mft.runs = sorted(mft.runs + ext.runs)
+        return mft
+
+    def _read_record_raw(self, number: int) -> bytearray:
+        raw = self._read_runs(self._mft.runs, number * self.record_size, self.record_size)
+        return _apply_fixups(bytearray(raw), b"FILE")
+
+    def _parse_record(self, rec: bytearray, number: int):
+        """
+        Return ({(type, name): attribute}, [extension record numbers]) for
+        MFT record `number`.
+        """
+        attrs: dict[tuple[int, str], NtfsAttribute] = {}
+        extensions: list[int] = []
+        if not struct.unpack_from("<H", rec, 0x16)[0] & 0x01:
+            raise NtfsError("MFT record not in use")
+        pos = struct.unpack_from("<H", rec, 0x14)[0]
+        while pos + 8 <= len(rec):
+            type_, length = struct.unpack_from("<II", rec, pos)
+            if type_ == AT_END or length == 0:
+                break
+            non_resident, name_len, name_off, flags = struct.unpack_from("<BBHH", rec, pos + 8)
+            name = rec[pos + name_off:pos + name_off + 2 * name_len].decode("utf-16-le")
+            key = (type_, name)
+            attr = attrs.get(key)
+            if attr is None:
+                attr = attrs[key] = NtfsAttribute(type_, name, flags)
+            if non_resident:
+                start_vcn = struct.unpack_from("<q", rec, pos + 0x10)[0]
+                runs_off = struct.unpack_from("<H", rec, pos + 0x20)[0]
+                attr.resident = False
+                attr.runs += _decode_runlist(rec[:pos + length], pos + runs_off, start_vcn)
+                if start_vcn == 0:
+                    attr.size, attr.initialized = struct.unpack_from("<QQ", rec, pos + 0x30)
+            else:
+                vlen, voff = struct.unpack_from("<IH", rec, pos + 0x10)
+                attr.value = bytes(rec[pos + voff:pos + voff + vlen])
+                attr.size = attr.initialized = vlen
+            pos += length
+        attr_list = attrs.pop((AT_ATTRIBUTE_LIST, ""), None)
+        if attr_list is not None:
+            data = attr_list.value if attr_list.resident else self._read_attr(attr_list)
+            p = 0
+            while p + 0x1A <= len(data):
+                rec_len = struct.unpack_from("<H", data, p + 4)[0]
+                ref = struct.unpack_from("<Q", data, p + 0x10)[0] & 0xFFFFFFFFFFFF
+                # Entries may point to the base record itself in any order.
+                if ref != number and ref not in extensions:
+                    extensions.append(ref)
+                if rec_len == 0:
+                    break
+                p += rec_len
+        return attrs, extensions
+
+    def _record(self, number: int) -> dict[tuple[int, str], NtfsAttribute]:
+        attrs = self._records.get(number)
+        if attrs is None:
+            attrs, extensions = self._parse_record(self._read_record_raw(number), number)
+            for ref in extensions:
+                ext_attrs, _ = self._parse_record(self._read_record_raw(ref), ref)
+                for key, ext in ext_attrs.items():
+                    attr = attrs.setdefault(key, ext)
+                    if attr is not ext:
+                        attr.runs = sorted(attr.runs + ext.runs)
+                        attr.size = attr.size or ext.size
+                        attr.initialized = attr.initialized or ext.initialized
+            if len(self._records) > 4096:
+                self._records.clear()
+            self._records[number] = attrs
+        return attrs
+
+    def _read_attr(self, attr: NtfsAttribute, pos: int = 0, size: int | None = None) -> bytes:
+        if size is None:
+            size = attr.size - pos
+        size = max(0, min(size, attr.size - pos))
+        if attr.resident:
+            return attr.value[pos:pos + size]
+        if attr.flags & (ATTR_COMPRESSED | ATTR_ENCRYPTED):
+            raise NtfsError("compressed/encrypted streams are not supported")
+        readable = max(0, min(size, attr.initialized - pos))
+        data = self._read_runs(attr.runs, pos, readable) if readable else b""
+        return data + bytes(size - readable)
+
+    # -- directory indexes --------------------------------------------------
+
+    def _upcase_table(self) -> list[int]:
+        if self._upcase is None:
+            data = self._read_attr(self._record(MFT_RECORD_UPCASE)[(AT_DATA, "")])
+            self._upcase = list(struct.unpack(f"<{len(data) // 2}H", data))
+        return self._upcase
+
+    def _collate_key(self, name: str) -> list[int]:
+        table = self._upcase_table()
+        units = struct.unpack(f"<{len(name.encode('utf-16-le')) // 2}H", name.encode("utf-16-le"))
+        return [table[u] if u < len(table) else u for u in units]
+
+    @staticmethod
+    def _index_entries(buf: bytes, header: int):
+        """Yield (mft_ref, name, namespace, subnode_vcn, is_end) from an index node."""
+        first, total = struct.unpack_from("<II", buf, header)
+        pos, end = header + first, header + total
+        while pos + 0x10 <= end:
+            ref, length, key_len, flags = struct.unpack_from("<QHHH", buf, pos)
+            subnode = None
+            if flags & INDEX_ENTRY_NODE:
+                subnode = struct.unpack_from("<q", buf, pos + length - 8)[0]
+            if flags & INDEX_ENTRY_END:
+                yield None, None, None, subnode, True
+                return
+            name_len, namespace = buf[pos + 0x50], buf[pos + 0x51]
+            name = buf[pos + 0x52:pos + 0x52 + 2 * name_len].decode("utf-16-le", "replace")
+            yield ref & 0xFFFFFFFFFFFF, name, namespace, subnode, False
+            if length == 0:
+                return
+            pos += length
+
+    def _index_nodes(self, record: int):
+        """Return (root node buffer, header offset, reader for subnode VCNs)."""
+        attrs = self._record(record)
+        root = attrs.get((AT_INDEX_ROOT, "$I30"))
+        if root is None:
+            raise NtfsError(f"MFT record {record} is not a directory")
+        block_size = struct.unpack_from("<I", root.value, 8)[0]
+        alloc = attrs.get((AT_INDEX_ALLOCATION, "$I30"))
+        unit = self.cluster_size if block_size >= self.cluster_size else 512
+
+        def read_block(vcn: int):
+            if alloc is None:
+                raise NtfsError(f"MFT record {record}: subnode without $INDEX_ALLOCATION")
+            raw = bytearray(self._read_attr(alloc, vcn * unit, block_size))
+            return bytes(_apply_fixups(raw, b"INDX")), 0x18
+
+        return root.value, 0x10, read_block
+
+    def _find_in_dir(self, record: int, name: str) -> int | None:
+        key = self._collate_key(name)
+        buf, header, read_block = self._index_nodes(record)
+        for _depth in range(64):
+            descend = None
+            for ref, entry_name, _ns, subnode, is_end in self._index_entries(buf, header):
+                if is_end:
+                    descend = subnode
+                    break
+                entry_key = self._collate_key(entry_name)
+                if entry_key == key:
+                    return ref
+                if key < entry_key:
+                    descend = subnode
+                    break
+            if descend is None:
+                return None
+            buf, header = read_block(descend)
+        raise NtfsError(f"MFT record {record}: directory index too deep")
+
+    def _walk_dir(self, record: int):
+        buf, header, read_block = self._index_nodes(record)
+        stack = [(buf, header)]
+        while stack:
+            buf, header = stack.pop()
+            for ref, name, namespace, subnode, is_end in self._index_entries(buf, header):
+                if subnode is not None:
+                    stack.append(read_block(subnode))
+                if not is_end:
+                    yield ref, name, namespace
+
+    # -- public API ---------------------------------------------------------
+
+    def _resolve(self, path: str) -> int | None:
+        record = MFT_RECORD_ROOT
+        for part in str(path).replace("\\", "/").split("/"):
+            if not part:
+                continue
+            found = self._find_in_dir(record, part)
+            if found is None:
+                return None
+            record = found
+        return record
+
+    def stat(self, path: str) -> NtfsEntry | None:
+        """Look up `path` (case-insensitive, / or \\ separated); None if absent."""
+        record = self._resolve(path)
+        if record is None:
+            return None
+        attrs = self._record(record)
+        if (AT_INDEX_ROOT, "$I30") in attrs:
+            return NtfsEntry(path, record, True, 0)
+        data = attrs.get((AT_DATA, ""))
+        return NtfsEntry(path, record, False, data.size if data else 0)
+
+    def volume_flags(self) -> int:
+        """Flags from $VOLUME_INFORMATION (VOLUME_IS_DIRTY etc.)."""
+        info = self._record(MFT_RECORD_VOLUME).get((AT_VOLUME_INFORMATION, ""))
+        if info is None or len(info.value) < 12:
+            raise NtfsError("$Volume has no $VOLUME_INFORMATION")
+        return struct.unpack_from("<H", info.value, 0x0A)[0]
+
+    def hibernation_signature(self) -> bytes:
+        """First 4 bytes of /hiberfil.sys ("hibr"/"HIBR" when hibernated), b"" if absent."""
+        entry = self.stat("/hiberfil.sys")
+        if entry is None or entry.is_dir or entry.size < 4:
+            return b""
+        return next(self.iter_file("/hiberfil.sys", chunk_size=4), b"")[:4]
+
+    def volume_label(self) -> str:
+        """$VOLUME_NAME of the $Volume system file."""
+        name = self._record(MFT_RECORD_VOLUME).get((AT_VOLUME_NAME, ""))
+        return name.value.decode("utf-16-le", "replace") if name else ""
+
+    def exists(self, path: str) -> bool:
+        return self._resolve(path) is not None
+
+    def is_dir(self, path: str) -> bool:
+        entry = self.stat(path)
+        return bool(entry and entry.is_dir)
+
+    def listdir(self, path: str = "/") -> list[str]:
+        """Long (Win32/POSIX) names in a directory, in index order."""
+        record = self._resolve(path)
+        if record is None:
+            raise NtfsError(f"{path}: no such directory")
+        # Skip 8.3 aliases and the root directory's "." entry (itself);
+        # hard links in the same directory are separate names.
+        names = {
+            name
+            for ref, name, namespace in self._walk_dir(record)
+            if namespace != FILE_NAME_DOS and ref != record
+        }
+        return sorted(names, key=self._collate_key)
+
+    def iter_file(self, path: str, chunk_size: int = 1 << 20):
+        """Yield the unnamed $DATA stream of `path` in chunks."""
+        entry = self.stat(path)
+        if entry is None or entry.is_dir:
+            raise NtfsError(f"{path}: no such file")
+        attrs = self._record(entry.record)
+        if (AT_DATA, "WofCompressedData") in attrs:
+            raise NtfsError(f"{path}: WOF-compressed (CompactOS) files are not supported")
+        data = attrs.get((AT_DATA, ""))
+        if data is None:
+            return
+        for pos in range(0, data.size, chunk_size):
+            yield self._read_attr(data, pos, chunk_size)
+
+    def read_file(self, path: str) -> bytes:
+        return b"".join(self.iter_file(path))
+
+    def sha256(self, path: str) -> str:
+        digest = hashlib.sha256()
+        for chunk in self.iter_file(path):
+            digest.update(chunk)
+        return digest.hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# Block device inventory. Reads /sys/class/block, the filesystem superblocks
+# and /proc/self/mountinfo directly (no column parsing of lsblk output), with
+# `lsblk -J` as a fallback when sysfs is unavailable. `root` lets the whole
+# inventory run against a fixture tree (sys/, dev/, proc/, run/ under it).
+# ---------------------------------------------------------------------------
+
+
+class BlockDevice(NamedTuple):
+    name: str
+    path: str
+    size: int
+    fstype: str
+    label: str
+    uuid: str
+    removable: bool
+    read_only: bool
+    mountpoints: tuple[str, ...]
+    parent: str
+    devno: str
+
+    @property
+    def mountpoint(self) -> str:
+        return self.mountpoints[0] if self.mountpoints else ""
+
+    @property
+    def mounted(self) -> bool:
+        return bool(self.mountpoints)
+
+
+def _human_size(size: int) -> str:
+    value = float(size)
+    for unit in ("B", "K", "M", "G", "T"):
+        if value < 1024 or unit == "T":
+            return f"{value:.0f}{unit}" if unit == "B" else f"{value:.1f}{unit}"
+        value /= 1024
+    return str(size)
+
+
+def _cstr(raw: bytes) -> str:
+    return raw.split(b"\0", 1)[0].decode("utf-8", "replace").strip()
+
+
+def _uuid_str(raw: bytes) -> str:
+    h = raw.hex()
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:32]}"
+
+
+def _ntfs_label(path: str) -> str:
+    try:
+        with NtfsVolume(path) as vol:
+            return vol.volume_label()
+    except (OSError, NtfsError):
+        return ""
+
 
-    mountpoint = None
+SUPERBLOCK_READ = 0x10000 + 0x1000
+
+
+def probe_superblock(path: str) -> tuple[str, str, str]:
+    """Identify the filesystem on `path`: (fstype, label, uuid), blank if unknown."""
+    with open(path, "rb") as f:
+        buf = f.read(SUPERBLOCK_READ)
+
+    def at(off: int, size: int) -> bytes:
+        return buf[off:off + size]
+
+    if at(3, 8) == b"NTFS    ":
+        return "ntfs", _ntfs_label(path), at(0x48, 8)[::-1].hex().upper()
+    if at(3, 8) == b"-FVE-FS-":
+        return "BitLocker", "", ""
+    if at(3, 8) == b"EXFAT   ":
+        serial = at(0x64, 4)[::-1].hex().upper()
+        return "exfat", "", f"{serial[:4]}-{serial[4:]}"
+    if at(0x52, 5) == b"FAT32" or at(0x36, 3) == b"FAT":
+        base = 0x43 if at(0x52, 5) == b"FAT32" else 0x27
+        serial = at(base, 4)[::-1].hex().upper()
+        label = _cstr(at(base + 4, 11))
+        return "vfat", "" if label == "NO NAME" else label, f"{serial[:4]}-{serial[4:]}"
+    if at(0x438, 2) == b"\x53\xef":
+        compat, incompat = struct.unpack_from("<II", buf, 0x45C)
+        fstype = "ext4" if incompat & 0x2C0 else "ext3" if compat & 0x4 else "ext2"
+        return fstype, _cstr(at(0x478, 16)), _uuid_str(at(0x468, 16))
+    if at(0x10040, 8) == b"_BHRfS_M":
+        return "btrfs", _cstr(at(0x1012B, 256)), _uuid_str(at(0x10020, 16))
+    if at(0, 4) == b"XFSB":
+        return "xfs", _cstr(at(108, 12)), _uuid_str(at(32, 16))
+    if at(0, 6) == b"LUKS\xba\xbe":
+        return "crypto_LUKS", "", _cstr(at(168, 40))
+    if at(0, 4) == b"hsqs":
+        return "squashfs", "", ""
+    if at(0x8001, 5) == b"CD001":
+        return "iso9660", _cstr(at(0x8028, 32)), ""
+    if at(4086, 10) in (b"SWAPSPACE2", b"SWAP-SPACE"):
+        return "swap", _cstr(at(1024 + 28, 16)), _uuid_str(at(1024 + 12, 16))
+    return "", "", ""
+
+
+class BlockInventory:
+    """Cached view of the system's block devices; call refresh() to rescan."""
+
+    def __init__(self, root: str = "/"):
+        self.root = Path(root)
+        self._devices: list[BlockDevice] | None = None
+
+    def devices(self, refresh: bool = False) -> list[BlockDevice]:
+        if self._devices is None or refresh:
+            self._devices = self._scan()
+        return self._devices
+
+    def refresh(self) -> list[BlockDevice]:
+        return self.devices(refresh=True)
+
+    def partitions(self, refresh: bool = False) -> list[BlockDevice]:
+        """Leaf devices that can carry a filesystem (partitions, unpartitioned disks)."""
+        devices = self.devices(refresh)
+        parents = {d.parent for d in devices if d.parent}
+        return [d for d in devices if d.name not in parents]
+
+    def get(self, path: str) -> BlockDevice | None:
+        real = os.path.realpath(path)
+        for d in self.devices():
+            if d.path in (path, real):
+                return d
+        return None
+
+    def mountpoints(self, path: str) -> list[str]:
+        """Where block device `path` is mounted right now (not from the cache)."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return []
+        if not stat.S_ISBLK(st.st_mode):
+            return []
+        devno = f"{os.major(st.st_rdev)}:{os.minor(st.st_rdev)}"
+        return self._read_mountinfo().get(devno, [])
+
+    # -- scanning -------------------------------------------------------------
+
+    def _scan(self) -> list[BlockDevice]:
+        sys_block = self.root / "sys" / "class" / "block"
+        try:
+            names = sorted(os.listdir(sys_block))
+        except OSError:
+            names = []
+        if not names:
+            return self._scan_lsblk()
+        mounts = self._read_mountinfo()
+        devices = []
+        for name in names:
+            dev = self._read_sysfs(sys_block / name, name, mounts)
+            if dev is not None:
+                devices.append(dev)
+        return devices
+
+    def _read_sysfs(self, entry: Path, name: str, mounts) -> BlockDevice | None:
+        def attr(rel: str, default: str = "") -> str:
+            try:
+                return (entry / rel).read_text().strip()
+            except OSError:
+                return default
+
+        sectors = attr("size", "0")
+        size = int(sectors) * 512 if sectors.isdigit() else 0
+        if size == 0:
+            return None  # empty loop/ram devices, ejected media
+        parent = ""
+        if (entry / "partition").exists():
+            parent = entry.resolve().parent.name
+            removable = attr("../removable", "0") == "1"
+        else:
+            removable = attr("removable", "0") == "1"
+        devno = attr("dev")
+        path = str(self.root / "dev" / name)
+        fstype, label, uuid = self._identify(path, devno)
+        return BlockDevice(
+            name=name,
+            path=f"/dev/{name}",
+            size=size,
+            fstype=fstype,
+            label=label,
+            uuid=uuid,
+            removable=removable,
+            read_only=attr("ro", "0") == "1",
+            mountpoints=tuple(mounts.get(devno, ())),
+            parent=parent,
+            devno=devno,
+        )
+
+    def _identify(self, path: str, devno: str) -> tuple[str, str, str]:
+        try:
+            found = probe_superblock(path)
+            if found[0]:
+                return found
+        except OSError:
+            pass
+        # Unreadable without root: fall back to the udev database.
+        props = {}
+        try:
+            for line in (self.root / "run" / "udev" / "data" / f"b{devno}").read_text().splitlines():
+                if line.startswith("E:") and "=" in line:
+                    key, _, value = line[2:].partition("=")
+                    props[key] = value
+        except OSError:
+            pass
+        return props.get("ID_FS_TYPE", ""), props.get("ID_FS_LABEL", ""), props.get("ID_FS_UUID", "")
+
+    def _read_mountinfo(self) -> dict[str, list[str]]:
+        mounts: dict[str, list[str]] = {}
+        try:
+            text = (self.root / "proc" / "self" / "mountinfo").read_text()
+        except OSError:
+            return mounts
+        for line in text.splitlines():
+            fields = line.split()
+            if len(fields) < 5:
+                continue
+            mountpoint = re.sub(r"\\([0-7]{3})", lambda m: chr(int(m.group(1), 8)), fields[4])
+            mounts.setdefault(fields[2], []).append(mountpoint)
+        return mounts
+
+    def _scan_lsblk(self) -> list[BlockDevice]:
+        try:
+            cp = subprocess.run(
+                ["lsblk", "-J", "-b", "-o",
+                 "NAME,PATH,SIZE,FSTYPE,LABEL,UUID,RM,RO,MOUNTPOINT,MAJ:MIN"],
+                text=True,
+                capture_output=True,
+                check=False,
+            )
+            tree = json.loads(cp.stdout or "{}").get("blockdevices", [])
+        except (FileNotFoundError, ValueError):
+            return []
+
+        def flag(value) -> bool:
+            return value in (True, "1", 1)
+
+        devices = []
+
+        def walk(nodes, parent: str) -> None:
+            for node in nodes:
+                size = int(node.get("size") or 0)
+                if size:
+                    devices.append(BlockDevice(
+                        name=node["name"],
+                        path=node.get("path") or f"/dev/{node['name']}",
+                        size=size,
+                        fstype=node.get("fstype") or "",
+                        label=node.get("label") or "",
+                        uuid=node.get("uuid") or "",
+                        removable=flag(node.get("rm")),
+                        read_only=flag(node.get("ro")),
+                        mountpoints=(node["mountpoint"],) if node.get("mountpoint") else (),
+                        parent=parent,
+                        devno=node.get("maj:min") or "",
+                    ))
+                walk(node.get("children") or [], node["name"])
+
+        walk(tree, "")
+        return devices
+
+
+BLOCK_INVENTORY = BlockInventory()
+
+
+# ---------------------------------------------------------------------------
+# Windows installation auto-detection. All NTFS candidates are probed in
+# parallel without mounting: the boot sector is read directly and
+# Windows/System32 is checked read-only through NtfsVolume, so the operator
+# gets a ranked list instead of guessing.
+# ---------------------------------------------------------------------------
+
+PROBE_TIMEOUT = 5.0
+HOOK_FILES = ("Utilman.exe", "Utilman.exe.tmp", "wrpbypass.exe")
+SYSTEM32 = "/Windows/System32"
+SERVICING_VERSION = "/Windows/servicing/Version"
+
+
+class ProbeResult:
+    """What a read-only probe found on one partition."""
+
+    def __init__(
+        self, device: str, size: str = "?", fstype: str = "", mount: str = "", label: str = ""
+    ):
+        self.device = device
+        self.size = size
+        self.fstype = fstype
+        self.mount = mount
+        self.label = label
+        self.is_ntfs = False
+        self.volume_bytes = 0
+        self.has_system32 = False
+        self.version = ""
+        self.files: set[str] = set()
+        self.backup = ""  # verified / MISMATCH / no manifest (status mode only)
+        self.partition = ""  # partition of a whole disk/image the result is for
+        self.error = ""
+
+    @property
+    def hook_state(self) -> str:
+        return classify_hook_state(self.files) if self.has_system32 else "unknown"
+
+    def as_dict(self) -> dict:
+        return {
+            "target": self.device,
+            "partition": self.partition or None,
+            "state": self.hook_state,
+            "windows_version": self.version or None,
+            "files": sorted(self.files),
+            "backup": self.backup or None,
+            "error": self.error or None,
+        }
+
+    def sort_key(self):
+        return (not self.has_system32, not self.is_ntfs, -self.volume_bytes, self.device)
+
+    def describe(self) -> str:
+        if self.has_system32:
+            version = f"Windows {self.version}" if self.version else "Windows (version unknown)"
+            return f"{version}, hook: {self.hook_state}"
+        if self.error:
+            return self.error
+        if self.is_ntfs:
+            return "NTFS, no Windows/System32"
+        return self.fstype or "-"
+
+
+def classify_hook_state(files: set[str]) -> str:
+    """Classify System32 hook files (lower-case names) into a hook state."""
+    utilman = "utilman.exe" in files
+    backup = "utilman.exe.tmp" in files
+    helper = "wrpbypass.exe" in files
+    if utilman and not backup and not helper:
+        return "clean"
+    if utilman and backup and not helper:
+        return "hooked"
+    if backup or helper:
+        # Leftovers of an interrupted install/restore.
+        return "partial"
+    # None of the hook files at all: not something install/restore leaves.
+    return "unknown"
+
+
+def _latest_version(names: list[str]) -> str:
+    """Highest dotted version among Windows/servicing/Version entries."""
+    key = lambda v: [int(x) if x.isdigit() else -1 for x in v.split(".")]
+    return max(names, key=key, default="")
+
+
+def _read_boot_sector(device: str, offset: int = 0) -> bytes:
+    with open(device, "rb") as f:
+        f.seek(offset)
+        return f.read(512)
+
+
+MBR_EXTENDED_TYPES = (0x05, 0x0F, 0x85)
+MBR_GPT_PROTECTIVE = 0xEE
+
+
+def read_partition_table(path: str) -> list[tuple[int, int, int]]:
+    """
+    (number, byte offset, byte size) of the partitions of a whole disk or
+    disk image, from its GPT or MBR (primary partitions). Empty when there
+    is no partition table.
+    """
+    with open(path, "rb") as f:
+        mbr = f.read(512)
+        if len(mbr) < 512 or mbr[510:512] != b"\x55\xAA":
+            return []
+        primary = [struct.unpack_from("<4xB3xII", mbr, 446 + 16 * i) for i in range(4)]
+        if not any(type_ == MBR_GPT_PROTECTIVE for type_, _, _ in primary):
+            return [
+                (n, start * 512, count * 512)
+                for n, (type_, start, count) in enumerate(primary, 1)
+                if type_ and type_ not in MBR_EXTENDED_TYPES and count
+            ]
+        for sector in (512, 4096):
+            f.seek(sector)
+            header = f.read(92)
+            if header[:8] == b"EFI PART":
+                break
+        else:
+            return []
+        entries_lba, count, entry_size = struct.unpack_from("<QII", header, 72)
+        f.seek(entries_lba * sector)
+        table = f.read(min(count, 256) * entry_size)
+    partitions = []
+    for n in range(len(table) // entry_size):
+        entry = table[n * entry_size:(n + 1) * entry_size]
+        if entry[:16] == bytes(16):
+            continue
+        first, last = struct.unpack_from("<QQ", entry, 32)
+        partitions.append((n + 1, first * sector, (last - first + 1) * sector))
+    return partitions
+
+
+def _backup_verdict(manifest_raw: bytes | None, backup_sha256: str) -> str:
+    if manifest_raw is None:
+        return "no manifest"
+    try:
+        expected = json.loads(manifest_raw).get("sha256")
+    except ValueError:
+        return "bad manifest"
+    return "verified" if expected == backup_sha256 else "MISMATCH"
+
+
+def probe_partition(
+    device: str,
+    size: str = "?",
+    fstype: str = "",
+    mount: str = "",
+    label: str = "",
+    verify_backup: bool = False,
+    offset: int = 0,
+) -> ProbeResult:
+    """Read-only probe of one partition (never mounts); `offset` within an image."""
+    result = ProbeResult(device, size, fstype, mount, label)
     try:
-        mountpoint = mount_partition(args.device, args.mountpoint)
-
-        if args.mode == "install":
-            if not args.wrpbypass_exe:
-                print("[!] In install mode you must pass --wrpbypass-exe /path/to/wrpbypass.exe")
-                return 1
-            backup_and_replace_utilman(
-                mountpoint, args.wrpbypass_exe, dry_run=getattr(args, "dry_run", False)
+        boot = _read_boot_sector(device, offset)
+    except OSError as e:
+        result.error = f"cannot read: {e.strerror or e}"
+        return result
+
+    result.is_ntfs = boot[3:11] == b"NTFS    "
+    if not result.is_ntfs:
+        return result
+    try:
+        with NtfsVolume(device, offset) as vol:
+            result.volume_bytes = vol.total_bytes
+            if not vol.is_dir(SYSTEM32):
+                return result
+            result.has_system32 = True
+            result.files = {
+                name.lower() for name in HOOK_FILES if vol.exists(f"{SYSTEM32}/{name}")
+            }
+            if vol.is_dir(SERVICING_VERSION):
+                result.version = _latest_version(vol.listdir(SERVICING_VERSION))
+            if verify_backup and "utilman.exe.tmp" in result.files:
+                manifest = f"{SYSTEM32}/Utilman.exe.tmp{MANIFEST_SUFFIX}"
+                result.backup = _backup_verdict(
+                    vol.read_file(manifest) if vol.exists(manifest) else None,
+                    vol.sha256(f"{SYSTEM32}/Utilman.exe.tmp"),
+                )
+    except (OSError, NtfsError) as e:
+        result.error = f"NTFS ({e})"
+    return result
+
+
+def probe_tree(win_root, verify_backup: bool = False) -> ProbeResult:
+    """probe_partition() for a mounted or extracted Windows root directory."""
+    result = ProbeResult(str(win_root), fstype="dir")
+    windows_dir = Path(win_root) / "Windows" / "System32"
+    try:
+        names = {name.lower() for name in os.listdir(windows_dir)}
+    except OSError as e:
+        result.error = f"cannot read {windows_dir}: {e.strerror or e}"
+        return result
+    result.has_system32 = True
+    result.files = {name.lower() for name in HOOK_FILES} & names
+    try:
+        result.version = _latest_version(
+            os.listdir(Path(win_root) / "Windows" / "servicing" / "Version")
+        )
+    except OSError:
+        pass
+    if verify_backup and "utilman.exe.tmp" in result.files:
+        backup = windows_dir / "Utilman.exe.tmp"
+        manifest = manifest_path(backup)
+        try:
+            result.backup = _backup_verdict(
+                manifest.read_bytes() if manifest.is_file() else None, sha256_file(backup)[0]
             )
-        elif args.mode == "restore":
-            restore_files(mountpoint, dry_run=getattr(args, "dry_run", False))
+        except OSError as e:
+            result.backup = "unreadable"
+            result.error = f"cannot read backup: {e.strerror or e}"
+    return result
+
+
+def probe_disk(path: str, verify_backup: bool = False) -> ProbeResult | None:
+    """
+    Probe the partitions of a whole disk or disk image: partitions known to
+    sysfs for a block device, otherwise the image's partition table (read
+    directly, no loop device). Returns the Windows partition (or else the
+    first NTFS one), reported under `path`; None if there is none.
+    """
+    candidates = []
+    if Path(path).is_block_device():
+        candidates = [(part, part, 0) for part in _sysfs_partitions(path)]
+    if not candidates:
+        try:
+            candidates = [
+                (f"p{n}", path, offset) for n, offset, _size in read_partition_table(path)
+            ]
+        except OSError:
+            return None
+    best = None
+    for name, device, offset in candidates:
+        result = probe_partition(device, verify_backup=verify_backup, offset=offset)
+        result.device, result.partition = path, name
+        if result.has_system32:
+            return result
+        if best is None and result.is_ntfs:
+            best = result
+    return best
+
+
+def status_report(devices: list[str], win_roots: list[str], as_json: bool = False) -> int:
+    """Classify any number of devices/images/roots concurrently, read-only."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    def probe(target):
+        kind, path = target
+        try:
+            if kind == "root" or os.path.isdir(path):
+                return probe_tree(path, verify_backup=True)
+            result = probe_partition(path, verify_backup=True)
+            if not result.is_ntfs and not result.error:
+                # Whole disk or whole-disk image: look at its partitions.
+                result = probe_disk(path, verify_backup=True) or result
+            if not result.is_ntfs and not result.error:
+                try:
+                    fstype = probe_superblock(path)[0]
+                except OSError:
+                    fstype = ""
+                result.error = f"not NTFS ({fstype or 'unknown filesystem'})"
+            return result
+        except Exception as e:
+            # One bad target must not abort the report for all others.
+            result = ProbeResult(path, fstype="dir" if kind == "root" else "")
+            result.error = f"probe failed: {e}"
+            return result
+
+    targets = [("device", d) for d in devices] + [("root", r) for r in win_roots]
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max(1, min(16, len(targets)))) as pool:
+        results = list(pool.map(probe, targets))
+    elapsed = time.monotonic() - started
+
+    if as_json:
+        print(json.dumps([r.as_dict() for r in results], indent=2))
         return 0
-    finally:
-        # Path.is_mount() не существует, используем os.path.ismount
-        if mountpoint and os.path.ismount(str(mountpoint)):
+
+    print(f"{'TARGET':24} {'STATE':8} {'WINDOWS':18} {'BACKUP':12} DETAIL")
+    for r in results:
+        detail = r.error or ", ".join(sorted(r.files)) or "-"
+        if r.partition:
+            detail = f"[{r.partition}] {detail}"
+        print(f"{r.device:24} {r.hook_state:8} {r.version or '-':18} {r.backup or '-':12} {detail}")
+    print(f"[i] {len(results)} target(s) checked in {elapsed:.2f}s")
+    return 0
+
+
+def probe_windows_partitions(devices: list[BlockDevice]) -> list[ProbeResult]:
+    """Probe all candidate partitions concurrently, best Windows candidate first."""
+    from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+    rows = [(d.path, _human_size(d.size), d.fstype, d.mountpoint, d.label) for d in devices]
+    candidates = [r for r in rows if r[2] in ("", "ntfs")]
+    others = [ProbeResult(*r) for r in rows if r not in candidates]
+    probed = []
+    if candidates:
+        # A hung device must not block the menu: unfinished probes are
+        # reported as timed out and their threads are left to finish alone.
+        pool = ThreadPoolExecutor(max_workers=min(16, len(candidates)))
+        futures = [(p, pool.submit(probe_partition, *p)) for p in candidates]
+        deadline = time.monotonic() + PROBE_TIMEOUT
+        for part, future in futures:
             try:
-                umount_partition(mountpoint)
-            except Exception as e:
-                print(f"[!] Ошибка размонтирования: {e}")
+                probed.append(future.result(max(0.0, deadline - time.monotonic())))
+            except TimeoutError:
+                timed_out = ProbeResult(*part)
+                timed_out.error = "probe timed out"
+                probed.append(timed_out)
+        pool.shutdown(wait=False, cancel_futures=True)
+    return sorted(probed, key=ProbeResult.sort_key) + others
+
+
+# ---------------------------------------------------------------------------
+# Batch restore. Every image/device gets its own loop device (images are
+# attached with --partscan so whole-disk images work), its own temporary
+# mount point and its own captured log; restores run in parallel up to
+# --jobs, the restored Utilman.exe is checked against the manifest hash and
+# loop devices/mounts/temp dirs are released in `finally` blocks.
+# ---------------------------------------------------------------------------
+
+# Per-thread output capture. When a thread has a capture buffer attached,
+# print()/info()/error() output of that thread goes into the buffer instead
+# of the console (used by batch restore to keep one log per target).
+# wrpbypass.py carries an identical copy (both are standalone scripts);
+# tests/test_shared_code.py fails if the two drift apart.
+_OUTPUT = threading.local()
+
+
+class _StreamRouter:
+    """sys.stdout/sys.stderr replacement that honours per-thread capture."""
+
+    def __init__(self, stream, name: str):
+        self._stream = stream
+        self._name = name
+
+    def _target(self):
+        buffers = getattr(_OUTPUT, "buffers", None)
+        if buffers is not None:
+            return buffers[self._name]
+        return self._stream
+
+    def write(self, text: str) -> int:
+        return self._target().write(text)
+
+    def flush(self) -> None:
+        self._target().flush()
 
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
 
-def _list_partitions() -> list[tuple[str, str, str, str]]:
+
+def _install_output_router() -> None:
+    """Route sys.stdout/sys.stderr through _StreamRouter (idempotent)."""
+    if not isinstance(sys.stdout, _StreamRouter):
+        sys.stdout = _StreamRouter(sys.stdout, "stdout")
+    if not isinstance(sys.stderr, _StreamRouter):
+        sys.stderr = _StreamRouter(sys.stderr, "stderr")
+
+
+class _CapturedOutput:
+    """Context manager capturing stdout/stderr of the current thread."""
+
+    def __enter__(self):
+        self.stdout = io.StringIO()
+        self.stderr = io.StringIO()
+        self._prev = getattr(_OUTPUT, "buffers", None)
+        _OUTPUT.buffers = {"stdout": self.stdout, "stderr": self.stderr}
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _OUTPUT.buffers = self._prev
+        return False
+
+
+def _sysfs_partitions(device: str) -> list[str]:
+    """Partition device paths of a whole disk / loop device, from sysfs."""
+    name = Path(os.path.realpath(device)).name
+    entry = Path("/sys/class/block") / name
+    try:
+        children = sorted(
+            child.name for child in entry.iterdir() if (child / "partition").exists()
+        )
+    except OSError:
+        return []
+    return [f"/dev/{child}" for child in children]
+
+
+def _find_windows_partition(device: str, wait: float = 0.0) -> str | None:
     """
-    Return a list of (device, size, fstype, mountpoint) using lsblk.
-    Falls back to empty list if lsblk is not available.
+    The device itself or one of its partitions that holds Windows/System32.
+
+    `wait` is how long to give udev to create the partition nodes after
+    `losetup --partscan` returned; a bare NTFS volume has none to wait for.
     """
-    parts: list[tuple[str, str, str, str]] = []
+    if not Path(device).is_block_device() or _read_boot_sector(device)[3:11] == b"NTFS    ":
+        wait = 0.0
+    deadline = time.monotonic() + wait
+    while True:
+        partitions = _sysfs_partitions(device)
+        if partitions or time.monotonic() >= deadline:
+            break
+        time.sleep(0.1)  # partscan uevents can lag behind losetup
+    for candidate in partitions + [device]:
+        if probe_partition(candidate).has_system32:
+            return candidate
+    return None
+
+
+def _restore_one(target: str, dry_run: bool, force: bool) -> dict:
+    report = {
+        "target": target,
+        "loop": None,
+        "partition": None,
+        "result": "failed",
+        "sha256": None,
+        "seconds": 0.0,
+        "error": None,
+        "cleanup": None,
+        "log": "",
+    }
+    started = time.monotonic()
+    loop = mountpoint = session = None
+    cleanup = []
+    with _CapturedOutput() as out:
+        try:
+            device = target
+            if Path(target).is_file():
+                loop = SYSTEM.attach_image(target)
+                report["loop"] = device = loop
+            partition = _find_windows_partition(device, wait=2.0 if loop else 0.0)
+            if partition is None:
+                raise RuntimeError("no partition with Windows/System32 found")
+            report["partition"] = partition
+
+            mountpoint = tempfile.mkdtemp(prefix="wrpbypass-")
+            session = MountSession(partition, mountpoint)
+            with session:
+                windows_dir = session.root / "Windows" / "System32"
+                backup = windows_dir / "Utilman.exe.tmp"
+                manifest = read_manifest(backup) if backup.exists() else None
+                if not restore_files(session.root, dry_run=dry_run, force=force):
+                    raise RuntimeError("restore_files failed (see log)")
+                if dry_run:
+                    report["result"] = "dry-run"
+                else:
+                    sha256, _ = sha256_file(windows_dir / "Utilman.exe")
+                    report["sha256"] = sha256
+                    if manifest and manifest.get("sha256") == sha256:
+                        report["result"] = "verified"
+                    elif manifest:
+                        report["result"] = "MISMATCH"
+                    else:
+                        report["result"] = "restored (no manifest)"
+        except Exception as e:
+            report["error"] = str(e)
+        finally:
+            if session is not None and session.umount_error:
+                cleanup.append(session.umount_error)
+            if mountpoint:
+                try:
+                    os.rmdir(mountpoint)
+                except OSError as e:
+                    cleanup.append(f"rmdir {mountpoint}: {e}")
+                    print(f"[!] Cannot remove {mountpoint}: {e}")
+            if loop:
+                try:
+                    SYSTEM.detach_image(loop)
+                except Exception as e:
+                    cleanup.append(f"detach {loop}: {e}")
+                    print(f"[!] Cannot detach {loop}: {e}")
+    # A restore that verified but left a mount or loop device behind is not
+    # a clean success: the caller has to see it in the report and exit code.
+    report["cleanup"] = "; ".join(cleanup) or None
+    report["seconds"] = round(time.monotonic() - started, 2)
+    report["log"] = out.stdout.getvalue() + out.stderr.getvalue()
+    return report
+
+
+def batch_restore(targets: list[str], jobs: int = 4, dry_run: bool = False,
+                  force: bool = False, as_json: bool = False) -> int:
+    """Restore Utilman.exe on many images/devices in parallel; print a report."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    ensure_root()
+    jobs = max(1, min(jobs, len(targets)))
+    print(f"[i] Restoring {len(targets)} target(s), {jobs} at a time...")
+    _install_output_router()
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        reports = list(pool.map(lambda t: _restore_one(t, dry_run, force), targets))
+
+    if as_json:
+        print(json.dumps(reports, indent=2))
+    else:
+        for r in reports:
+            print(f"--- {r['target']} ---")
+            print(r["log"].rstrip() or "(no output)")
+        print()
+        print(f"{'TARGET':28} {'PARTITION':14} {'RESULT':24} {'CLEANUP':8} {'TIME':>6}  SHA256 / ERROR")
+        for r in reports:
+            print(
+                f"{r['target']:28} {r['partition'] or '-':14} {r['result']:24} "
+                f"{'FAILED' if r['cleanup'] else 'ok':8} "
+                f"{r['seconds']:>5.1f}s  {r['error'] or r['sha256'] or '-'}"
+            )
+            if r["cleanup"]:
+                print(f"{'':28} cleanup: {r['cleanup']}")
+    ok = all(
+        r["result"] in ("verified", "dry-run", "restored (no manifest)") and not r["cleanup"]
+        for r in reports
+    )
+    return 0 if ok else 1
+
+
+def _print_hook_report(files: dict, manifest_raw: bytes | None) -> None:
+    """Print {name: (size, sha256) or None} for HOOK_FILES plus the hook state."""
+    for name in HOOK_FILES:
+        found = files.get(name)
+        if found is None:
+            print(f"  {name:16} missing")
+        else:
+            print(f"  {name:16} {found[0]:>10} bytes  sha256 {found[1]}")
+    if manifest_raw is not None:
+        try:
+            expected = json.loads(manifest_raw).get("sha256")
+        except ValueError:
+            expected = None
+        backup = files.get("Utilman.exe.tmp")
+        verdict = "matches" if backup and backup[1] == expected else "DOES NOT match"
+        print(f"[i] Backup manifest: {verdict} (recorded sha256 {expected})")
+    present = {name.lower() for name, found in files.items() if found is not None}
+    print(f"[i] Hook state: {classify_hook_state(present)}")
+
+
+def inspect_volume(device: str) -> int:
+    """Report hook files (size, sha256) straight from a device or image, read-only."""
     try:
-        cp = subprocess.run(
-            ["lsblk", "-o", "NAME,SIZE,FSTYPE,MOUNTPOINT", "-rn"],
-            text=True,
-            capture_output=True,
-            check=False,
-        )
-    except FileNotFoundError:
-        return parts
+        vol = NtfsVolume(device)
+    except (OSError, NtfsError) as e:
+        print(f"[!] Cannot open {device} as NTFS: {e}")
+        return 1
+    with vol:
+        print(f"[i] {device}: NTFS, {vol.total_bytes // (1024 * 1024)} MiB, serial {vol.serial:016X}")
+        if not vol.is_dir(SYSTEM32):
+            print(f"[!] {SYSTEM32} not found. This does not look like a Windows system root.")
+            return 1
+        if vol.is_dir(SERVICING_VERSION):
+            print(f"[i] Windows version: {_latest_version(vol.listdir(SERVICING_VERSION)) or 'unknown'}")
+        files = {}
+        for name in HOOK_FILES:
+            path = f"{SYSTEM32}/{name}"
+            entry = vol.stat(path)
+            if entry is None:
+                continue
+            try:
+                digest = vol.sha256(path)
+            except NtfsError as e:
+                digest = f"<{e}>"
+            files[name] = (entry.size, digest)
+        manifest = f"{SYSTEM32}/Utilman.exe.tmp{MANIFEST_SUFFIX}"
+        _print_hook_report(files, vol.read_file(manifest) if vol.exists(manifest) else None)
+    return 0
 
-    for line in cp.stdout.splitlines():
-        cols = line.split()
-        if not cols:
-            continue
-        name = cols[0]
-        size = cols[1] if len(cols) > 1 else "?"
-        fstype = cols[2] if len(cols) > 2 else ""
-        mount = cols[3] if len(cols) > 3 else ""
-        dev = f"/dev/{name}"
-        parts.append((dev, size, fstype, mount))
-    return parts
+
+def inspect_tree(win_root) -> int:
+    """Same report as inspect_volume() for a mounted or extracted Windows root."""
+    windows_dir = Path(win_root) / "Windows" / "System32"
+    print(f"[i] {win_root}: Windows root directory")
+    if not windows_dir.is_dir():
+        print(f"[!] {windows_dir} not found. This does not look like a Windows system root.")
+        return 1
+    versions_dir = Path(win_root) / "Windows" / "servicing" / "Version"
+    if versions_dir.is_dir():
+        print(f"[i] Windows version: {_latest_version(os.listdir(versions_dir)) or 'unknown'}")
+    files = {}
+    for name in HOOK_FILES:
+        path = windows_dir / name
+        if path.is_file():
+            digest, size = sha256_file(path)
+            files[name] = (size, digest)
+    manifest = manifest_path(windows_dir / "Utilman.exe.tmp")
+    _print_hook_report(files, manifest.read_bytes() if manifest.is_file() else None)
+    return 0
 
 
 def interactive() -> int:
@@ -185,20 +1904,38 @@ def interactive() -> int:
 
     print("=== wrpbypass helper for Debian/Ubuntu Live ===")
     print()
-    print("[i] Available disks/partitions:")
-    parts = _list_partitions()
-    if parts:
-        for idx, (dev, size, fstype, mount) in enumerate(parts, start=1):
-            print(
-                f"  {idx}) {dev:12} {size:>8}  {fstype or '-':8}  {mount or '-'}"
-            )
-    else:
-        print("[!] lsblk not found or no partitions detected. You will need to type the device path manually.")
+    # Reading boot sectors for auto-detection needs root as well.
+    ensure_root()
+    refresh = False
+    while True:
+        print("[i] Probing disks/partitions for Windows installations...")
+        started = time.monotonic()
+        probes = probe_windows_partitions(BLOCK_INVENTORY.partitions(refresh=refresh))
+        parts = [(p.device, p.size, p.fstype, p.mount) for p in probes]
+        if parts:
+            print(f"[i] Probed {len(parts)} partitions in {time.monotonic() - started:.2f}s:")
+            for idx, p in enumerate(probes, start=1):
+                marker = "*" if p.has_system32 else " "
+                print(
+                    f" {marker}{idx}) {p.device:12} {p.size:>8}  {p.fstype or '-':8}  "
+                    f"{p.label[:16] or '-':16}  {p.mount or '-':12}  {p.describe()}"
+                )
+            if probes[0].has_system32:
+                print(f"[i] Suggested: 1 ({probes[0].device})")
+        else:
+            print("[!] No partitions detected. You will need to type the device path manually.")
 
-    print()
-    raw = input(
-        "Select partition number or enter device path (e.g. /dev/sda1): "
-    ).strip()
+        print()
+        default = "1" if probes and probes[0].has_system32 else ""
+        raw = input(
+            "Select partition number, enter device path (e.g. /dev/sda1) or 'r' to rescan"
+            + (f" [{default}]" if default else "")
+            + ": "
+        ).strip() or default
+        if raw.lower() != "r":
+            break
+        refresh = True
+        print()
     if not raw:
         print("[!] Device is empty, aborting.")
         return 1
@@ -213,52 +1950,72 @@ def interactive() -> int:
     else:
         device = raw
 
-    print()
-    print("Select mode:")
-    print("  1) Install hook (replace Utilman.exe with wrpbypass.exe)")
-    print("  2) Restore original Utilman.exe from backup")
-    choice = input("Choice [1/2]: ").strip()
-
-    if choice == "1":
-        mode = "install"
-    elif choice == "2":
-        mode = "restore"
-    else:
-        print("[!] Invalid choice. Use 1 or 2.")
-        return 1
-
+    # A directory is taken as an already-mounted/extracted Windows root.
+    win_root = device if os.path.isdir(device) else None
     mountpoint = "/mnt/win"
+    dry_run = False
     wrp_exe = None
+    rc = 0
 
-    if mode == "install":
-        print()
-        default_wrp = script_dir / "dist" / "Utilman.exe"
-        if default_wrp.is_file():
-            print(f"Found built Utilman.exe at: {default_wrp}")
-            use_default = input("Use this path? [Y/n]: ").strip() or "Y"
-            if use_default.lower().startswith("y"):
-                wrp_exe = str(default_wrp)
-
-        if not wrp_exe:
-            print(
-                "You must provide path to Utilman.exe (built from wrpbypass.py), "
-                "e.g. /media/usb/dist/Utilman.exe"
+    # One session for the whole menu: status, dry run and the real
+    # operation share a single mount instead of one mount cycle each.
+    with MountSession(None if win_root else device, mountpoint, win_root=win_root) as session:
+        while True:
+            print()
+            print("Select mode:")
+            print("  1) Install hook (replace Utilman.exe with wrpbypass.exe)")
+            print("  2) Restore original Utilman.exe from backup")
+            print("  3) Inspect" + ("" if session.mounted else " (read-only, no mount)"))
+            print(f"  4) Dry run: {'ON' if dry_run else 'off'} (toggle)")
+            print("  0) Quit")
+            choice = input("Choice [0-4]: ").strip()
+
+            if choice == "0":
+                return rc
+            if choice == "4":
+                dry_run = not dry_run
+                continue
+            if choice == "1":
+                mode = "install"
+                wrp_exe = wrp_exe or _ask_wrpbypass_exe(script_dir)
+                if not wrp_exe:
+                    continue
+            elif choice == "2":
+                mode = "restore"
+            elif choice == "3":
+                mode = "inspect"
+            else:
+                print("[!] Invalid choice. Use 0-4.")
+                continue
+
+            args = argparse.Namespace(
+                mode=mode, wrpbypass_exe=wrp_exe, dry_run=dry_run, force=False
             )
-            wrp_exe = input("Path to Utilman.exe: ").strip()
+            try:
+                rc = 0 if run_mode(session, args) else 1
+            except RuntimeError as e:
+                print(f"[!] {e}")
+                rc = 1
 
-        if not wrp_exe or not Path(wrp_exe).is_file():
-            print("[!] Utilman.exe not found at given path.")
-            return 1
 
-    args = argparse.Namespace(
-        device=device,
-        mountpoint=mountpoint,
-        mode=mode,
-        wrpbypass_exe=wrp_exe,
-        dry_run=False,
-    )
+def _ask_wrpbypass_exe(script_dir: Path) -> str | None:
+    print()
+    default_wrp = script_dir / "dist" / "Utilman.exe"
+    if default_wrp.is_file():
+        print(f"Found built Utilman.exe at: {default_wrp}")
+        use_default = input("Use this path? [Y/n]: ").strip() or "Y"
+        if use_default.lower().startswith("y"):
+            return str(default_wrp)
 
-    return _run_with_args(args)
+    print(
+        "You must provide path to Utilman.exe (built from wrpbypass.py), "
+        "e.g. /media/usb/dist/Utilman.exe"
+    )
+    wrp_exe = input("Path to Utilman.exe: ").strip()
+    if not wrp_exe or not Path(wrp_exe).is_file():
+        print("[!] Utilman.exe not found at given path.")
+        return None
+    return wrp_exe
 
 
 def build_parser() -> argparse.ArgumentParser:
@@ -267,8 +2024,22 @@ def build_parser() -> argparse.ArgumentParser:
     )
     parser.add_argument(
         "--device",
-        required=True,
-        help="Windows partition device (e.g. /dev/sda1)",
+        action="extend",
+        nargs="+",
+        help=(
+            "Windows partition device (e.g. /dev/sda1); inspect/status also accept "
+            "image files, status accepts several"
+        ),
+    )
+    parser.add_argument(
+        "--win-root",
+        action="extend",
+        nargs="+",
+        metavar="PATH",
+        help=(
+            "Operate on an already-mounted Windows root or extracted image directory "
+            "(nothing is mounted, root is not required)"
+        ),
     )
     parser.add_argument(
         "--mountpoint",
@@ -277,9 +2048,13 @@ def build_parser() -> argparse.ArgumentParser:
     )
     parser.add_argument(
         "--mode",
-        choices=["install", "restore"],
+        choices=["install", "restore", "inspect", "status"],
         required=True,
-        help="Mode: install (replace) or restore (restore original files)",
+        help=(
+            "Mode: install (replace), restore (restore original files), "
+            "inspect (read-only report straight from the device, no mount) or "
+            "status (read-only hook state of many devices/images at once)"
+        ),
     )
     parser.add_argument(
         "--wrpbypass-exe",
@@ -288,6 +2063,44 @@ def build_parser() -> argparse.ArgumentParser:
             "e.g. /media/usb/dist/wrpbypass.exe)"
         ),
     )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Restore even if Utilman.exe.tmp does not match its recorded manifest",
+    )
+    parser.add_argument(
+        "--mount-drivers",
+        default=",".join(MOUNT_DRIVERS),
+        help=(
+            "Comma-separated mount drivers to try in order "
+            f"(default: {','.join(MOUNT_DRIVERS)}; 'auto' = let mount decide)"
+        ),
+    )
+    parser.add_argument(
+        "--mount-options",
+        default=MOUNT_OPTIONS,
+        help=(
+            "Extra mount -o options; 'driver:option' applies to one driver only, "
+            "e.g. 'noatime,ntfs3:prealloc,ntfs-3g:windows_names'"
+        ),
+    )
+    parser.add_argument(
+        "--ignore-volume-checks",
+        action="store_true",
+        default=IGNORE_VOLUME_CHECKS,
+        help="Mount even if Windows is hibernated (Fast Startup) or the volume is dirty",
+    )
+    parser.add_argument(
+        "--json",
+        action="store_true",
+        help="status/batch restore: print JSON instead of a table",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=4,
+        help="Batch restore (several devices or image files): parallel restores (default: 4)",
+    )
     parser.add_argument(
         "--dry-run",
         action="store_true",
@@ -316,6 +2129,13 @@ def main(argv: list[str] | None = None) -> int:
 
     parser = build_parser()
     args = parser.parse_args(argv)
+    if not args.device and not args.win_root:
+        parser.error("one of the arguments --device --win-root is required")
+    configure_mount(
+        [d.strip() for d in args.mount_drivers.split(",") if d.strip()],
+        args.mount_options,
+        args.ignore_volume_checks,
+    )
     return _run_with_args(args)
 
 
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Run wrpbypass.py against a simulated `net` backend (no Windows needed).
+
+Exercises the backend scheduler, session cache, daemon and everything above
+them with configurable latency and error rate:
+
+    python3 wrpbypass_sim.py --spec "latency=0.3,jitter=0.1,errors=0.1,code=1722,users=500" user report
+    WRP_SIMULATE="latency=0.05,users=2000" python3 wrpbypass_sim.py user list
+
+Call statistics (calls, peak concurrency) are printed to stderr at exit.
+Not shipped with the Windows build.
+"""
+import argparse
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from typing import List
+
+import wrpbypass
+
+
+class SimulatedBackend:
+    """
+    Stand-in for `net` with configurable latency and error rate, e.g.
+    "latency=0.3,jitter=0.2,errors=0.1,users=500".
+    """
+
+    def __init__(self, spec: str):
+        opts = dict(
+            part.split("=", 1) for part in spec.split(",") if "=" in part
+        )
+        self.latency = float(opts.get("latency", "0.2"))
+        self.jitter = float(opts.get("jitter", "0.1"))
+        self.errors = float(opts.get("errors", "0"))
+        self.error_code = int(opts.get("code", "1722"))
+        self.users = int(opts.get("users", "50"))
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.inflight = 0
+        self.max_inflight = 0
+
+    def run(self, args: List[str]) -> subprocess.CompletedProcess[str]:
+        with self._lock:
+            self.calls += 1
+            self.inflight += 1
+            self.max_inflight = max(self.max_inflight, self.inflight)
+        try:
+            # Latency grows with concurrency, like a loaded domain controller.
+            load = 1 + 0.1 * max(self.inflight - 4, 0)
+            time.sleep(max(0.0, self.latency * load + random.uniform(-self.jitter, self.jitter)))
+            if random.random() < self.errors:
+                return subprocess.CompletedProcess(
+                    args,
+                    2,
+                    "",
+                    f"System error {self.error_code} has occurred.\n\n",
+                )
+            return subprocess.CompletedProcess(args, 0, self._output(args), "")
+        finally:
+            with self._lock:
+                self.inflight -= 1
+
+    def _output(self, args: List[str]) -> str:
+        words = [a for a in args[1:] if not a.startswith("/")]
+        names = [f"user{i:05d}" for i in range(self.users)]
+        sep = "-" * 79
+        done = "The command completed successfully.\n"
+        if words[:1] == ["user"] and len(words) == 1:
+            rows = [
+                "".join(f"{n:<25}" for n in names[i : i + 3]).rstrip()
+                for i in range(0, len(names), 3)
+            ]
+            return "User accounts for \\\\SIM\n\n" + sep + "\n" + "\n".join(rows) + "\n" + done
+        if words[:1] == ["user"]:
+            return (
+                f"User name                    {words[1]}\n"
+                "Account active               Yes\n"
+                "Account expires              Never\n"
+                "Password expires             Never\n"
+                "Last logon                   Never\n" + done
+            )
+        if words[:1] in (["localgroup"], ["group"]) and len(words) == 1:
+            return "Aliases for \\\\SIM\n\n" + sep + "\n*Administrators\n*Users\n" + done
+        if words[:1] in (["localgroup"], ["group"]):
+            return "Members\n\n" + sep + "\n" + "\n".join(names[:3]) + "\n" + done
+        return done
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Run wrpbypass with a simulated net backend",
+        usage="%(prog)s [--spec SPEC] [wrpbypass arguments ...]",
+    )
+    parser.add_argument(
+        "--spec",
+        default=os.environ.get("WRP_SIMULATE", ""),
+        help="latency=,jitter=,errors=,code=,users= (default: $WRP_SIMULATE)",
+    )
+    args, rest = parser.parse_known_args(argv)
+    backend = SimulatedBackend(args.spec)
+    wrpbypass.set_backend(backend)
+    try:
+        return wrpbypass.main(rest)
+    finally:
+        print(
+            f"[sim] calls={backend.calls} max_inflight={backend.max_inflight}",
+            file=sys.stderr,
+        )
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())